@@ -0,0 +1,279 @@
+"""
+Batch processing of every antenna dataset in simulations/results.
+
+Each dataset is processed with the evaluate-moments pipeline and, where the
+free-space and empty TEM cell exports exist, with the equivalent-circuit
+pipeline. All jobs run in a process pool, so a full reprocess takes about as
+long as the slowest single dataset. Results are written per antenna together
+with a combined summary.csv. With --plots, the figures of every dataset are
+rendered headlessly in a second process pool. With --fit ORDER, the moments
+of all datasets are fitted by polynomials in one batch and written as HFSS
+expressions and datasets to output/hfss.
+
+Usage:
+    python main.py [--results-dir DIR] [--output-dir DIR] [--workers N] [--only NAME ...] [--plots] [--fit ORDER]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")  # headless; the eqc scripts import pyplot
+
+import numpy as np
+import pandas as pd
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+RESULTS_DIR = SCRIPTS_DIR.parent / "simulations" / "results"
+OUTPUT_DIR = Path(__file__).resolve().parent / "output"
+
+sys.path.append(str(SCRIPTS_DIR / "evaluate-moments"))
+from modules.hfss_headers import read_schema
+from modules.moment_fitting import fit_moment_sets, format_fit_report, write_hfss_files
+from modules.moment_sinks import CsvSink
+from modules.pipeline import evaluate_antenna
+from modules.plot_moments import FigureJob, render_figures
+from modules.touchstone import find_touchstone
+
+# Equivalent-circuit script per antenna; all others use DEFAULT_EQC_VARIANT
+EQC_VARIANTS = {
+    "monopole": "eqc-cap-antenna",
+}
+DEFAULT_EQC_VARIANT = "eqc-ind-antenna"
+
+# Equivalent-circuit main modules loaded in this process, keyed by variant
+_eqc_modules = {}
+
+
+def discover_jobs(results_dir):
+    """
+    Find all datasets that one of the pipelines can process.
+
+    A folder with phase.csv (both waveport phases) and magnitude.csv, or
+    with a Touchstone file, is an evaluate-moments dataset. A folder '<antenna>-tem-cell' next to
+    '<antenna>-free-space' and 'tem-cell-empty' is an equivalent-circuit
+    dataset.
+
+    Parameters
+    ----------
+    results_dir : Path
+        Folder with one sub-folder per HFSS export set
+
+    Returns
+    -------
+    list of tuple
+        (pipeline, dataset name) pairs, pipeline being 'moments' or 'eqc'
+    """
+    results_dir = Path(results_dir)
+    jobs = []
+    for folder in sorted(p for p in results_dir.iterdir() if p.is_dir()):
+        phase_csv = folder / "phase.csv"
+        if find_touchstone(folder) is not None:
+            jobs.append(("moments", folder.name))
+        elif phase_csv.exists() and (folder / "magnitude.csv").exists():
+            try:
+                schema = read_schema(phase_csv)
+                schema.index("waveport1_phase")
+                schema.index("waveport2_phase")
+                jobs.append(("moments", folder.name))
+            except KeyError:
+                pass
+
+        if folder.name.endswith("-tem-cell"):
+            antenna = folder.name[:-len("-tem-cell")]
+            if ((results_dir / f"{antenna}-free-space").is_dir()
+                    and (results_dir / "tem-cell-empty").is_dir()):
+                jobs.append(("eqc", antenna))
+    return jobs
+
+
+def run_job(pipeline, name, results_dir, output_dir, plots=False):
+    """
+    Run one pipeline for one dataset; executed in a worker process.
+
+    Errors are caught and reported in the returned summary row, so that one
+    broken dataset does not stop the batch.
+
+    Returns
+    -------
+    dict
+        Summary row of the job
+    list of FigureJob
+        Figures of the dataset (empty unless plots is True)
+    tuple or None
+        (frequencies, m_e, m_m) of the dataset, None if it failed
+    """
+    start = time.perf_counter()
+    row = {"dataset": name, "pipeline": pipeline}
+    figures = []
+    moments = None
+    try:
+        antenna_dir = Path(output_dir) / name
+        antenna_dir.mkdir(parents=True, exist_ok=True)
+        if pipeline == "moments":
+            frequencies, m_e, m_m, output_csv, figures, details = _run_moments(name, results_dir, antenna_dir)
+        else:
+            frequencies, m_e, m_m, output_csv, figures, details = _run_eqc(name, results_dir, antenna_dir)
+        if not plots:
+            figures = []
+        moments = (frequencies, m_e, m_m)
+        row.update({
+            "points": len(frequencies),
+            "f_min_ghz": np.min(frequencies) / 1e9,
+            "f_max_ghz": np.max(frequencies) / 1e9,
+            "max_m_e_377": np.max(np.abs(m_e)) * 377,
+            "max_m_m": np.max(np.abs(m_m)),
+            "output": str(output_csv),
+            "error": "",
+        })
+        row.update(details)
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["seconds"] = time.perf_counter() - start
+    return row, figures, moments
+
+
+def _run_moments(name, results_dir, antenna_dir):
+    """evaluate-moments pipeline of one dataset."""
+    output_csv = antenna_dir / "dipole-moments.csv"
+    with CsvSink(str(output_csv)) as sink:
+        result = evaluate_antenna(name, data_dir=results_dir, sink=sink)
+    frequencies = result["frequencies"]
+    figures = [
+        FigureJob("phase_shift", (result["columns_phase_shift"], frequencies, name),
+                  str(antenna_dir / "phase.png")),
+        FigureJob("moments", (result["m_e"], result["m_m"], frequencies, name),
+                  str(antenna_dir / "dipole-moments.png")),
+        FigureJob("output_power_e_field", (frequencies, result["output_power"], result["efield"], name),
+                  str(antenna_dir / "output-power.png")),
+    ]
+    # Flagged phase steps need a look before the moments are trusted
+    details = {"phase_jumps": int(np.count_nonzero(result["phase_discontinuities"]))}
+    return frequencies, result["m_e"], result["m_m"], output_csv, figures, details
+
+
+def _run_eqc(antenna, results_dir, antenna_dir):
+    """Equivalent-circuit pipeline of one antenna."""
+    eqc = _load_eqc_main(EQC_VARIANTS.get(antenna, DEFAULT_EQC_VARIANT))
+    inputs = eqc.load_circuit_inputs(antenna, data_dir=str(results_dir))
+    m_e, m_m = eqc.compute_dipole_moments(**inputs)
+    output_csv = antenna_dir / "eqc-dipole-moments.csv"
+    eqc.save_dipole_moments_to_csv(inputs["frequencies"], np.abs(np.multiply(m_e, 377)),
+                                   np.abs(m_m), output_csv)
+    figures = [FigureJob("moments", (m_e, m_m, inputs["frequencies"], antenna),
+                         str(antenna_dir / "eqc-dipole-moments.png"))]
+    return inputs["frequencies"], m_e, m_m, output_csv, figures, {}
+
+
+def _load_eqc_main(variant):
+    """
+    Import main.py of an equivalent-circuit script folder.
+
+    Both folders contain a module named calculate_moments, which main.py
+    imports by plain name, so it is dropped from sys.modules around each
+    import to bind every variant to its own copy.
+    """
+    module = _eqc_modules.get(variant)
+    if module is None:
+        directory = SCRIPTS_DIR / variant
+        sys.modules.pop("calculate_moments", None)
+        sys.path.insert(0, str(directory))
+        try:
+            spec = importlib.util.spec_from_file_location(
+                f"{variant.replace('-', '_')}_main", directory / "main.py")
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        finally:
+            sys.path.remove(str(directory))
+            sys.modules.pop("calculate_moments", None)
+        _eqc_modules[variant] = module
+    return module
+
+
+def run_batch(results_dir=RESULTS_DIR, output_dir=OUTPUT_DIR, workers=None, only=None, plots=False,
+              fit_order=None):
+    """
+    Process all discovered datasets in parallel and write summary.csv.
+
+    Parameters
+    ----------
+    results_dir : Path, optional
+        Folder with the HFSS exports (default: simulations/results)
+    output_dir : Path, optional
+        Folder receiving one sub-folder per dataset and summary.csv
+    workers : int, optional
+        Number of worker processes (default: number of CPUs)
+    only : list of str, optional
+        Restrict processing to these dataset names
+    plots : bool, optional
+        Also render the figures of every dataset into its output folder
+    fit_order : int, optional
+        Fit all moments with polynomials of this order and write HFSS files
+
+    Returns
+    -------
+    pandas.DataFrame
+        Summary with one row per job
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    jobs = discover_jobs(results_dir)
+    if only:
+        jobs = [job for job in jobs if job[1] in only]
+
+    rows = []
+    figures = []
+    moment_sets = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_job, pipeline, name, Path(results_dir), output_dir, plots)
+                   for pipeline, name in jobs]
+        for future in as_completed(futures):
+            row, row_figures, moments = future.result()
+            status = row["error"] or f"{row['points']} points"
+            print(f"{row['pipeline']:8} {row['dataset']:24} {row['seconds']:7.2f} s  {status}")
+            rows.append(row)
+            figures.extend(row_figures)
+            if moments is not None:
+                moment_sets[f"{row['dataset']}-{row['pipeline']}"] = moments
+
+    if figures:
+        start = time.perf_counter()
+        render_figures(figures, workers)
+        print(f"Rendered {len(figures)} figures in {time.perf_counter() - start:.2f} s")
+
+    if fit_order is not None and moment_sets:
+        fits = fit_moment_sets(dict(sorted(moment_sets.items())), fit_order)
+        write_hfss_files(output_dir / "hfss", fits)
+        print(format_fit_report(fits))
+
+    summary = pd.DataFrame(rows).sort_values(["dataset", "pipeline"])
+    summary_csv = output_dir / "summary.csv"
+    summary.to_csv(summary_csv, index=False)
+    print(f"Summary saved to {summary_csv}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract dipole moments for all antenna datasets.")
+    parser.add_argument("--results-dir", type=Path, default=RESULTS_DIR,
+                        help="folder with the HFSS exports")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR,
+                        help="folder for per-antenna outputs and summary.csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("--only", nargs="+", metavar="NAME",
+                        help="process only these datasets")
+    parser.add_argument("--plots", action="store_true",
+                        help="render the figures of every dataset")
+    parser.add_argument("--fit", type=int, metavar="ORDER",
+                        help="export polynomial fits of all moments for HFSS")
+    args = parser.parse_args()
+    run_batch(args.results_dir, args.output_dir, args.workers, args.only, args.plots, args.fit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from calculate_moments import calc
+
+# The LTspice reader and circuit solver live with the evaluate-moments modules
+sys.path.append(str(Path(__file__).resolve().parents[1] / "evaluate-moments"))
+from modules.ltspice import read_asc, read_raw
+
+SPICE_DIR = Path(__file__).resolve().parents[2] / "simulations" / "spice"
+
+# calc() quantity -> (LTspice variable, sign). LTspice counts device
+# currents from the first to the second pin of a symbol, so currents of
+# components drawn against the direction used in calc() are negated.
+SPICE_QUANTITIES = {
+    'i_r1': ('I(R1)', 1),
+    'i_r2': ('I(R2)', 1),
+    'i_ct1': ('I(C3)', 1),
+    'i_ct2': ('I(C4)', 1),
+    'i_lt1': ('I(L2)', 1),
+    'i_lt2': ('I(L3)', -1),
+    'i_ck': ('I(C2)', 1),
+    'input_current': ('I(V1)', -1),
+    'i_ca': ('I(C1)', -1),
+    'i_la': ('I(L1)', 1),
+}
+
+
+def spice_circuit_inputs(results, components):
+    """
+    Derive the inputs of calc() from a simulation of the equivalent circuit.
+
+    The port voltages follow from the currents through the 50 Ohm loads
+    R1 and R2, the input voltage from the AC amplitude of the ideal source
+    V1, the TEM cell and antenna elements from the schematic values (the
+    TEM cell is split into two halves in the schematic, calc() expects the
+    whole cell). Only device currents are read from the results: net names
+    of read_asc() do not follow LTspice's numbering.
+
+    Parameters:
+    -----------
+    results : modules.ltspice.RawFile or modules.circuit.CircuitSolution
+        AC results, indexed by LTspice names such as 'I(R1)'.
+    components : dict
+        Component values per instance name.
+
+    Returns:
+    --------
+    dict
+        Keyword arguments of calc(), one entry per simulated frequency.
+    """
+    frequency = results.axis
+    u_1 = results['I(R1)'] * components['R1']
+    u_2 = results['I(R2)'] * components['R2']
+    source_voltage = np.broadcast_to(components['V1'], frequency.shape)
+    return {
+        'output_power': np.abs(u_1) ** 2 / 50,
+        'output_voltage_phase_1': np.angle(u_1),
+        'output_voltage_phase_2': np.angle(u_2),
+        # calc() converts the peak input voltage to its effective value
+        'input_voltage': source_voltage * np.sqrt(2),
+        'input_impedance': source_voltage / -results['I(V1)'],
+        'tem_inductance': 2 * components['L2'],
+        'tem_capacitance': 2 * components['C3'],
+        'antenna_inductance': components['L1'],
+        'antenna_capacitance': components['C1'],
+        'frequency': frequency,
+    }
+
+
+def compare_with_calc(results, components):
+    """
+    Compare the branch currents of calc() with a simulation of the circuit.
+
+    Parameters:
+    -----------
+    results : modules.ltspice.RawFile or modules.circuit.CircuitSolution
+        AC results of an LTspice run or of the built-in circuit solver.
+    components : dict
+        Component values per instance name.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per frequency and quantity with the simulated and calc()
+        value and their relative deviation |calc - simulated| / |simulated|.
+    """
+    inputs = spice_circuit_inputs(results, components)
+    # m is undefined (0/0) for a symmetric TEM cell, where i_lt1 == i_lt2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = calc(**inputs)
+
+    rows = []
+    for name, (variable, sign) in SPICE_QUANTITIES.items():
+        simulated = sign * results[variable]
+        model = np.broadcast_to(result[name], simulated.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = np.abs(model - simulated) / np.abs(simulated)
+        rows.append(pd.DataFrame({
+            'frequency': inputs['frequency'],
+            'quantity': name,
+            'spice_variable': variable,
+            'simulated': simulated,
+            'calc': model,
+            'relative_deviation': deviation,
+        }))
+    return pd.concat(rows, ignore_index=True)
+
+
+def schematic_deviation(raw, solution):
+    """
+    Relative deviation of every device current of an LTspice run from the schematic.
+
+    Device currents are compared because they are named after the
+    instances in both; net names of read_asc() are generated and do not
+    match LTspice's. A large deviation means that the .raw file was not
+    simulated from the current schematic.
+
+    Parameters:
+    -----------
+    raw : modules.ltspice.RawFile
+        AC results of an LTspice run.
+    solution : modules.circuit.CircuitSolution
+        The schematic solved at the frequencies of the run.
+
+    Returns:
+    --------
+    pandas.Series
+        Largest relative deviation over frequency per LTspice variable.
+    """
+    deviation = {}
+    for name in solution.currents:
+        variable = f'I({name})'
+        if variable in raw:
+            simulated = solution[variable]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                deviation[variable] = np.max(np.abs(raw[variable] - simulated) / np.abs(simulated))
+    return pd.Series(deviation, dtype=float)
+
+
+def report(comparison, label, tolerance=1e-6):
+    """Print a comparison table and the quantities deviating by more than tolerance."""
+    print(f"\n{label}")
+    with pd.option_context('display.width', 160, 'display.max_rows', None):
+        print(comparison)
+    deviating = comparison[~(comparison['relative_deviation'] <= tolerance)]
+    if len(deviating):
+        print(f"{deviating['quantity'].nunique()} quantities deviate by more than {tolerance:g}: "
+              f"{', '.join(deviating['quantity'].unique())}")
+
+
+def main():
+    raw_file = SPICE_DIR / "Draft1.raw"
+    asc_file = SPICE_DIR / "Draft1.asc"
+
+    circuit, frequencies = read_asc(asc_file)
+    components = {name: component.value for name, component in circuit.components.items()}
+
+    # The schematic solved by modified nodal analysis at its .ac frequencies
+    comparison = compare_with_calc(circuit.solve(frequencies), components)
+    report(comparison, f"calc() vs. {asc_file.name} (modified nodal analysis)")
+
+    # LTspice results stored next to the schematic, if they belong to it
+    if raw_file.exists():
+        raw = read_raw(raw_file)
+        if not raw.is_complex:
+            raise ValueError(f"{raw_file} holds no AC analysis (flags: {sorted(raw.flags)})")
+        deviation = schematic_deviation(raw, circuit.solve(raw.axis))
+        if deviation.max() <= 1e-6:
+            report(compare_with_calc(raw, components), f"calc() vs. {raw_file.name}")
+        else:
+            print(f"\n{raw_file.name} was not simulated from {asc_file.name} "
+                  f"({deviation.idxmax()} deviates by {deviation.max():.3g}); "
+                  f"re-run the schematic in LTspice to compare against it")
+
+    output_csv = "output/spice_comparison.csv"
+    comparison.to_csv(output_csv, index=False)
+    print(f"Comparison saved to {output_csv}")
+
+if __name__ == "__main__":
+    main()
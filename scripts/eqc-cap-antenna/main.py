@@ -1,43 +1,124 @@
+import sys
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from calculate_moments import calc
-
+from calculate_moments import calc, UNIFORM_NORMALIZED_FIELD
 
-def load_csv_column(file_path, column_index, skiprows=1):
-    """Load a specific column from a CSV file as a NumPy array."""
-    data = pd.read_csv(file_path, header=None, dtype=float, skiprows=skiprows)
-    # Corrected indexing to ensure it grabs the specific column index requested
-    return data.iloc[:, column_index].to_numpy()
+# Shared CSV loading lives with the evaluate-moments modules
+sys.path.append(str(Path(__file__).resolve().parents[1] / "evaluate-moments"))
+from modules.read_csv import load_csv_named
+from modules.frequency_grid import align_quantities
+from modules.phase_processing import process_phases
+from modules.uncertainty import monte_carlo
+from modules.tem_cell import TEM_CELLS, chamber_centre
 
 
 def compute_dipole_moments(frequencies, output_power, s_phase_1,
                            s_phase_2, feed_current, tem_impedance,
                            tem_cell_capacitance, tem_cell_inductance,
-                           antenna_inductance, antenna_capacitance):
-    """Calculate dipole moments for all frequency values."""
-    m_e = []
-    m_m = []
-    for i, freq in enumerate(frequencies):
-        result = calc(
-            output_power[i],
-            s_phase_1[i],
-            s_phase_2[i],
-            feed_current[i], # Updated parameter
-            tem_impedance[i],
-            tem_cell_inductance[i],
-            tem_cell_capacitance[i],
-            antenna_inductance[i],
-            antenna_capacitance[i],
-            freq
-        )
-        m_e.append(result['equ_ele_dipole_moment'])
-        m_m.append(result['equ_mag_dipole_moment'])
+                           antenna_inductance, antenna_capacitance,
+                           diagnostics_file=None,
+                           normalized_field=UNIFORM_NORMALIZED_FIELD):
+    """
+    Calculate dipole moments for all frequency values in one batched call.
+
+    If diagnostics_file is given, the intermediate circuit quantities are
+    exported there as a CSV table with one row per frequency.
+    normalized_field is the effective normalized TEM-mode field at the
+    antenna, see tem_cell_normalized_field().
+    """
+    result = calc(
+        output_power,
+        s_phase_1,
+        s_phase_2,
+        feed_current,
+        tem_impedance,
+        tem_cell_inductance,
+        tem_cell_capacitance,
+        antenna_inductance,
+        antenna_capacitance,
+        frequencies,
+        diagnostics=diagnostics_file is not None,
+        normalized_field=normalized_field
+    )
+    if diagnostics_file is not None:
+        result['diagnostics'].to_csv(diagnostics_file, index=False)
+        print(f"Diagnostics saved to {diagnostics_file}")
+    m_e = result['equ_ele_dipole_moment']
+    m_m = result['equ_mag_dipole_moment']
     return m_e, m_m
 
 
-def plot_dipole_moments(frequencies, m_e, m_m, antenna_name):
-    """Plot normalized electric and magnetic dipole moments over frequency."""
+def compute_moment_bands(frequencies, output_power, s_phase_1, s_phase_2,
+                         feed_current, tem_impedance, tem_cell_capacitance,
+                         tem_cell_inductance, antenna_inductance,
+                         antenna_capacitance, perturbations, n_samples=10000,
+                         confidence=0.95, seed=None,
+                         normalized_field=UNIFORM_NORMALIZED_FIELD):
+    """
+    Confidence bands of |m_e| and |m_m| from a Monte Carlo run of calc().
+
+    The inputs are those of compute_dipole_moments(); perturbations maps
+    the argument names of calc() (e.g. 'output_power', 'tem_inductance',
+    'output_voltage_phase_1', 'normalized_field') to their
+    modules.uncertainty.Perturbation.
+    All samples of a block of frequencies are evaluated by one calc() call.
+
+    Returns:
+        Tuple of the ConfidenceBand of |m_e| and of |m_m|
+    """
+    inputs = {
+        'output_power': output_power,
+        'output_voltage_phase_1': s_phase_1,
+        'output_voltage_phase_2': s_phase_2,
+        'input_voltage': feed_current,
+        'input_impedance': tem_impedance,
+        'tem_inductance': tem_cell_inductance,
+        'tem_capacitance': tem_cell_capacitance,
+        'antenna_inductance': antenna_inductance,
+        'antenna_capacitance': antenna_capacitance,
+        'frequency': frequencies,
+        'normalized_field': normalized_field,
+    }
+    bands = monte_carlo(calc, inputs, perturbations,
+                        ['equ_ele_dipole_moment', 'equ_mag_dipole_moment'],
+                        n_samples=n_samples, confidence=confidence, seed=seed)
+    return bands['equ_ele_dipole_moment'], bands['equ_mag_dipole_moment']
+
+
+def tem_cell_normalized_field(tem_cell="empty_tem_cell", antenna_position=None):
+    """
+    Effective normalized TEM-mode field at the antenna, from the analytical field of the cell.
+
+    Parameters:
+    -----------
+    tem_cell : str or TemCell
+        Cell geometry, a name of modules.tem_cell.TEM_CELLS or a TemCell.
+    antenna_position : tuple of float, optional
+        Antenna position (x, y) in m from the septum centre (default: midway
+        between septum and bottom wall).
+
+    Returns:
+    --------
+    float
+        Magnitude of the septum-normal component in V/m.
+    """
+    if isinstance(tem_cell, str):
+        tem_cell = TEM_CELLS[tem_cell]
+    if antenna_position is None:
+        antenna_position = chamber_centre(tem_cell)
+    return float(abs(tem_cell.normalized_field(*antenna_position)[1]))
+
+
+def plot_dipole_moments(frequencies, m_e, m_m, antenna_name, bands=None):
+    """
+    Plot normalized electric and magnetic dipole moments over frequency.
+
+    bands optionally holds the ConfidenceBand of |m_e| and |m_m| (see
+    compute_moment_bands), drawn as shaded areas.
+    """
     normed_m_e = np.abs(m_e) * 377  # normalize electric dipole moment
     abs_m_m = np.abs(m_m)
 
@@ -48,6 +129,9 @@ def plot_dipole_moments(frequencies, m_e, m_m, antenna_name):
     ax1.set_xlabel('Frequency [GHz]')
     ax1.set_ylabel(r'Electric Dipole Moment $\left|m_e\right|\cdot 377\ \Omega$ [V/m]', color='tab:red')
     ax1.plot(frequencies / 1e9, normed_m_e, color='tab:red', label=r'$\left|m_e\right|\cdot 377\Omega$')
+    if bands is not None:
+        ax1.fill_between(frequencies / 1e9, bands[0].lower * 377, bands[0].upper * 377,
+                         color='tab:red', alpha=0.25, linewidth=0)
     ax1.tick_params(axis='y', labelcolor='tab:red')
     ax1.minorticks_on()
     ax1.grid(which='major', linestyle='-', linewidth=0.5, color='#BBBBBB')
@@ -58,11 +142,16 @@ def plot_dipole_moments(frequencies, m_e, m_m, antenna_name):
     ax2 = ax1.twinx()
     ax2.set_ylabel(r'Magnetic Dipole Moment $\left|m_m\right|$ [V/m]', color='tab:blue')
     ax2.plot(frequencies / 1e9, abs_m_m, color='tab:blue', linestyle="--", label=r'$\left|m_m\right|$')
+    if bands is not None:
+        ax2.fill_between(frequencies / 1e9, bands[1].lower, bands[1].upper,
+                         color='tab:blue', alpha=0.25, linewidth=0)
     ax2.tick_params(axis='y', labelcolor='tab:blue')
     ax2.ticklabel_format(axis='y', style='sci', scilimits=(0, 0))
 
     # Synchronize Y-axis limits
     max_val = max(np.max(normed_m_e), np.max(abs_m_m))
+    if bands is not None:
+        max_val = max(max_val, np.max(bands[0].upper * 377), np.max(bands[1].upper))
     ax1.set_ylim(0, max_val)
     ax2.set_ylim(0, max_val)
     ax1.set_xlim(np.min(frequencies / 1e9), np.max(frequencies / 1e9))
@@ -90,55 +179,80 @@ def save_dipole_moments_to_csv(frequencies, m_e, m_m, output_file):
     print(f"Data saved to {output_file}")
 
 
-def main():
-    antenna_name = "monopole"  # Updated name
+def load_circuit_inputs(antenna_name, data_dir="data"):
+    """
+    Load all HFSS exports needed by the equivalent circuit of one antenna.
 
-    # Load antenna free-space data (updated paths)
-    antenna_capacitance = load_csv_column(f'data/{antenna_name}-free-space/capacitance.csv', 2)
-    antenna_inductance = load_csv_column(f'data/{antenna_name}-free-space/inductance.csv', 2)
-    frequencies = load_csv_column(f'data/{antenna_name}-free-space/capacitance.csv', 1) * 1e9
+    Expects the folders '<antenna_name>-free-space', '<antenna_name>-tem-cell'
+    and 'tem-cell-empty' inside data_dir. The exports may come from sweeps
+    with different frequency grids; all quantities are resampled onto the
+    samples common to them (see modules.frequency_grid). The returned
+    dictionary holds the keyword arguments of compute_dipole_moments().
+    """
+    # Load antenna free-space data
+    sweeps = {}
+    sweeps['antenna_capacitance'] = load_csv_named(f'{data_dir}/{antenna_name}-free-space/capacitance.csv', ['frequency', 'capacitance'])
+    sweeps['antenna_inductance'] = load_csv_named(f'{data_dir}/{antenna_name}-free-space/inductance.csv', ['frequency', 'inductance'])
 
     # Load TEM cell (empty) data
-    tem_cell_capacitance = load_csv_column('data/tem-cell-empty/capacitance.csv', 2)
-    tem_cell_inductance = load_csv_column('data/tem-cell-empty/inductance.csv', 2)
+    sweeps['tem_cell_capacitance'] = load_csv_named(f'{data_dir}/tem-cell-empty/capacitance.csv', ['frequency', 'capacitance'])
+    sweeps['tem_cell_inductance'] = load_csv_named(f'{data_dir}/tem-cell-empty/inductance.csv', ['frequency', 'inductance'])
+
+    # Load antenna-in-TEM-cell data
+    frequency, impedance_magnitude, impedance_phase_deg = load_csv_named(f'{data_dir}/{antenna_name}-tem-cell/impedance.csv', ['frequency', 'impedance_magnitude', 'impedance_phase'])
+    sweeps['tem_impedance'] = (frequency, impedance_magnitude * np.exp(1j * np.deg2rad(impedance_phase_deg)))
 
-    # Load monopole-in-TEM-cell data (updated paths)
-    impedance_magnitude = load_csv_column(f'data/{antenna_name}-tem-cell/impedance.csv', 1)
-    impedance_phase_deg = load_csv_column(f'data/{antenna_name}-tem-cell/impedance.csv', 2)
-    antenna_tem_impedance = impedance_magnitude * np.exp(1j * np.deg2rad(impedance_phase_deg))
+    frequency, s_param_mag = load_csv_named(f'{data_dir}/{antenna_name}-tem-cell/magnitude.csv', ['frequency', ('waveport1_db', 'tem_mode_db')])
+    sweeps['output_power'] = (frequency, np.power(10.0, s_param_mag / 10))
 
-    s_param_mag = load_csv_column(f'data/{antenna_name}-tem-cell/magnitude.csv', 1)
-    output_power = np.power(10.0, s_param_mag / 10)
+    frequency, wp1_voltage_phase, wp2_voltage_phase, antenna_voltage_phase = load_csv_named(
+        f'{data_dir}/{antenna_name}-tem-cell/phase.csv',
+        ['frequency', 'waveport1_phase', ('waveport2_phase', 'waveport1_phase_2'), 'antenna_voltage_phase'])
+    # Unwrap the phase differences over frequency in one pass
+    phase_shift = process_phases(frequency * 1e9, [wp1_voltage_phase - antenna_voltage_phase,
+                                                   wp2_voltage_phase - antenna_voltage_phase])
+    if phase_shift.n_discontinuities:
+        print(f"Warning: {phase_shift.n_discontinuities} phase discontinuities in "
+              f"{data_dir}/{antenna_name}-tem-cell/phase.csv")
+    sweeps['s_phase_1'] = (frequency, phase_shift.phases[0])
+    sweeps['s_phase_2'] = (frequency, phase_shift.phases[1])
 
-    # Updated paths for phase
-    wp1_voltage_phase = load_csv_column(f'data/{antenna_name}-tem-cell/phase.csv', 1) 
-    wp2_voltage_phase = load_csv_column(f'data/{antenna_name}-tem-cell/phase.csv', 2) 
-    antenna_voltage_phase = load_csv_column(f'data/{antenna_name}-tem-cell/phase.csv', 3) 
-    phase_shift_1 = wp1_voltage_phase - antenna_voltage_phase
-    phase_shift_2 = wp2_voltage_phase - antenna_voltage_phase
+    sweeps['feed_current'] = load_csv_named(f'{data_dir}/{antenna_name}-tem-cell/feed-voltage.csv', ['frequency', 'feed_voltage'])
+
+    # The exports come from separate HFSS sweeps; resample all of them onto
+    # the samples they have in common instead of pairing them by row
+    frequencies, inputs = align_quantities(sweeps, phases=('s_phase_1', 's_phase_2'))
+    inputs['frequencies'] = frequencies * 1e9
+    return inputs
+
+
+def main():
+    antenna_name = "monopole"  # Updated name
+    diagnostics_file = None  # e.g. f"output/{antenna_name}_diagnostics.csv"
+    # Input uncertainties for confidence bands, None for point estimates only
+    moment_uncertainty = None  # e.g. {'output_power': Perturbation(0.02), 'tem_inductance': Perturbation(0.05)}
+    tem_cell = "empty_tem_cell"  # see modules.tem_cell.TEM_CELLS
+    antenna_position = None  # (x, y) in m from the septum centre, None for the chamber centre
 
-    antenna_feed_voltage = load_csv_column(f'data/{antenna_name}-tem-cell/feed-voltage.csv', 1)
+    # Load antenna, TEM cell and antenna-in-TEM-cell exports
+    inputs = load_circuit_inputs(antenna_name)
 
     # Compute dipole moments
-    m_e, m_m = compute_dipole_moments(
-        frequencies,
-        output_power,
-        phase_shift_1,
-        phase_shift_2,
-        antenna_feed_voltage,
-        antenna_tem_impedance,
-        tem_cell_capacitance,
-        tem_cell_inductance,
-        antenna_inductance,
-        antenna_capacitance
-    )
+    normalized_field = tem_cell_normalized_field(tem_cell, antenna_position)
+    m_e, m_m = compute_dipole_moments(**inputs, diagnostics_file=diagnostics_file,
+                                      normalized_field=normalized_field)
+
+    bands = None
+    if moment_uncertainty:
+        bands = compute_moment_bands(**inputs, perturbations=moment_uncertainty,
+                                     normalized_field=normalized_field)
 
     # Plot results
-    plot_dipole_moments(frequencies, m_e, m_m, antenna_name)
+    plot_dipole_moments(inputs['frequencies'], m_e, m_m, antenna_name, bands)
 
     # Save dipole moments to csv file
     output_csv = f"output/{antenna_name}_dipole_moments.csv"
-    save_dipole_moments_to_csv(frequencies, np.abs(np.multiply(m_e, 377)), np.abs(m_m), output_csv)
+    save_dipole_moments_to_csv(inputs['frequencies'], np.abs(np.multiply(m_e, 377)), np.abs(m_m), output_csv)
 
 
 if __name__ == "__main__":
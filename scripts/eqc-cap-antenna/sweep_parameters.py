@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+from calculate_moments import calc
+from main import load_circuit_inputs
+
+# The sweep engine lives with the evaluate-moments modules
+sys.path.append(str(Path(__file__).resolve().parents[1] / "evaluate-moments"))
+from modules.parameter_sweep import run_sweep
+
+# Quantities of calc() written to the store
+SWEEP_OUTPUTS = ['equ_ele_dipole_moment', 'equ_mag_dipole_moment']
+
+
+def sweep_circuit_parameters(antenna_name, store, variation=0.2, steps=11,
+                             workers=None, data_dir="data"):
+    """
+    Sweep the TEM cell and antenna L/C of the equivalent circuit.
+
+    Every element is varied by +-variation around the median of its HFSS
+    value, on a grid of steps values per element, and calc() is evaluated
+    for all combinations at all frequencies with the measured port data of
+    the antenna.
+
+    Parameters:
+    -----------
+    antenna_name : str
+        Antenna whose exports are loaded, see load_circuit_inputs().
+    store : str or Path
+        Folder receiving the results (see modules.parameter_sweep.SweepStore).
+    variation : float
+        Relative variation of the elements.
+    steps : int
+        Values per element.
+    workers : int, optional
+        Number of processes (default: one per CPU).
+
+    Returns:
+    --------
+    SweepStore
+        Dipole moments of shape (steps, steps, steps, steps, n_frequencies).
+    """
+    inputs = load_circuit_inputs(antenna_name, data_dir)
+    scale = np.linspace(1 - variation, 1 + variation, steps)
+    axes = {
+        'tem_inductance': np.median(inputs['tem_cell_inductance']) * scale,
+        'tem_capacitance': np.median(inputs['tem_cell_capacitance']) * scale,
+        'antenna_inductance': np.median(inputs['antenna_inductance']) * scale,
+        'antenna_capacitance': np.median(inputs['antenna_capacitance']) * scale,
+        'frequency': inputs['frequencies'],
+    }
+    fixed = {
+        'output_power': inputs['output_power'],
+        'output_voltage_phase_1': inputs['s_phase_1'],
+        'output_voltage_phase_2': inputs['s_phase_2'],
+        'input_voltage': inputs['feed_current'],
+        'input_impedance': inputs['tem_impedance'],
+    }
+    return run_sweep(calc, axes, SWEEP_OUTPUTS, store, fixed, workers=workers)
+
+
+def main():
+    antenna_name = "monopole"
+    sweep = sweep_circuit_parameters(antenna_name, f"output/{antenna_name}_sweep")
+
+    # Spread of the moments over all element combinations
+    print(f"{np.prod(sweep.shape)} grid points saved to {sweep.path}")
+    for name in SWEEP_OUTPUTS:
+        magnitude = np.abs(sweep[name])
+        print(f"|{name}| over the grid: min {magnitude.min():.4g}, max {magnitude.max():.4g}")
+
+
+if __name__ == "__main__":
+    main()
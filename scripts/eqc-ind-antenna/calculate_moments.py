@@ -1,31 +1,58 @@
+import sys
+from pathlib import Path
+
 import numpy as np
 import scienceplots
 
+# The diagnostics table is shared by both equivalent circuits
+sys.path.append(str(Path(__file__).resolve().parents[1] / "evaluate-moments"))
+from modules.circuit_diagnostics import diagnostics_table
+
+# Effective normalized TEM-mode field of a 50 Ohm cell, 24 mm high, under the
+# uniform-field approximation; modules.tem_cell gives it at the antenna position
+UNIFORM_NORMALIZED_FIELD = np.sqrt(50 / 2) / (24e-3 / 2)
+
 def calc(output_power, output_voltage_phase_1, output_voltage_phase_2, 
          input_voltage, input_impedance, tem_inductance,
-         tem_capacitance, antenna_inductance, antenna_capacitance, frequency):
+         tem_capacitance, antenna_inductance, antenna_capacitance, frequency,
+         diagnostics=False, normalized_field=UNIFORM_NORMALIZED_FIELD):
     """
     Calculates currents in a circuit model with two output phases.
     
+    All inputs may be scalars or NumPy arrays of equal shape (one entry per
+    frequency); the calculation is fully broadcast, so a whole sweep is
+    evaluated in a single call.
+
     Parameters:
     -----------
-    output_power : float
+    output_power : float or ndarray
         Output power in Watts.
-    output_voltage_phase_1 : float
+    output_voltage_phase_1 : float or ndarray
         Phase angle for output voltage phase 1 in radians.
-    output_voltage_phase_2 : float
+    output_voltage_phase_2 : float or ndarray
         Phase angle for output voltage phase 2 in radians.
-    input_voltage : complex
+    input_voltage : complex or ndarray
         Input voltage.
-    input_impedance : complex
+    input_impedance : complex or ndarray
         Input impedance.
-    frequency : float
+    tem_inductance, tem_capacitance : float or ndarray
+        Inductance and capacitance of the empty TEM cell.
+    antenna_inductance, antenna_capacitance : float or ndarray
+        Inductance and capacitance of the antenna in free space.
+    frequency : float or ndarray
         Frequency in Hz.
+    diagnostics : bool, optional
+        If True, the intermediate quantities are additionally collected
+        into a table (see modules.circuit_diagnostics) stored under 'diagnostics'.
+    normalized_field : float or ndarray, optional
+        Effective normalized TEM-mode field at the antenna position in V/m
+        (see modules.tem_cell.TemCell.normalized_field).
     
     Returns:
     --------
     dict
-        Dictionary containing all calculated variables.
+        Dictionary containing all calculated variables. Each value has the
+        broadcast shape of the inputs.
     """
     # Output voltages
     u_1 = np.sqrt(output_power * 50) * np.exp(1j * output_voltage_phase_1)
@@ -61,27 +88,9 @@ def calc(output_power, output_voltage_phase_1, output_voltage_phase_2,
     inductive_power = np.conj(i_la) * input_voltage * np.cos(np.angle(i_la))
     a_minus_b = induced_voltage
     # Note: Effective voltages are used here
-    equ_mag_dipole_moment = 1j * a_minus_b / (416.6666* 2 * np.pi * frequency) * 299792458 * 2 * np.pi * frequency * 1.256637 * pow(10.0,-6)
+    equ_mag_dipole_moment = 1j * a_minus_b / (normalized_field * 2 * np.pi * frequency) * 299792458 * 2 * np.pi * frequency * 1.256637 * pow(10.0,-6)
     a_plus_b = np.sqrt((i_ck * 1/50 / (1/50 + 1j * 2 * np.pi * frequency * ct))**2 * 50) 
-    equ_ele_dipole_moment = a_plus_b / 416.6666
-    variables = [i_ca, i, i_r1, i_r2, i_ct1, i_ct2, i_lt1, i_lt2, i_ck, i_la, m, equ_mag_dipole_moment, equ_ele_dipole_moment, 1e12 * ct, 1e12 * lt, 1e12 * ca, 1e12 * la, u_1, u_2, input_impedance, induced_voltage]
-    names = ['i_ca', 'i', 'i_r1', 'i_r2', 'i_ct1', 'i_ct2', 'i_lt1', 'i_lt2', 'i_ck', 'i_la', 'm', 'equ_mag_dipole_moment', 'equ_ele_dipole_moment', 'ct', 'lt', 'ca', 'la', 'u_1', 'u_2', 'input_impedance', 'induced_voltage']
-
-    print(f"======================================================\nfreq: {frequency/1e9}\n input voltage: {input_voltage}\n output power: {output_power}\noutput voltage: {np.abs(u_1)}")
-    for name, var in zip(names, variables):
-        if np.iscomplexobj(var):
-            mag = np.abs(var)
-            angle_rad = np.angle(var)
-            angle_deg = np.degrees(angle_rad)
-            print(f"{name:15}: |{mag:8.8f}| ∠{angle_deg:7.5f}° ({angle_rad:7.4f} rad)")
-        else:
-            print(f"{name:15}: {var:8.8f} (real)")
-
-    # Also print real scalars
-    print(f"inductive_power      : {inductive_power:.4f}")
-    print(f"a_minus_b           : {a_minus_b:.4f}")
-    print(f"a_plus_b            : {a_plus_b:.4f}")
-    print(f"equ_ele_dipole_moment: {equ_ele_dipole_moment:.4f}")
+    equ_ele_dipole_moment = a_plus_b / normalized_field
 
     # Collect all calculated variables
     results = {
@@ -101,23 +110,33 @@ def calc(output_power, output_voltage_phase_1, output_voltage_phase_2,
         'i_lt2': i_lt2,
         'i_ck': i_ck,
         'i_la': i_la,
+        'u_la': u_la,
         'm': m,
         'inductive_power': inductive_power,
         'a_minus_b': a_minus_b,
         'equ_mag_dipole_moment': equ_mag_dipole_moment,
         'a_plus_b': a_plus_b,
-        'equ_ele_dipole_moment': equ_ele_dipole_moment
+        'equ_ele_dipole_moment': equ_ele_dipole_moment,
+        'induced_voltage': induced_voltage
     }
+
+    if diagnostics:
+        results['diagnostics'] = diagnostics_table(frequency, {
+            **results,
+            'output_power': output_power,
+            'input_voltage': input_voltage,
+            'input_impedance': input_impedance,
+        })
     
     return results
 
+
 # Example usage and output of all variables
 if __name__ == "__main__":
     results = calc(1.4709888e-5, np.deg2rad(-56.86),
                    np.deg2rad(-244.2), 3.66, 
-                   13.91 * np.exp(89.9984), 16.62e-9, 6.57e-12, 2.15e-9, 38.36e-15, 1e9)
+                   13.91 * np.exp(89.9984), 16.62e-9, 6.57e-12, 2.15e-9, 38.36e-15, 1e9,
+                   diagnostics=True)
     
     print("Calculated variables:")
-    for name, value in results.items():
-        print(f"{name}: {np.abs(value)} ∠ {np.degrees(np.angle(value))}°")
-
+    print(results.pop('diagnostics').T.to_string(header=False))
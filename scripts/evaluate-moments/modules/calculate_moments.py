@@ -1,11 +1,13 @@
 import numpy as np
-import csv
 
 
 def calculate_moments(e_field: complex, phase_shift: float, 
                                    output_power: float, frequency: float) -> tuple[np.ndarray, np.ndarray]:
     """
     Calculate electric (m_ez) and magnetic (m_hfss) moments for antenna analysis.
+
+    Pure computation without file output; use a sink from moment_sinks to
+    store the result.
     
     Args:
         e_field: Complex electric field value
@@ -16,6 +18,22 @@ def calculate_moments(e_field: complex, phase_shift: float,
     Returns:
         Tuple of absolute electric and magnetic moments
     """
+    m_electric, m_magnetic = calculate_complex_moments(e_field, phase_shift,
+                                                       output_power, frequency)
+    return np.abs(m_electric), np.abs(m_magnetic)
+
+
+def calculate_complex_moments(e_field: complex, phase_shift: float,
+                              output_power: float, frequency: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculate the complex electric and magnetic moments.
+
+    Same as calculate_moments, but keeping the phase (referenced to the
+    waveport 1 wave), e.g. for rational fitting over frequency.
+
+    Returns:
+        Tuple of complex electric and magnetic moments
+    """
     # Physical constants
     speed_of_light = 299792458.0  # m/s
     mu_0 = 1.256637e-6            # H/m (permeability of free space)
@@ -28,16 +46,12 @@ def calculate_moments(e_field: complex, phase_shift: float,
     b = 2 * output_power * np.exp(1j * phase_shift)
     
     # Electric moment (z-component)
-    m_electric = np.abs((a + b) / e_field)
+    m_electric = (a + b) / e_field
     
     # Magnetic moment calculation
     m_magnetic_intermediate = 1j * (a - b) / (e_field * wave_number)
-    m_magnetic = np.abs(1j * m_magnetic_intermediate * 2 * np.pi * frequency * mu_0)
+    m_magnetic = 1j * m_magnetic_intermediate * 2 * np.pi * frequency * mu_0
     
-    data = np.column_stack((frequency/1e9, m_electric * 377, m_magnetic))
-    np.savetxt('output/csv/dipole-moments.csv', data, delimiter=',',
-           header='Frequency (GHz),Electric Dipole Moment * 377 (Vm),Magnetic Dipole Moment (Vm)')
-
     return m_electric, m_magnetic
 
 
@@ -48,7 +62,8 @@ if __name__ == "__main__":
     test_power = 1.0
     test_freq = 1000e6  # 1 GHz
     
-    m_e, m_h = calculate_electromagnetic_moments(
+    m_e, m_h = calculate_moments(
         test_e_field, test_phase_shift, test_power, test_freq
     )
+    print(f"m_e * 377 = {m_e * 377}, m_m = {m_h}")
 
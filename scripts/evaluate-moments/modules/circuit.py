@@ -0,0 +1,290 @@
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+# Name of the reference node
+GROUND = "0"
+
+# Supported two-terminal elements (SPICE prefixes)
+COMPONENT_KINDS = {"R": "resistor", "C": "capacitor", "L": "inductor",
+                   "V": "voltage source", "I": "current source"}
+
+# Upper bound of matrix entries assembled at once; larger sweeps are solved in chunks
+_CHUNK_ENTRIES = 1 << 23
+
+Value = Union[float, complex, np.ndarray]
+
+
+@dataclass(frozen=True)
+class Component:
+    """
+    Two-terminal element between node_plus and node_minus.
+
+    The value (Ohm, F, H, or the complex AC amplitude of a source) may be
+    an array, e.g. a frequency-dependent inductance or a parameter sweep;
+    it is broadcast against the frequencies in Circuit.solve.
+
+    Attributes:
+        name: Instance name, the first letter gives the kind ('R1', 'L2', 'V1')
+        kind: One of COMPONENT_KINDS
+        node_plus: Node the positive current flows in from
+        node_minus: Node the positive current flows out to
+        value: Component value
+    """
+    name: str
+    kind: str
+    node_plus: str
+    node_minus: str
+    value: Value
+
+
+@dataclass(frozen=True)
+class Coupling:
+    """
+    Magnetic coupling of two inductors.
+
+    Attributes:
+        name: Instance name (e.g. 'K1')
+        inductors: Names of the coupled inductors
+        value: Coupling coefficient k (SPICE K element) or mutual inductance M in H
+        is_coefficient: True if value is k, M = k sqrt(L1 L2)
+    """
+    name: str
+    inductors: Tuple[str, str]
+    value: Value
+    is_coefficient: bool = True
+
+
+class Circuit:
+    """
+    Linear circuit solved by modified nodal analysis (MNA).
+
+    Unknowns are the voltages of all nodes except GROUND and the currents
+    of voltage sources and inductors, so coupled inductors enter as
+    mutual-inductance entries. For every frequency the system
+
+        (G + j omega B) x = b
+
+    is assembled from frequency-independent stamps and all frequencies are
+    solved by one batched np.linalg.solve.
+
+    Currents follow the SPICE convention: a component's current flows from
+    node_plus through the component to node_minus (for a voltage source:
+    into its positive terminal), as reported by LTspice for I(<name>).
+    """
+
+    def __init__(self, title: str = ""):
+        self.title = title
+        self.components: Dict[str, Component] = {}
+        self.couplings: Dict[str, Coupling] = {}
+
+    def add(self, name: str, node_plus: str, node_minus: str, value: Value) -> Component:
+        """Add an R, C, L, V or I element; the kind is taken from the first letter of name."""
+        kind = name[:1].upper()
+        if kind not in COMPONENT_KINDS:
+            raise ValueError(f"Unsupported component '{name}', expected one of {list(COMPONENT_KINDS)}")
+        if name in self.components or name in self.couplings:
+            raise ValueError(f"Duplicate component name '{name}'")
+        component = Component(name, kind, str(node_plus), str(node_minus), value)
+        self.components[name] = component
+        return component
+
+    def couple(self, name: str, inductor_1: str, inductor_2: str,
+               coefficient: Optional[Value] = None,
+               mutual_inductance: Optional[Value] = None) -> Coupling:
+        """Couple two inductors by coefficient k or by mutual inductance M (H)."""
+        if (coefficient is None) == (mutual_inductance is None):
+            raise ValueError("Give either the coupling coefficient or the mutual inductance")
+        for inductor in (inductor_1, inductor_2):
+            component = self.components.get(inductor)
+            if component is None or component.kind != "L":
+                raise KeyError(f"No inductor '{inductor}' in the circuit")
+        if coefficient is not None:
+            coupling = Coupling(name, (inductor_1, inductor_2), coefficient, True)
+        else:
+            coupling = Coupling(name, (inductor_1, inductor_2), mutual_inductance, False)
+        self.couplings[name] = coupling
+        return coupling
+
+    def __getitem__(self, name: str) -> Component:
+        return self.components[name]
+
+    @property
+    def nodes(self) -> List[str]:
+        """All nodes except GROUND, in order of first use."""
+        nodes = {}
+        for component in self.components.values():
+            nodes.setdefault(component.node_plus)
+            nodes.setdefault(component.node_minus)
+        nodes.pop(GROUND, None)
+        return list(nodes)
+
+    def with_values(self, **values: Value) -> "Circuit":
+        """Copy of the circuit with the values of some components or couplings replaced."""
+        circuit = Circuit(self.title)
+        for name, component in self.components.items():
+            circuit.components[name] = replace(component, value=values.pop(name, component.value))
+        for name, coupling in self.couplings.items():
+            circuit.couplings[name] = replace(coupling, value=values.pop(name, coupling.value))
+        if values:
+            raise KeyError(f"No components {sorted(values)} in the circuit")
+        return circuit
+
+    def solve(self, frequency: Value) -> "CircuitSolution":
+        """
+        Solve the circuit for all frequencies (and value variations) at once.
+
+        Args:
+            frequency: Frequencies in Hz; broadcast together with all
+                array-valued components (e.g. shape (F,) with values of
+                shape (P, 1) solves P variants at F frequencies)
+
+        Returns:
+            CircuitSolution with node voltages and branch currents of the
+            broadcast shape
+
+        Raises:
+            numpy.linalg.LinAlgError: If the circuit is singular (e.g. a
+                floating node or a loop of voltage sources and inductors)
+        """
+        nodes = self.nodes
+        node_index = {node: i for i, node in enumerate(nodes)}
+        branches = [c for c in self.components.values() if c.kind in ("V", "L")]
+        branch_index = {c.name: len(nodes) + i for i, c in enumerate(branches)}
+        size = len(nodes) + len(branches)
+
+        omega = 2 * np.pi * np.asarray(frequency, dtype=float)
+        values = {name: np.asarray(c.value) for name, c in self.components.items()}
+        mutual = self._mutual_inductances(values)
+        shape = np.broadcast_shapes(omega.shape, *(v.shape for v in values.values()),
+                                    *(m.shape for _, _, m in mutual))
+        count = int(np.prod(shape))
+
+        flat = lambda value: np.broadcast_to(value, shape).reshape(-1)
+        omega = flat(omega)
+        values = {name: flat(value) for name, value in values.items()}
+        mutual = [(a, b, flat(m)) for a, b, m in mutual]
+
+        solution = np.empty((count, size), dtype=np.complex128)
+        chunk = max(1, _CHUNK_ENTRIES // (size * size))
+        for start in range(0, count, chunk):
+            part = slice(start, min(start + chunk, count))
+            matrix, rhs = self._assemble(node_index, branch_index, size, omega[part],
+                                         {name: value[part] for name, value in values.items()},
+                                         [(a, b, m[part]) for a, b, m in mutual])
+            solution[part] = np.linalg.solve(matrix, rhs[..., None])[..., 0]
+
+        voltages = {node: solution[:, i].reshape(shape) for node, i in node_index.items()}
+        result = CircuitSolution(np.broadcast_to(np.asarray(frequency, dtype=float), shape), voltages, {})
+        for name, component in self.components.items():
+            if name in branch_index:
+                current = solution[:, branch_index[name]]
+            elif component.kind == "I":
+                current = values[name].astype(np.complex128)
+            else:
+                drop = result.voltage(component.node_plus, component.node_minus).reshape(-1)
+                current = drop / values[name] if component.kind == "R" else drop * 1j * omega * values[name]
+            result.currents[name] = current.reshape(shape)
+        return result
+
+    def _mutual_inductances(self, values: Dict[str, np.ndarray]) -> List[Tuple[str, str, np.ndarray]]:
+        """(inductor, inductor, M) per coupling."""
+        mutual = []
+        for coupling in self.couplings.values():
+            first, second = coupling.inductors
+            m = np.asarray(coupling.value)
+            if coupling.is_coefficient:
+                m = m * np.sqrt(values[first] * values[second])
+            mutual.append((first, second, m))
+        return mutual
+
+    def _assemble(self, node_index, branch_index, size, omega, values, mutual):
+        """MNA matrices (n, size, size) and right-hand sides (n, size) for n frequencies."""
+        matrix = np.zeros((omega.size, size, size), dtype=np.complex128)
+        rhs = np.zeros((omega.size, size), dtype=np.complex128)
+        s = 1j * omega
+
+        for name, component in self.components.items():
+            plus = node_index.get(component.node_plus)
+            minus = node_index.get(component.node_minus)
+            value = values[name]
+            if component.kind in ("R", "C"):
+                admittance = 1 / value if component.kind == "R" else s * value
+                for i, j, sign in ((plus, plus, 1), (minus, minus, 1), (plus, minus, -1), (minus, plus, -1)):
+                    if i is not None and j is not None:
+                        matrix[:, i, j] += sign * admittance
+            elif component.kind == "I":
+                # Current leaves node_plus through the source and enters node_minus
+                if plus is not None:
+                    rhs[:, plus] -= value
+                if minus is not None:
+                    rhs[:, minus] += value
+            else:
+                k = branch_index[name]
+                for node, sign in ((plus, 1), (minus, -1)):
+                    if node is not None:
+                        matrix[:, node, k] += sign
+                        matrix[:, k, node] += sign
+                if component.kind == "V":
+                    rhs[:, k] = value
+                else:
+                    matrix[:, k, k] -= s * value
+
+        for first, second, m in mutual:
+            i, j = branch_index[first], branch_index[second]
+            matrix[:, i, j] -= s * m
+            matrix[:, j, i] -= s * m
+        return matrix, rhs
+
+
+class CircuitSolution:
+    """
+    Node voltages and branch currents of a solved circuit.
+
+    Attributes:
+        frequency: Frequencies in Hz, broadcast to the solution shape
+        voltages: Complex voltage per node (GROUND is 0)
+        currents: Complex current per component (SPICE direction)
+    """
+
+    def __init__(self, frequency: np.ndarray, voltages: Dict[str, np.ndarray],
+                 currents: Dict[str, np.ndarray]):
+        self.frequency = frequency
+        self.voltages = voltages
+        self.currents = currents
+
+    @property
+    def axis(self) -> np.ndarray:
+        """Frequencies in Hz (same role as RawFile.axis)."""
+        return self.frequency
+
+    def voltage(self, node_plus: str, node_minus: str = GROUND) -> np.ndarray:
+        """Voltage between two nodes."""
+        return self._potential(node_plus) - self._potential(node_minus)
+
+    def current(self, name: str) -> np.ndarray:
+        """Current through a component, from its node_plus to its node_minus."""
+        try:
+            return self.currents[name]
+        except KeyError:
+            raise KeyError(f"No component '{name}' in the circuit") from None
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """LTspice-style access: 'V(node)', 'V(a,b)' or 'I(component)'."""
+        kind, _, argument = name.partition("(")
+        arguments = [part.strip() for part in argument.rstrip(")").split(",")]
+        if kind.upper() == "V" and 1 <= len(arguments) <= 2:
+            return self.voltage(*arguments)
+        if kind.upper() == "I" and len(arguments) == 1:
+            return self.current(arguments[0])
+        raise KeyError(f"Expected 'V(node)', 'V(a,b)' or 'I(component)', got '{name}'")
+
+    def _potential(self, node: str) -> np.ndarray:
+        if node == GROUND:
+            return np.zeros(self.frequency.shape, dtype=np.complex128)
+        try:
+            return self.voltages[node]
+        except KeyError:
+            raise KeyError(f"No node '{node}' in the circuit") from None
@@ -0,0 +1,65 @@
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+
+# Intermediate quantities of the equivalent-circuit calc() functions, in
+# table column order; each circuit provides a subset
+DIAGNOSTIC_QUANTITIES = [
+    'output_power', 'input_voltage', 'i_ca', 'input_current', 'i', 'i_r1', 'i_r2',
+    'i_ct1', 'i_ct2', 'i_lt1', 'i_lt2', 'i_ck', 'i_la', 'm',
+    'equ_mag_dipole_moment', 'equ_ele_dipole_moment', 'ct', 'lt', 'ca', 'la',
+    'u_ca', 'u_la', 'u_1', 'u_2', 'input_impedance', 'induced_voltage',
+    'inductive_power', 'a_minus_b', 'a_plus_b'
+]
+
+# Quantities stored in a smaller unit: name -> (column name, factor)
+DIAGNOSTIC_UNITS = {
+    'ct': ('ct_pF', 1e12),
+    'lt': ('lt_pH', 1e12),
+    'ca': ('ca_pF', 1e12),
+    'la': ('la_pH', 1e12),
+}
+
+
+def diagnostics_table(frequency, quantities: Dict[str, object]) -> pd.DataFrame:
+    """
+    Collect the intermediate circuit quantities into a columnar table.
+
+    Quantities of DIAGNOSTIC_QUANTITIES missing from quantities are left
+    out. Capacitances and inductances are stored in pF and pH, as in the
+    former printout of calc().
+
+    The frequency and all quantities are broadcast against each other,
+    so a scalar frequency with array element values (a component sweep)
+    works as well as a frequency sweep. The common shape is flattened
+    (C order) to one row per entry.
+
+    Args:
+        frequency: Frequency in Hz, scalar or array
+        quantities: Quantity name -> scalar or array, e.g. the result
+            dictionary of calc() extended by the circuit inputs
+
+    Returns:
+        One row per entry of the broadcast shape. Complex quantities are
+        split into '<name>_mag', '<name>_deg' and '<name>_rad' columns,
+        real quantities are stored as they are.
+    """
+    names = [name for name in DIAGNOSTIC_QUANTITIES if name in quantities]
+    shape = np.broadcast_shapes(np.shape(frequency), *(np.shape(quantities[name]) for name in names))
+    shape = shape or (1,)
+    columns = {'frequency': np.broadcast_to(frequency, shape).ravel()}
+    for name in names:
+        value = np.broadcast_to(quantities[name], shape).ravel()
+        if name in DIAGNOSTIC_UNITS:
+            name, factor = DIAGNOSTIC_UNITS[name]
+            value = value * factor
+        if np.iscomplexobj(value):
+            angle_rad = np.angle(value)
+            columns[f'{name}_mag'] = np.abs(value)
+            columns[f'{name}_deg'] = np.degrees(angle_rad)
+            columns[f'{name}_rad'] = angle_rad
+        else:
+            columns[name] = value
+    return pd.DataFrame(columns)
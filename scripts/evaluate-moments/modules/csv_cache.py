@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+
+# Set to False to always parse the text exports
+CACHE_ENABLED = True
+
+# Bumped whenever the layout of the cached arrays changes
+_CACHE_VERSION = 1
+
+
+def read_cached_table(csv_path: Path, skiprows: int,
+                      parse: Callable[[Path, int], np.ndarray]) -> np.ndarray:
+    """
+    Return the parsed table of a CSV export, using a binary cache next to it.
+
+    The cache consists of '.<name>.npy' holding the parsed array and
+    '.<name>.json' holding the file size, modification time and SHA-256 hash
+    of the CSV it was built from. If size and mtime still match, the array is
+    memory-mapped without touching the CSV. If only the mtime changed, the
+    hash decides whether the content is still the same. Otherwise the CSV is
+    parsed again and the cache rewritten.
+
+    Args:
+        csv_path: Path to CSV file
+        skiprows: Number of rows skipped at the beginning when parsing
+        parse: Function parsing the CSV into a 2-D array, called on a miss
+
+    Returns:
+        Read-only 2-D array (memory-mapped on a cache hit)
+    """
+    csv_path = Path(csv_path)
+    if not CACHE_ENABLED:
+        return parse(csv_path, skiprows)
+
+    array_path, meta_path = cache_paths(csv_path)
+    stat = csv_path.stat()
+    meta = _read_meta(meta_path)
+
+    if (meta is not None and array_path.exists()
+            and meta.get("version") == _CACHE_VERSION
+            and meta.get("skiprows") == skiprows
+            and meta.get("size") == stat.st_size):
+        if meta.get("mtime_ns") == stat.st_mtime_ns:
+            return np.load(array_path, mmap_mode="r")
+        # Touched but possibly unchanged (e.g. checkout or copy)
+        if meta.get("sha256") == _file_hash(csv_path):
+            meta["mtime_ns"] = stat.st_mtime_ns
+            try:
+                write_atomic(meta_path, lambda f: f.write(json.dumps(meta).encode()))
+            except OSError:
+                pass
+            return np.load(array_path, mmap_mode="r")
+
+    table = parse(csv_path, skiprows)
+    meta = {
+        "version": _CACHE_VERSION,
+        "skiprows": skiprows,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": _file_hash(csv_path),
+    }
+    try:
+        # Array first: the metadata file is what marks the cache as valid
+        write_atomic(array_path, lambda f: np.save(f, table))
+        write_atomic(meta_path, lambda f: f.write(json.dumps(meta).encode()))
+    except OSError:
+        # Read-only result folders simply run without a cache
+        pass
+    return table
+
+
+def cache_paths(csv_path: Path) -> tuple[Path, Path]:
+    """Return the paths of the cached array and its metadata for a CSV file."""
+    csv_path = Path(csv_path)
+    return (csv_path.with_name(f".{csv_path.name}.npy"),
+            csv_path.with_name(f".{csv_path.name}.json"))
+
+
+def write_atomic(path: Path, write: Callable) -> None:
+    """
+    Write a file via a temporary file in the same folder and rename it.
+
+    Readers therefore never see a partly written file.
+
+    Args:
+        path: File to write
+        write: Function writing the content to a binary file object
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def _read_meta(meta_path: Path):
+    """Read cache metadata, returning None if it is missing or unreadable."""
+    try:
+        return json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _file_hash(path: Path) -> str:
+    """SHA-256 hex digest of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,213 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+# Models accepted by fit_curves
+MODELS = ('poly', 'rational', 'exp')
+
+
+@dataclass
+class FitResult:
+    """
+    Fitted model for a batch of series sharing the same x values.
+
+    The model is evaluated in the scaled variable t = (x - offset) / scale,
+    which maps the fitted x range to [-1, 1] and keeps the least-squares
+    problem well conditioned.
+
+    Attributes:
+        model: 'poly', 'rational' or 'exp'
+        order: (numerator order, denominator order) for 'rational', (order,) otherwise
+        coefficients: Parameters in t, shape (n_series, n_parameters), lowest
+            power first; for 'rational' the numerator followed by the
+            denominator without its constant 1, for 'exp' (ln a, b) of
+            a * exp(b * t)
+        offset: Center of the fitted x range
+        scale: Half width of the fitted x range
+        rmse: Root-mean-square residual per series
+    """
+    model: str
+    order: tuple
+    coefficients: np.ndarray
+    offset: float
+    scale: float
+    rmse: np.ndarray
+
+    def evaluate(self, x) -> np.ndarray:
+        """Evaluate all fitted series at x; returns shape (n_series, len(x))."""
+        t = (np.asarray(x, dtype=float) - self.offset) / self.scale
+        if self.model == 'poly':
+            return self.coefficients @ np.polynomial.polynomial.polyvander(t, self.order[0]).T
+        if self.model == 'rational':
+            n, m = self.order
+            numerator = self.coefficients[:, :n + 1] @ np.polynomial.polynomial.polyvander(t, n).T
+            denominator = 1 + self.coefficients[:, n + 1:] @ np.polynomial.polynomial.polyvander(t, m)[:, 1:].T
+            return numerator / denominator
+        return np.exp(self.coefficients[:, :1] + self.coefficients[:, 1:] * t)
+
+    def coefficients_in_x(self) -> np.ndarray:
+        """
+        Parameters expressed in the unscaled x, lowest power first.
+
+        'poly': polynomial coefficients; 'rational': numerator and
+        denominator coefficients normalized to a constant denominator term
+        of 1; 'exp': (a, b) of a * exp(b * x).
+        """
+        domain = [self.offset - self.scale, self.offset + self.scale]
+        if self.model == 'poly':
+            return np.array([_convert(c, domain, self.order[0]) for c in self.coefficients])
+        if self.model == 'rational':
+            n, m = self.order
+            rows = []
+            for c in self.coefficients:
+                numerator = _convert(c[:n + 1], domain, n)
+                denominator = _convert(np.concatenate(([1.0], c[n + 1:])), domain, m)
+                rows.append(np.concatenate((numerator, denominator[1:])) / denominator[0])
+            return np.array(rows)
+        b = self.coefficients[:, 1] / self.scale
+        a = np.exp(self.coefficients[:, 0] - b * self.offset)
+        return np.column_stack((a, b))
+
+    def parameter_names(self) -> List[str]:
+        """Names of the columns of coefficients_in_x()."""
+        if self.model == 'poly':
+            return [f'c{k}' for k in range(self.order[0] + 1)]
+        if self.model == 'rational':
+            n, m = self.order
+            return [f'a{k}' for k in range(n + 1)] + [f'b{k}' for k in range(1, m + 1)]
+        return ['a', 'b']
+
+
+def fit_curves(x, y, model: str = 'poly', order: Union[int, Tuple[int, int]] = 2) -> FitResult:
+    """
+    Fit one model to many series sharing the same x values at once.
+
+    Polynomials and the exponential (fitted to ln y) are linear in their
+    parameters and solved for all series in a single least-squares call.
+    Rational functions are linearized (y * Q(t) = P(t)) and solved as one
+    stacked batch.
+
+    Args:
+        x: Shared x values, shape (n_points,)
+        y: Series to fit, shape (n_series, n_points) or (n_points,)
+        model: 'poly', 'rational' or 'exp'
+        order: Polynomial order; for 'rational' (numerator, denominator)
+            order or one int used for both. Ignored for 'exp'.
+
+    Returns:
+        FitResult with the fitted parameters of all series
+
+    Raises:
+        ValueError: For an unknown model, too few points or non-positive
+            data with 'exp'
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown fit model '{model}', expected one of {MODELS}")
+    x = np.asarray(x, dtype=float)
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+
+    # Points where any series is undefined are left out for all series
+    valid = np.isfinite(x) & np.all(np.isfinite(y), axis=0)
+    x, y = x[valid], y[:, valid]
+
+    offset = (np.max(x) + np.min(x)) / 2
+    scale = (np.max(x) - np.min(x)) / 2 or 1.0
+    t = (x - offset) / scale
+
+    if model == 'poly':
+        order = (int(order),)
+        coefficients = _lstsq(np.polynomial.polynomial.polyvander(t, order[0]), y)
+    elif model == 'exp':
+        order = (1,)
+        if np.any(y <= 0):
+            raise ValueError("The 'exp' model requires positive data")
+        coefficients = _lstsq(np.polynomial.polynomial.polyvander(t, 1), np.log(y))
+    else:
+        order = (order, order) if np.isscalar(order) else tuple(order)
+        coefficients = _fit_rational(t, y, *order)
+
+    result = FitResult(model, order, coefficients, offset, scale, np.zeros(len(y)))
+    result.rmse = np.sqrt(np.mean((result.evaluate(x) - y) ** 2, axis=1))
+    return result
+
+
+def fit_series(x_list: Sequence[np.ndarray], y_list: Sequence[np.ndarray], model: str = 'poly',
+               order: Union[int, Tuple[int, int]] = 2) -> List[Tuple[FitResult, int]]:
+    """
+    Fit series that may have different x values.
+
+    Series with identical x values are fitted together in one batch.
+
+    Args:
+        x_list: x values per series
+        y_list: y values per series
+        model: See fit_curves
+        order: See fit_curves
+
+    Returns:
+        (FitResult, row) per series; row selects the series in the result
+    """
+    groups: Dict[tuple, List[int]] = {}
+    for i, x in enumerate(x_list):
+        x = np.asarray(x, dtype=float)
+        groups.setdefault((x.shape, x.tobytes()), []).append(i)
+
+    fits = [None] * len(x_list)
+    for indices in groups.values():
+        result = fit_curves(x_list[indices[0]], np.vstack([y_list[i] for i in indices]),
+                            model, order)
+        for row, i in enumerate(indices):
+            fits[i] = (result, row)
+    return fits
+
+
+def write_fit_coefficients(output_path: str, labels: Optional[Sequence[str]],
+                           fits: List[Tuple[FitResult, int]]) -> None:
+    """
+    Write the fitted parameters (in unscaled x) of several series to CSV.
+
+    Args:
+        output_path: CSV file to write
+        labels: Series labels; missing labels are replaced by the series index
+        fits: (FitResult, row) per series, as returned by fit_series
+    """
+    labels = list(labels or [])
+    records = []
+    for i, (result, row) in enumerate(fits):
+        record = {'series': labels[i] if i < len(labels) else str(i),
+                  'model': result.model,
+                  'order': '/'.join(str(k) for k in result.order),
+                  'rmse': result.rmse[row]}
+        record.update(zip(result.parameter_names(), result.coefficients_in_x()[row]))
+        records.append(record)
+    pd.DataFrame(records).to_csv(output_path, index=False)
+
+
+def _lstsq(design: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Solve design @ c = y for all rows of y at once; returns shape (n_series, n_parameters)."""
+    return np.linalg.lstsq(design, y.T, rcond=None)[0].T
+
+
+def _fit_rational(t: np.ndarray, y: np.ndarray, n: int, m: int) -> np.ndarray:
+    """Linearized rational fit of all series, solved as one stacked batch."""
+    # Normalize each series so that the stacked systems are equally scaled
+    y_scale = np.max(np.abs(y), axis=1, keepdims=True)
+    y_scale[y_scale == 0] = 1.0
+    y_norm = y / y_scale
+
+    numerator = np.polynomial.polynomial.polyvander(t, n)
+    denominator = np.polynomial.polynomial.polyvander(t, m)[:, 1:]
+    design = np.concatenate((np.broadcast_to(numerator, (len(y),) + numerator.shape),
+                             -y_norm[:, :, None] * denominator), axis=2)
+    coefficients = (np.linalg.pinv(design) @ y_norm[:, :, None])[:, :, 0]
+    coefficients[:, :n + 1] *= y_scale
+    return coefficients
+
+
+def _convert(coefficients: np.ndarray, domain: Sequence[float], order: int) -> np.ndarray:
+    """Coefficients of a polynomial in t re-expressed in x, padded to order + 1 terms."""
+    converted = np.polynomial.Polynomial(coefficients, domain=domain, window=[-1, 1]).convert().coef
+    return np.pad(converted, (0, order + 1 - len(converted)))
@@ -0,0 +1,304 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Sequence, Tuple
+
+import numpy as np
+
+from .parameter_sweep import SweepStore, create_store, write_manifest
+from .tem_cell import VACUUM_IMPEDANCE
+from .vector_moments import SPEED_OF_LIGHT
+
+
+# Moment sets (antennas x frequencies) x directions evaluated at once
+DEFAULT_CHUNK_SIZE = 1 << 22
+
+# Quantities of a pattern cube and their storage types
+PATTERN_QUANTITIES = {
+    'e_theta': np.complex64,
+    'e_phi': np.complex64,
+    'intensity': np.float32,
+}
+
+
+@dataclass(frozen=True)
+class SphereGrid:
+    """
+    Directions (theta, phi) with quadrature weights over the unit sphere.
+
+    Attributes:
+        theta: Polar angles in rad, measured from the z axis
+        phi: Azimuth angles in rad
+        weights: Solid angle of each direction in sr, shape (len(theta),
+            len(phi)); they sum to 4 pi
+    """
+    theta: np.ndarray
+    phi: np.ndarray
+    weights: np.ndarray
+
+    @classmethod
+    def regular(cls, n_theta: int = 181, n_phi: int = 360) -> 'SphereGrid':
+        """
+        Equally spaced grid including both poles, e.g. 1 degree steps.
+
+        The weights are the trapezoidal rule in theta (times sin theta) and
+        in phi; the error of integrals drops with the square of the step.
+        """
+        theta = np.linspace(0, np.pi, n_theta)
+        phi = np.arange(n_phi) * 2 * np.pi / n_phi
+        step = np.full(n_theta, np.pi / (n_theta - 1))
+        step[[0, -1]] /= 2
+        weights = (step * np.sin(theta))[:, None] * np.full(n_phi, 2 * np.pi / n_phi)
+        # Scale the small error of the rule away so a constant integrates to 4 pi
+        return cls(theta, phi, weights * 4 * np.pi / weights.sum())
+
+    @classmethod
+    def gauss(cls, n_theta: int = 8, n_phi: int = 16) -> 'SphereGrid':
+        """
+        Gauss-Legendre nodes in cos(theta), equally spaced phi.
+
+        Dipole patterns are polynomials of second degree in the direction
+        cosines, so already 2 x 3 directions integrate them exactly.
+        """
+        nodes, node_weights = np.polynomial.legendre.leggauss(n_theta)
+        theta = np.arccos(nodes[::-1])
+        phi = np.arange(n_phi) * 2 * np.pi / n_phi
+        weights = node_weights[::-1, None] * np.full(n_phi, 2 * np.pi / n_phi)
+        return cls(theta, phi, weights)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.theta.size, self.phi.size
+
+    def unit_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Unit vectors theta-hat and phi-hat of all directions, each of shape (3, n_theta * n_phi)."""
+        theta, phi = np.meshgrid(self.theta, self.phi, indexing='ij')
+        theta, phi = theta.reshape(-1), phi.reshape(-1)
+        theta_hat = np.stack([np.cos(theta) * np.cos(phi), np.cos(theta) * np.sin(phi), -np.sin(theta)])
+        phi_hat = np.stack([-np.sin(phi), np.cos(phi), np.zeros_like(phi)])
+        return theta_hat, phi_hat
+
+
+def far_field(m_e, m_m, frequency, grid: SphereGrid,
+              chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Far field of co-located electric and magnetic dipoles.
+
+    r E = -j k / (4 pi) e^{-jkr} [Z0 (m_e x r) x r + m_m x r] in effective
+    values, or per component
+
+        r E_theta = -j k / (4 pi) (Z0 m_e . theta_hat + m_m . phi_hat)
+        r E_phi   = -j k / (4 pi) (Z0 m_e . phi_hat - m_m . theta_hat)
+
+    (the propagation phase e^{-jkr} is omitted).
+
+    Args:
+        m_e: Electric moment vectors in A m, shape (..., n_frequencies, 3),
+            any leading axes (e.g. antennas)
+        m_m: Magnetic moment vectors in V m, same shape
+        frequency: Frequencies in Hz, broadcast against m_e.shape[:-1]
+        grid: Directions to evaluate
+        chunk_size: Moment sets x directions per block
+
+    Returns:
+        Tuple of r E_theta and r E_phi in V, shape (..., n_frequencies,
+        n_theta, n_phi)
+    """
+    m_e, frequency, m_m = _broadcast_moments(m_e, m_m, frequency)
+    shape = m_e.shape[:-1] + grid.shape
+    m_e, m_m, frequency = m_e.reshape(-1, 3), m_m.reshape(-1, 3), frequency.reshape(-1)
+    basis = _field_basis(grid)
+    e_theta = np.empty((frequency.size, basis.shape[1] // 2), dtype=complex)
+    e_phi = np.empty_like(e_theta)
+    for part in _blocks(frequency.size, basis.shape[1], chunk_size):
+        e_theta[part], e_phi[part] = _field_rows(m_e[part], m_m[part], frequency[part], basis)
+    return e_theta.reshape(shape), e_phi.reshape(shape)
+
+
+def radiation_intensity(m_e, m_m, frequency, grid: SphereGrid,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Radiated power per solid angle in W/sr.
+
+    Evaluated as the quadratic form of _intensity_coefficients, without
+    forming the field components.
+
+    Returns:
+        Intensity of shape (..., n_frequencies, n_theta, n_phi)
+    """
+    coefficients, sets_shape = _intensity_coefficients(m_e, m_m, frequency)
+    monomials = _direction_monomials(grid)
+    intensity = np.empty((coefficients.shape[0], monomials.shape[1]))
+    for part in _blocks(coefficients.shape[0], monomials.shape[1], chunk_size):
+        intensity[part] = coefficients[part] @ monomials
+    return intensity.reshape(sets_shape + grid.shape)
+
+
+def total_radiated_power(m_e, m_m, frequency, grid: SphereGrid = None) -> np.ndarray:
+    """
+    Radiated power in W by quadrature of the radiation intensity.
+
+    The quadrature weights are applied to the direction monomials once, so
+    the power of every moment set is a dot product of length 9. With the
+    default Gauss grid the result is exact and agrees with the closed form
+    vector_moments.radiated_power; other grids (e.g. those of a pattern
+    cube) give the power seen by their quadrature.
+
+    Returns:
+        Power of shape (..., n_frequencies)
+    """
+    grid = grid or SphereGrid.gauss()
+    coefficients, sets_shape = _intensity_coefficients(m_e, m_m, frequency)
+    return (coefficients @ (_direction_monomials(grid) @ grid.weights.reshape(-1))).reshape(sets_shape)
+
+
+def peak_field_strength(m_e, m_m, frequency, distance: float = 3.0, grid: SphereGrid = None,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Largest field strength over all directions in the far field.
+
+    Args:
+        distance: Distance from the antenna in m
+        grid: Directions searched, 1 degree steps by default
+
+    Returns:
+        Effective field strength in V/m, shape (..., n_frequencies)
+    """
+    grid = grid or SphereGrid.regular()
+    coefficients, sets_shape = _intensity_coefficients(m_e, m_m, frequency)
+    monomials = _direction_monomials(grid)
+    peak = np.empty(coefficients.shape[0])
+    for part in _blocks(coefficients.shape[0], monomials.shape[1], chunk_size):
+        peak[part] = np.max(coefficients[part] @ monomials, axis=-1)
+    return np.sqrt(np.maximum(peak, 0) * VACUUM_IMPEDANCE).reshape(sets_shape) / distance
+
+
+def write_pattern_cube(store: Path, m_e, m_m, frequency, grid: SphereGrid,
+                       quantities: Sequence[str] = ('intensity',),
+                       chunk_size: int = DEFAULT_CHUNK_SIZE) -> SweepStore:
+    """
+    Write the far-field pattern of one antenna as memory-mappable cubes.
+
+    The store has the layout of parameter_sweep (axes 'frequency', 'theta'
+    and 'phi'), so SweepStore opens every quantity as a read-only memory
+    map of shape (n_frequencies, n_theta, n_phi). Blocks of frequencies are
+    written as they are evaluated; the whole pattern is never in memory.
+
+    Args:
+        store: Folder of the cubes (created; existing cubes are overwritten)
+        m_e, m_m: Moment vectors of shape (n_frequencies, 3)
+        frequency: Frequencies in Hz
+        grid: Directions of the pattern
+        quantities: Names of PATTERN_QUANTITIES to store
+        chunk_size: Frequencies x directions per block
+
+    Returns:
+        SweepStore of the cubes
+    """
+    unknown = [name for name in quantities if name not in PATTERN_QUANTITIES]
+    if unknown:
+        raise KeyError(f"Unknown pattern quantities {unknown}, expected some of {list(PATTERN_QUANTITIES)}")
+    m_e, frequency, m_m = _broadcast_moments(m_e, m_m, frequency)
+    if m_e.ndim != 2:
+        raise ValueError(f"Moments of one antenna expected, shape (n_frequencies, 3), got {m_e.shape}")
+    axes = {'frequency': frequency, 'theta': grid.theta, 'phi': grid.phi}
+    shape = (frequency.size,) + grid.shape
+
+    store = Path(store)
+    files = create_store(store, axes, {name: PATTERN_QUANTITIES[name] for name in quantities}, chunk_size)
+
+    basis = _field_basis(grid)
+    coefficients, _ = _intensity_coefficients(m_e, m_m, frequency)
+    monomials = _direction_monomials(grid)
+    for part in _blocks(frequency.size, basis.shape[1], chunk_size):
+        if 'e_theta' in files or 'e_phi' in files:
+            e_theta, e_phi = _field_rows(m_e[part], m_m[part], frequency[part], basis)
+            for name, values in (('e_theta', e_theta), ('e_phi', e_phi)):
+                if name in files:
+                    files[name].reshape(shape[0], -1)[part] = values
+        if 'intensity' in files:
+            files['intensity'].reshape(shape[0], -1)[part] = coefficients[part] @ monomials
+    for target in files.values():
+        target.flush()
+    write_manifest(store, axes, quantities, chunk_size, complete=True)
+    return SweepStore(store)
+
+
+def _broadcast_moments(m_e, m_m, frequency):
+    """Moments as complex arrays of one shape and the frequency of every moment set."""
+    m_e, m_m = np.broadcast_arrays(np.asarray(m_e, dtype=complex), np.asarray(m_m, dtype=complex))
+    frequency = np.broadcast_to(np.asarray(frequency, dtype=float), m_e.shape[:-1])
+    return m_e, frequency, m_m
+
+
+def _blocks(n_rows: int, n_columns: int, chunk_size: int) -> Iterator[slice]:
+    """Slices of rows such that rows x columns stays within chunk_size."""
+    block = max(1, chunk_size // max(1, n_columns))
+    for start in range(0, n_rows, block):
+        yield slice(start, start + block)
+
+
+def _field_basis(grid: SphereGrid) -> np.ndarray:
+    """Real (6, 2 n_directions) matrix taking [Z0 m_e, m_m] to the E_theta and E_phi columns."""
+    theta_hat, phi_hat = grid.unit_vectors()
+    return np.block([[theta_hat, phi_hat], [phi_hat, -theta_hat]])
+
+
+def _field_rows(m_e, m_m, frequency, basis: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    r E_theta and r E_phi of moment sets of shape (n, 3), over all directions of the basis.
+
+    The moments are stacked as rows [Z0 m_e, m_m] with real and imaginary
+    parts separately, so all sets take one real matrix product.
+    """
+    moments = np.concatenate([VACUUM_IMPEDANCE * m_e, m_m], axis=-1).reshape(-1, 6)
+    fields = np.concatenate([moments.real, moments.imag]) @ basis
+    rows, n_directions = moments.shape[0], basis.shape[1] // 2
+    fields = (fields[:rows] + 1j * fields[rows:]) * _field_factor(frequency.reshape(-1))[:, None]
+    return fields[:, :n_directions], fields[:, n_directions:]
+
+
+def _field_factor(frequency: np.ndarray) -> np.ndarray:
+    """-j k / (4 pi) of the far field."""
+    return -1j * (2 * np.pi * frequency / SPEED_OF_LIGHT) / (4 * np.pi)
+
+
+def _intensity_coefficients(m_e, m_m, frequency) -> Tuple[np.ndarray, Tuple[int, ...]]:
+    """
+    Coefficients of the radiation intensity as a quadratic form in the direction r.
+
+    With p = Z0 m_e and m = m_m, the intensity is
+
+        U(r) = (k / 4 pi)^2 / Z0 (|p|^2 + |m|^2 - r^T S r + b . r)
+        S = Re(p p^H + m m^H),  b = 2 Re(p x m^*)
+
+    and, as |r| = 1, the constant is folded into the quadratic part. The
+    coefficients belong to the monomials of _direction_monomials.
+
+    Returns:
+        Tuple of the coefficients of shape (n_sets, 9) and the shape of the
+        moment sets (leading axes and frequencies)
+    """
+    m_e, frequency, m_m = _broadcast_moments(m_e, m_m, frequency)
+    sets_shape = m_e.shape[:-1]
+    p = (VACUUM_IMPEDANCE * m_e).reshape(-1, 3)
+    m = m_m.reshape(-1, 3)
+    scale = np.abs(_field_factor(frequency.reshape(-1))) ** 2 / VACUUM_IMPEDANCE
+
+    quadratic = -(np.einsum('ni,nj->nij', p, p.conj()) + np.einsum('ni,nj->nij', m, m.conj())).real
+    constant = np.sum(np.abs(p) ** 2 + np.abs(m) ** 2, axis=-1)
+    quadratic[:, [0, 1, 2], [0, 1, 2]] += constant[:, None]
+    linear = 2 * np.cross(p, m.conj()).real
+    coefficients = np.column_stack([
+        quadratic[:, 0, 0], quadratic[:, 1, 1], quadratic[:, 2, 2],
+        2 * quadratic[:, 0, 1], 2 * quadratic[:, 0, 2], 2 * quadratic[:, 1, 2],
+        linear,
+    ])
+    return coefficients * scale[:, None], sets_shape
+
+
+def _direction_monomials(grid: SphereGrid) -> np.ndarray:
+    """Monomials x^2, y^2, z^2, xy, xz, yz, x, y, z of all directions, shape (9, n_directions)."""
+    theta, phi = np.meshgrid(grid.theta, grid.phi, indexing='ij')
+    theta, phi = theta.reshape(-1), phi.reshape(-1)
+    x, y, z = np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)
+    return np.stack([x * x, y * y, z * z, x * y, x * z, y * z, x, y, z])
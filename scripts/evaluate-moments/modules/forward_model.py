@@ -0,0 +1,234 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .tem_cell import VACUUM_IMPEDANCE, TemCell
+
+
+# Poses x frequencies evaluated at once; bounds the memory of the
+# intermediate coupling products
+DEFAULT_CHUNK_SIZE = 1 << 22
+
+# Propagation direction of the wave towards waveport 1 (cell frame)
+PROPAGATION_AXIS = np.array([0.0, 0.0, 1.0])
+
+
+@dataclass(frozen=True)
+class FieldMap:
+    """
+    Normalized TEM-mode field tabulated over the upper chamber of a cell.
+
+    Points in the lower chamber are mapped by the symmetry of the mode
+    (E_x even, E_y odd about the septum plane). Between the grid nodes the
+    field is interpolated bilinearly, which is exact to the grid spacing
+    except close to the septum edges where the field is singular.
+
+    Attributes:
+        x: Grid across the cell in m, ascending
+        y: Grid from the septum plane to the top wall in m, ascending
+        e_x, e_y: Field components on the grid, shape (len(x), len(y))
+    """
+    x: np.ndarray
+    y: np.ndarray
+    e_x: np.ndarray
+    e_y: np.ndarray
+
+    @classmethod
+    def from_tem_cell(cls, cell: TemCell, nx: int = 401, ny: int = 241,
+                      effective: bool = True) -> 'FieldMap':
+        """Tabulate TemCell.normalized_field on an nx x ny grid."""
+        x = np.linspace(-cell.width / 2, cell.width / 2, nx)
+        y = np.linspace(0, cell.height / 2, ny)
+        e_x, e_y = cell.normalized_field(x[:, None], y[None, :], effective)
+        return cls(x, y, e_x, e_y)
+
+    def __call__(self, x, y) -> np.ndarray:
+        """
+        Field vectors at points of the cross-section.
+
+        Args:
+            x, y: Coordinates in m (broadcast against each other), y negative
+                in the lower chamber
+
+        Returns:
+            Field of shape (..., 3) in the cell frame; the z component is zero
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        i, tx = _cell_index(self.x, x)
+        j, ty = _cell_index(self.y, np.abs(y))
+        field = np.zeros(x.shape + (3,))
+        for component, table in ((0, self.e_x), (1, self.e_y)):
+            field[..., component] = ((1 - tx) * (1 - ty) * table[i, j] + tx * (1 - ty) * table[i + 1, j]
+                                     + (1 - tx) * ty * table[i, j + 1] + tx * ty * table[i + 1, j + 1])
+        field[..., 1] *= np.where(y < 0, -1.0, 1.0)
+        return field
+
+
+@dataclass
+class WaveportWaves:
+    """
+    TEM-mode waves leaving the cell, per pose and frequency.
+
+    Attributes:
+        a: Wave at waveport 1 in sqrt(W) (effective values)
+        b: Wave at waveport 2 in sqrt(W)
+    """
+    a: np.ndarray
+    b: np.ndarray
+
+    @property
+    def output_power(self) -> np.ndarray:
+        """Power at waveport 1 in Watts, as used by the moment extraction."""
+        return np.abs(self.a) ** 2
+
+    @property
+    def output_power_2(self) -> np.ndarray:
+        """Power at waveport 2 in Watts."""
+        return np.abs(self.b) ** 2
+
+    @property
+    def phase_shift(self) -> np.ndarray:
+        """Phase of waveport 1 minus phase of waveport 2 in rad, the phase_shift of the extraction."""
+        return np.angle(self.b / self.a)
+
+
+def rotation_matrices(rx=0.0, ry=0.0, rz=0.0) -> np.ndarray:
+    """
+    Rotations about the cell axes, applied in the order x, y, z.
+
+    Args:
+        rx, ry, rz: Angles in rad (broadcast against each other)
+
+    Returns:
+        Matrices R = R_z R_y R_x of shape (..., 3, 3) taking antenna-frame
+        vectors into the cell frame
+    """
+    rx, ry, rz = np.broadcast_arrays(*(np.asarray(angle, dtype=float) for angle in (rx, ry, rz)))
+    cx, sx, cy, sy, cz, sz = np.cos(rx), np.sin(rx), np.cos(ry), np.sin(ry), np.cos(rz), np.sin(rz)
+    rotation = np.empty(rx.shape + (3, 3))
+    rotation[..., 0, 0] = cy * cz
+    rotation[..., 0, 1] = sx * sy * cz - cx * sz
+    rotation[..., 0, 2] = cx * sy * cz + sx * sz
+    rotation[..., 1, 0] = cy * sz
+    rotation[..., 1, 1] = sx * sy * sz + cx * cz
+    rotation[..., 1, 2] = cx * sy * sz - sx * cz
+    rotation[..., 2, 0] = -sy
+    rotation[..., 2, 1] = sx * cy
+    rotation[..., 2, 2] = cx * cy
+    return rotation
+
+
+def moment_vectors(m_e, m_m, field_direction=(0.0, -1.0, 0.0)) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Moment vectors of the scalar moments of calculate_complex_moments.
+
+    The extraction from one orientation yields the electric moment along
+    the TEM-mode field at the antenna and the magnetic moment along the
+    TEM-mode magnetic field, field_direction x propagation axis.
+
+    Args:
+        m_e, m_m: Complex scalar moments, one per frequency
+        field_direction: Direction of the TEM-mode field at the antenna
+            during the extraction (default: below the septum)
+
+    Returns:
+        Tuple of the electric and magnetic moment vectors, shape (..., 3)
+    """
+    direction = np.asarray(field_direction, dtype=float)
+    direction = direction / np.linalg.norm(direction)
+    magnetic_direction = np.cross(direction, PROPAGATION_AXIS)
+    return (np.asarray(m_e)[..., None] * direction,
+            np.asarray(m_m)[..., None] * magnetic_direction)
+
+
+def coupling_vectors(field, rotations: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectors coupling the electric and magnetic moment to the waveport waves of a pose.
+
+    The waves are a, b = (u . m_e +- v . m_m) / 2 with u = R^T e0 and
+    v = R^T (z x e0) / Z0: since (R m) . e = m . (R^T e), the two fields
+    are rotated into the antenna frame instead of the moments into the cell.
+
+    Args:
+        field: Normalized TEM-mode field at the antenna, shape (..., 3)
+        rotations: Antenna orientations, shape (..., 3, 3), or None
+
+    Returns:
+        Tuple of u and v, shape (..., 3)
+    """
+    field = np.asarray(field, dtype=float)
+    magnetic_field = np.cross(PROPAGATION_AXIS, field) / VACUUM_IMPEDANCE
+    if rotations is None:
+        return field, magnetic_field
+    transposed = np.swapaxes(np.asarray(rotations, dtype=float), -1, -2)
+    return (transposed @ field[..., None])[..., 0], (transposed @ magnetic_field[..., None])[..., 0]
+
+
+def waveport_waves(m_e, m_m, field, rotations: Optional[np.ndarray] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> WaveportWaves:
+    """
+    Waveport waves excited by electric and magnetic dipoles in a TEM cell.
+
+    Forward counterpart of calculate_complex_moments: for the electric
+    moment m_e (in A m, times the free-space impedance in V m) and the
+    magnetic moment m_m (V m) the TEM-mode waves are
+
+        a, b = (m_e . e0 +- m_m . (z x e0) / Z0) / 2
+
+    with the effective normalized field e0 at the antenna and the
+    propagation axis z towards waveport 1. In the pose of the extraction
+    the moments of calculate_complex_moments give back its output power and
+    phase shift.
+
+    Each pose contributes two coupling vectors, so all poses and
+    frequencies reduce to one real matrix product, evaluated in blocks of
+    at most chunk_size entries.
+
+    Args:
+        m_e, m_m: Complex moment vectors in the antenna frame, shape
+            (n_frequencies, 3) or (3,)
+        field: Normalized TEM-mode field at the antenna position of each
+            pose, shape (n_poses, 3) or (3,), e.g. from a FieldMap
+        rotations: Orientation of the antenna per pose, shape
+            (n_poses, 3, 3) or (3, 3) (see rotation_matrices); None keeps
+            the antenna frame aligned with the cell
+        chunk_size: Poses x frequencies per block
+
+    Returns:
+        WaveportWaves with arrays of shape (n_poses, n_frequencies); axes
+        of one-dimensional inputs are dropped
+    """
+    m_e, m_m = np.asarray(m_e, dtype=complex), np.asarray(m_m, dtype=complex)
+    field, magnetic_field = coupling_vectors(field, rotations)
+    pose_shape = field.shape[:-1]
+
+    # Couplings of all poses as one real matrix (n_poses, 6) ...
+    coupling = np.concatenate([field.reshape(-1, 3), magnetic_field.reshape(-1, 3)], axis=1)
+    # ... and the waves as its product with the real and imaginary parts of
+    # [m_e; m_m] and [m_e; -m_m]: columns (Re a, Im a, Re b, Im b)
+    moments_e, moments_m = np.atleast_2d(m_e).T, np.atleast_2d(m_m).T
+    n_poses, n_frequencies = coupling.shape[0], moments_e.shape[1]
+    plus, minus = np.vstack([moments_e, moments_m]) / 2, np.vstack([moments_e, -moments_m]) / 2
+    weights = np.hstack([plus.real, plus.imag, minus.real, minus.imag])
+
+    a = np.empty((n_poses, n_frequencies), dtype=complex)
+    b = np.empty((n_poses, n_frequencies), dtype=complex)
+    block = max(1, chunk_size // n_frequencies)
+    for start in range(0, n_poses, block):
+        part = slice(start, start + block)
+        waves = coupling[part] @ weights
+        a.real[part], a.imag[part] = waves[:, :n_frequencies], waves[:, n_frequencies:2 * n_frequencies]
+        b.real[part], b.imag[part] = waves[:, 2 * n_frequencies:3 * n_frequencies], waves[:, 3 * n_frequencies:]
+
+    shape = pose_shape + m_e.shape[:-1]
+    return WaveportWaves(a.reshape(shape), b.reshape(shape))
+
+
+def _cell_index(grid: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Index of the grid interval holding each value and the fractional position in it."""
+    if np.any(values < grid[0] - 1e-12 * np.ptp(grid)) or np.any(values > grid[-1] + 1e-12 * np.ptp(grid)):
+        raise ValueError(f"Points outside the field map [{grid[0]}, {grid[-1]}]")
+    index = np.clip(np.searchsorted(grid, values, side='right') - 1, 0, grid.size - 2)
+    fraction = np.clip((values - grid[index]) / (grid[index + 1] - grid[index]), 0.0, 1.0)
+    return index, fraction
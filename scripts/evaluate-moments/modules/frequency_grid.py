@@ -0,0 +1,188 @@
+from dataclasses import dataclass
+from typing import Collection, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Grids whose samples agree to this relative tolerance are treated as equal
+# (HFSS prints the same sweep with varying numbers of digits)
+GRID_RTOL = 1e-9
+
+# Interpolation weights of the current run, keyed by the (source, target) grids
+_weights = {}
+
+
+@dataclass(frozen=True)
+class InterpolationWeights:
+    """
+    Linear interpolation from a source frequency grid onto a target grid.
+
+    Every target sample f is interpolated between the source samples
+    lower and lower + 1 as (1 - fraction) * y[lower] + fraction * y[lower + 1].
+
+    Attributes:
+        lower: Index of the source sample at or below each target sample
+        fraction: Position of each target sample between its two source samples
+        identity: True if both grids are equal; values are then passed through
+    """
+    lower: np.ndarray
+    fraction: np.ndarray
+    identity: bool = False
+
+    def apply(self, values: np.ndarray) -> np.ndarray:
+        """Interpolate values sampled on the source grid (along the last axis)."""
+        values = np.asarray(values)
+        if self.identity:
+            return values
+        return values[..., self.lower] * (1 - self.fraction) + values[..., self.lower + 1] * self.fraction
+
+
+def interpolation_weights(source: np.ndarray, target: np.ndarray) -> InterpolationWeights:
+    """
+    Weights for resampling from source onto target, computed once per grid pair.
+
+    Args:
+        source: Increasing source frequencies
+        target: Target frequencies, all within the source range
+
+    Returns:
+        Cached InterpolationWeights of the grid pair
+
+    Raises:
+        ValueError: If a target sample lies outside the source range
+    """
+    source = np.asarray(source, dtype=float)
+    target = np.asarray(target, dtype=float)
+    key = (source.tobytes(), target.tobytes())
+    weights = _weights.get(key)
+    if weights is not None:
+        return weights
+
+    if same_grid(source, target):
+        weights = InterpolationWeights(np.arange(source.size), np.zeros(source.size), identity=True)
+    else:
+        tolerance = GRID_RTOL * np.max(np.abs(source))
+        if np.min(target) < source[0] - tolerance or np.max(target) > source[-1] + tolerance:
+            raise ValueError(f"Target grid [{np.min(target)}, {np.max(target)}] exceeds "
+                             f"the source grid [{source[0]}, {source[-1]}]")
+        lower = np.clip(np.searchsorted(source, target, side='right') - 1, 0, source.size - 2)
+        fraction = np.clip((target - source[lower]) / (source[lower + 1] - source[lower]), 0.0, 1.0)
+        weights = InterpolationWeights(lower, fraction)
+    _weights[key] = weights
+    return weights
+
+
+def clear_weight_cache() -> None:
+    """Forget all interpolation weights computed so far."""
+    _weights.clear()
+
+
+def same_grid(a: np.ndarray, b: np.ndarray) -> bool:
+    """True if two frequency grids have the same samples (within GRID_RTOL)."""
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    return a.shape == b.shape and np.allclose(a, b, rtol=GRID_RTOL, atol=0.0)
+
+
+def common_grid(grids: Sequence[np.ndarray], mode: str = 'union') -> np.ndarray:
+    """
+    Frequency grid on which all given sweeps can be compared.
+
+    The grid is restricted to the band covered by every sweep, so no
+    quantity has to be extrapolated.
+
+    Args:
+        grids: Frequencies of each sweep
+        mode: 'union' keeps every sample of every sweep, 'finest' the samples
+            of the sweep with the most points in the band and 'coarsest' those
+            of the sweep with the fewest (nothing is upsampled)
+
+    Returns:
+        Increasing array of frequencies
+
+    Raises:
+        ValueError: For an unknown mode or sweeps without a common band
+    """
+    if mode not in ('union', 'finest', 'coarsest'):
+        raise ValueError(f"Unknown grid mode '{mode}'")
+    grids = [np.asarray(grid, dtype=float) for grid in grids]
+    if all(same_grid(grid, grids[0]) for grid in grids[1:]):
+        return grids[0]
+
+    low = max(np.min(grid) for grid in grids)
+    high = min(np.max(grid) for grid in grids)
+    if low > high:
+        raise ValueError(f"The sweeps do not overlap (common band [{low}, {high}])")
+    tolerance = GRID_RTOL * high
+    in_band = [grid[(grid >= low - tolerance) & (grid <= high + tolerance)] for grid in grids]
+
+    if mode == 'union':
+        samples = np.sort(np.concatenate(in_band))
+        # Merge samples that only differ by rounding in the export
+        keep = np.concatenate(([True], np.diff(samples) > tolerance))
+        return samples[keep]
+    sizes = [grid.size for grid in in_band]
+    return in_band[int(np.argmax(sizes) if mode == 'finest' else np.argmin(sizes))]
+
+
+def resample(frequency: np.ndarray, values: np.ndarray, grid: np.ndarray,
+             phase: bool = False, complex_mode: str = 'polar') -> np.ndarray:
+    """
+    Resample one quantity onto another frequency grid.
+
+    Args:
+        frequency: Frequencies the values are sampled on
+        values: Samples along the last axis; real or complex
+        grid: Target frequencies
+        phase: The values are phase angles in radians; they are unwrapped
+            before interpolating, so that no sample is interpolated across
+            a 2 pi jump
+        complex_mode: For complex values, 'polar' interpolates magnitude and
+            unwrapped phase, 'cartesian' real and imaginary part
+
+    Returns:
+        Values on the target grid
+    """
+    weights = interpolation_weights(frequency, grid)
+    values = np.asarray(values)
+    if weights.identity:
+        return values
+    if np.iscomplexobj(values):
+        if complex_mode == 'polar':
+            magnitude = weights.apply(np.abs(values))
+            return magnitude * np.exp(1j * weights.apply(np.unwrap(np.angle(values))))
+        if complex_mode != 'cartesian':
+            raise ValueError(f"Unknown complex mode '{complex_mode}'")
+        return weights.apply(values)
+    if phase:
+        return weights.apply(np.unwrap(values))
+    return weights.apply(values)
+
+
+def align_quantities(quantities: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                     grid: Optional[np.ndarray] = None, mode: str = 'union',
+                     phases: Collection[str] = (), complex_mode: str = 'polar'
+                     ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Bring quantities from sweeps with different frequency grids onto one grid.
+
+    Quantities sampled on the same grid share one set of interpolation
+    weights; quantities already sampled on the target grid are returned
+    unchanged.
+
+    Args:
+        quantities: (frequencies, values) per quantity name
+        grid: Target frequencies; built with common_grid(mode) if None
+        mode: Grid construction, see common_grid
+        phases: Names of quantities that are phase angles in radians
+        complex_mode: Interpolation of complex quantities, see resample
+
+    Returns:
+        Tuple of (grid, resampled values per quantity name)
+    """
+    if grid is None:
+        grid = common_grid([frequency for frequency, _ in quantities.values()], mode)
+    aligned = {name: resample(frequency, values, grid, name in phases, complex_mode)
+               for name, (frequency, values) in quantities.items()}
+    return grid, aligned
+
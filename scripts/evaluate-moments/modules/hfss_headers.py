@@ -0,0 +1,229 @@
+import csv
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """
+    Description of one column of an HFSS CSV export.
+
+    Attributes:
+        index: Position of the column in the file
+        header: Header text as exported by HFSS
+        expression: Header without unit and duplicate suffix
+        unit: Unit inside the trailing brackets ('' for '[]', None if absent)
+        canonical: Semantic name used to select the column
+        is_sweep: True for sweep variables (Freq, Phase, rotation angle, ...)
+        function: Report function applied to the S-parameter (dB, ang_rad, ...)
+        ports: Port pair of the S-parameter, without mode suffix
+        negated: True if the report shows the negative quantity ('-dB(...)')
+    """
+    index: int
+    header: str
+    expression: str
+    unit: Optional[str]
+    canonical: str
+    is_sweep: bool = False
+    function: Optional[str] = None
+    ports: Optional[Tuple[str, str]] = None
+    negated: bool = False
+
+
+# Canonical names of well-known sweep variables
+SWEEP_VARIABLES = {
+    "Freq": "frequency",
+    "Frequency": "frequency",
+    "Phase": "phase_sweep",
+}
+
+# Canonical names of S-parameter report functions
+S_PARAMETER_KINDS = {
+    "dB": "db",
+    "mag": "mag",
+    "ang_rad": "phase",
+    "ang_deg": "phase",
+    "re": "re",
+    "im": "im",
+}
+
+# Derived report expressions, checked in order; first match wins.
+# '{1}' in a name is replaced by the first group of the match.
+QUANTITY_PATTERNS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r"^elec_energy$"), "electric_energy"),
+    (re.compile(r"^mag_energy$"), "magnetic_energy"),
+    # 2 W_m / I^2 or V^2 / (omega^2 W_m)
+    (re.compile(r"^mag_energy\*"), "inductance"),
+    (re.compile(r"/ ?\(\(2\*pi\*Freq\)\*\*2 ?\* ?mag_energy\*[\d.eE+-]+\)$"), "inductance"),
+    (re.compile(r"^elec_energy\*"), "capacitance"),
+    (re.compile(r"^(sqrt\(2\)\*)?sqrt\(re\(Zo\("), "feed_voltage"),
+    (re.compile(r"^(sqrt\(2\)\*)?sqrt\(\(1-mag\(S\("), "feed_current"),
+    (re.compile(r"^re\(Zo\("), "impedance_magnitude"),
+    (re.compile(r"^atan\(im\(S\("), "impedance_phase"),
+    (re.compile(r"^atan\(voltage_line"), "antenna_voltage_phase"),
+    (re.compile(r"^e_phase_antenna_waveport"), "antenna_voltage_phase"),
+    (re.compile(r"^wp(\d+)_ez_phase$"), "waveport{1}_phase"),
+    (re.compile(r"^Antenna to Waveport (\d+)$"), "waveport{1}_phase"),
+    (re.compile(r"^(output_ez|ez_output)$"), "efield"),
+    (re.compile(r"^TEM mode$"), "tem_mode_db"),
+]
+
+_HEADER = re.compile(r"^(?P<expr>.*?)(?P<dup>_\d+)?\s*(\[(?P<unit>[^\[\]]*)\])?$")
+_S_PARAMETER = re.compile(
+    r"^(?P<neg>-)?(?P<func>\w+)\(S\((?P<p1>[^,()]+),(?P<p2>[^,()]+)\)\)$")
+_IDENTIFIER = re.compile(r"^[A-Za-z_]\w*$")
+
+
+def register_quantity(pattern: str, canonical: str) -> None:
+    """
+    Register a canonical name for a derived report expression.
+
+    Registered patterns take precedence over the built-in ones.
+
+    Args:
+        pattern: Regular expression matched (re.search) against the expression
+        canonical: Semantic name; '{1}' is replaced by the first match group
+    """
+    QUANTITY_PATTERNS.insert(0, (re.compile(pattern), canonical))
+
+
+def parse_column(header: str, index: int = 0) -> ColumnSpec:
+    """
+    Parse a single HFSS CSV header into a ColumnSpec.
+
+    Args:
+        header: Header text, e.g. 'ang_rad(S(waveport2:1,antenna)) [rad]'
+        index: Position of the column in the file
+
+    Returns:
+        ColumnSpec with unit, S-parameter details and canonical name
+    """
+    match = _HEADER.match(header.strip())
+    expression = match.group("expr").strip()
+    unit = match.group("unit")
+
+    s_match = _S_PARAMETER.match(expression)
+    if s_match and s_match.group("func") in S_PARAMETER_KINDS:
+        ports = (_port_name(s_match.group("p1")), _port_name(s_match.group("p2")))
+        kind = S_PARAMETER_KINDS[s_match.group("func")]
+        return ColumnSpec(index, header, expression, unit,
+                          _s_parameter_name(ports, kind),
+                          function=s_match.group("func"), ports=ports,
+                          negated=bool(s_match.group("neg")))
+
+    if expression in SWEEP_VARIABLES:
+        return ColumnSpec(index, header, expression, unit,
+                          SWEEP_VARIABLES[expression], is_sweep=True)
+
+    for pattern, name in QUANTITY_PATTERNS:
+        q_match = pattern.search(expression)
+        if q_match:
+            if "{1}" in name:
+                name = name.replace("{1}", q_match.group(1))
+            return ColumnSpec(index, header, expression, unit, name)
+
+    # Any other bare variable with a physical unit is a sweep variable
+    # (antenna_rotation_angle [deg], shielding_material_thickness [um], ...)
+    is_sweep = bool(_IDENTIFIER.match(expression)) and bool(unit)
+    return ColumnSpec(index, header, expression, unit, expression, is_sweep=is_sweep)
+
+
+class HeaderSchema:
+    """Column layout of one CSV export, addressable by canonical name."""
+
+    def __init__(self, columns: List[ColumnSpec], stem: str = ""):
+        self.columns = columns
+        self.stem = stem
+        self._by_name: Dict[str, ColumnSpec] = {}
+        for column in columns:
+            name = column.canonical
+            # Repeated quantities get a numeric suffix: name, name_2, ...
+            count = 2
+            while name in self._by_name:
+                name = f"{column.canonical}_{count}"
+                count += 1
+            self._by_name[name] = column
+
+    @property
+    def names(self) -> List[str]:
+        """Canonical names of all columns in file order."""
+        return list(self._by_name)
+
+    def outputs(self) -> List[ColumnSpec]:
+        """All columns that are not sweep variables."""
+        return [column for column in self.columns if not column.is_sweep]
+
+    def column(self, *names: str) -> ColumnSpec:
+        """
+        Look up a column by canonical name.
+
+        Several alternative names may be given; the first one present wins.
+        Exports holding a single quantity can also be addressed by their file
+        name (e.g. 'inductance' for inductance.csv), which covers reports
+        whose expression was copied from another quantity.
+
+        Raises:
+            KeyError: If none of the names is present
+        """
+        for name in names:
+            if name in self._by_name:
+                return self._by_name[name]
+        outputs = self.outputs()
+        if len(outputs) == 1 and self.stem in names:
+            return outputs[0]
+        raise KeyError(f"None of {list(names)} in {self.stem or 'CSV'} columns {self.names}")
+
+    def index(self, *names: str) -> int:
+        """Column index for a canonical name (see column())."""
+        return self.column(*names).index
+
+
+# Schemas read so far, keyed by resolved path
+_schemas: Dict[Path, HeaderSchema] = {}
+
+
+def read_schema(csv_path: Path) -> HeaderSchema:
+    """
+    Read and parse the header row of a CSV export.
+
+    Only the first line of the file is read; the schema is kept for the rest
+    of the run.
+
+    Args:
+        csv_path: Path to CSV file
+
+    Returns:
+        HeaderSchema of the file
+    """
+    csv_path = Path(csv_path).resolve()
+    schema = _schemas.get(csv_path)
+    if schema is None:
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f))
+        stem = csv_path.stem.replace("-", "_")
+        schema = HeaderSchema([parse_column(text, i) for i, text in enumerate(header)], stem)
+        _schemas[csv_path] = schema
+    return schema
+
+
+def unit_scale(unit: Optional[str]) -> float:
+    """Factor converting a value in the given unit to SI (GHz -> Hz, um -> m, ...)."""
+    prefixes = {"G": 1e9, "M": 1e6, "k": 1e3, "m": 1e-3, "u": 1e-6, "µ": 1e-6, "n": 1e-9, "p": 1e-12}
+    if not unit or unit in ("deg", "rad", "m", "Hz"):
+        return 1.0
+    return prefixes.get(unit[0], 1.0) if len(unit) > 1 else 1.0
+
+
+def _port_name(port: str) -> str:
+    """Strip the mode suffix from an HFSS port name ('waveport1:1' -> 'waveport1')."""
+    return port.split(":")[0]
+
+
+def _s_parameter_name(ports: Tuple[str, str], kind: str) -> str:
+    """Canonical name of an S-parameter column."""
+    # Coupling from the antenna into a waveport is named after the waveport
+    if ports[1] == "antenna" and ports[0] != "antenna":
+        return f"{ports[0]}_{kind}"
+    return f"s_{kind}({ports[0]},{ports[1]})"
@@ -0,0 +1,360 @@
+import re
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from .circuit import Circuit
+
+
+# SPICE value suffixes (case-insensitive; 'meg' is checked before 'm')
+SPICE_SUFFIXES = [("meg", 1e6), ("t", 1e12), ("g", 1e9), ("k", 1e3), ("m", 1e-3),
+                  ("u", 1e-6), ("µ", 1e-6), ("n", 1e-9), ("p", 1e-12), ("f", 1e-15)]
+
+# Pin positions of the LTspice library symbols (unrotated, relative to the
+# symbol origin), first pin first. The first pin is the node_plus of the
+# component, matching LTspice's current direction.
+SYMBOL_PINS = {
+    "res": ((16, 16), (16, 96)),
+    "res2": ((16, 16), (16, 96)),
+    "cap": ((16, 0), (16, 64)),
+    "polcap": ((16, 0), (16, 64)),
+    "ind": ((16, 16), (16, 96)),
+    "ind2": ((16, 16), (16, 96)),
+    "voltage": ((0, 16), (0, 96)),
+    "current": ((0, 0), (0, 80)),
+}
+
+# Header size read at once while looking for the start of the data section
+_HEADER_CHUNK = 1 << 16
+
+
+class RawFile:
+    """
+    Simulation results of an LTspice .raw file.
+
+    The data section is memory-mapped: every variable is a read-only view
+    into the file, nothing is copied or parsed until it is used. Binary
+    files in normal and 'fastaccess' layout are supported, ASCII files
+    ('Values:') are parsed into memory.
+
+    Attributes:
+        path: The .raw file
+        header: Header fields (e.g. 'Title', 'Plotname', 'Flags')
+        flags: Lower-case words of the 'Flags' field ('complex', 'real', 'double', ...)
+        variables: Variable names in file order ('frequency', 'V(out)', 'I(R1)', ...)
+        kinds: Variable type per name ('frequency', 'voltage', 'device_current', ...)
+        n_points: Number of points
+    """
+
+    def __init__(self, path: Path, header: Dict[str, str], variables: List[str],
+                 kinds: List[str], columns: List[np.ndarray]):
+        self.path = Path(path)
+        self.header = header
+        self.flags = set(header.get("Flags", "").lower().split())
+        self.variables = variables
+        self.kinds = dict(zip(variables, kinds))
+        self.n_points = columns[0].size if columns else 0
+        self._columns = dict(zip(variables, columns))
+
+    @property
+    def is_complex(self) -> bool:
+        return "complex" in self.flags
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Values of a variable over all points (case-insensitive name)."""
+        column = self._columns.get(name)
+        if column is None:
+            matches = [key for key in self._columns if key.lower() == name.lower()]
+            if not matches:
+                raise KeyError(f"No variable '{name}' in {self.path.name}: {self.variables}")
+            column = self._columns[matches[0]]
+        return column
+
+    def __contains__(self, name: str) -> bool:
+        return any(key.lower() == name.lower() for key in self._columns)
+
+    @property
+    def axis(self) -> np.ndarray:
+        """The sweep variable (frequency in Hz, time in s, ...) as real values."""
+        values = self[self.variables[0]]
+        values = values.real if np.iscomplexobj(values) else values
+        # Transient analyses mark compressed points with a negative time
+        return np.abs(values) if self.variables[0].lower() == "time" else values
+
+
+def read_raw(path: Path) -> RawFile:
+    """
+    Open an LTspice .raw file and memory-map its data section.
+
+    The header may be UTF-16 (LTspice XVII and later) or ASCII/UTF-8.
+    Complex (AC) data is stored as complex128 per variable; real data as
+    float64 for the sweep variable and float32 for the others unless the
+    'double' flag is set.
+
+    Args:
+        path: The .raw file
+
+    Returns:
+        RawFile giving access to all variables
+
+    Raises:
+        ValueError: If the header is incomplete or the file is truncated
+    """
+    path = Path(path)
+    header, variables, kinds, data_offset, binary, encoding = _read_header(path)
+    n_points = int(header["No. Points"])
+    n_variables = int(header["No. Variables"])
+    if len(variables) != n_variables:
+        raise ValueError(f"{path}: {len(variables)} variables listed, {n_variables} announced")
+    flags = header.get("Flags", "").lower().split()
+
+    if not binary:
+        columns = _parse_ascii_values(path, data_offset, encoding, n_points, n_variables, "complex" in flags)
+        return RawFile(path, header, variables, kinds, columns)
+
+    if "complex" in flags:
+        dtypes = [np.dtype(np.complex128)] * n_variables
+    elif "double" in flags:
+        dtypes = [np.dtype(np.float64)] * n_variables
+    else:
+        dtypes = [np.dtype(np.float64)] + [np.dtype(np.float32)] * (n_variables - 1)
+    point_size = sum(dtype.itemsize for dtype in dtypes)
+
+    block = np.memmap(path, dtype=np.uint8, mode="r", offset=data_offset)
+    if block.size < n_points * point_size:
+        raise ValueError(f"{path}: data section holds {block.size} bytes, "
+                         f"{n_points * point_size} expected")
+
+    columns = []
+    offset = 0
+    for dtype in dtypes:
+        if "fastaccess" in flags:
+            # Variable after variable, each contiguous
+            strides, step = (dtype.itemsize,), dtype.itemsize * n_points
+        else:
+            # Point after point, all variables interleaved
+            strides, step = (point_size,), dtype.itemsize
+        column = np.ndarray((n_points,), dtype=dtype.newbyteorder("<"), buffer=block,
+                            offset=offset, strides=strides)
+        columns.append(column)
+        offset += step
+    return RawFile(path, header, variables, kinds, columns)
+
+
+def parse_spice_value(text: str) -> float:
+    """
+    Convert a SPICE number with suffix to float ('1.68p' -> 1.68e-12, '2meg' -> 2e6).
+
+    Trailing unit letters after the suffix are ignored ('10pF', '50Ohm').
+    """
+    match = re.match(r"^\s*([-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?)\s*([A-Za-zµ]*)", text)
+    if match is None:
+        raise ValueError(f"Not a SPICE value: '{text}'")
+    value = float(match.group(1))
+    suffix = match.group(4).lower()
+    for name, scale in SPICE_SUFFIXES:
+        if suffix.startswith(name):
+            return value * scale
+    return value
+
+
+def read_asc(path: Path):
+    """
+    Build the circuit of an LTspice schematic.
+
+    Nets are found from the wire geometry: pins, wire ends and flags
+    that touch (also in the middle of a wire) are connected. Nets take the
+    name of their flag ('0' is ground); the others are named 'n001',
+    'n002', ... in order of appearance. These generated names do not
+    follow LTspice's numbering, so results of an LTspice run are matched
+    through flag labels or device currents only. K directives ('K1 L1 L2 0.9')
+    couple inductors; the frequencies of an '.ac' directive are returned.
+
+    Args:
+        path: The .asc schematic
+
+    Returns:
+        Tuple of (Circuit, frequencies in Hz of the .ac directive or None)
+
+    Raises:
+        ValueError: For symbols other than SYMBOL_PINS or unparseable values
+    """
+    symbols, wires, flags, directives = [], [], [], []
+    for line in Path(path).read_text(encoding="utf-8", errors="replace").splitlines():
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == "WIRE":
+            x1, y1, x2, y2 = map(int, fields[1:5])
+            wires.append(((x1, y1), (x2, y2)))
+        elif fields[0] == "FLAG":
+            flags.append(((int(fields[1]), int(fields[2])), fields[3]))
+        elif fields[0] == "SYMBOL":
+            symbols.append({"symbol": fields[1].split("\\")[-1].lower(),
+                            "origin": (int(fields[2]), int(fields[3])),
+                            "orientation": fields[4], "attributes": {}})
+        elif fields[0] == "SYMATTR" and symbols:
+            symbols[-1]["attributes"][fields[1]] = line.split(maxsplit=2)[2] if len(fields) > 2 else ""
+        elif fields[0] == "TEXT" and "!" in line:
+            directives.extend(part.strip() for part in line.split("!", 1)[1].split("\\n"))
+
+    pins = []
+    for symbol in symbols:
+        if symbol["symbol"] not in SYMBOL_PINS:
+            raise ValueError(f"{path}: unsupported symbol '{symbol['symbol']}'")
+        pins.append([_place_pin(pin, symbol["origin"], symbol["orientation"])
+                     for pin in SYMBOL_PINS[symbol["symbol"]]])
+    nets = _connect(wires, [point for pair in pins for point in pair] + [point for point, _ in flags])
+
+    names = {}
+    for point, flag in flags:
+        names[nets[point]] = flag
+    circuit = Circuit(str(path))
+    counter = 0
+    for symbol, pair in zip(symbols, pins):
+        nodes = []
+        for point in pair:
+            net = nets[point]
+            if net not in names:
+                counter += 1
+                names[net] = f"n{counter:03d}"
+            nodes.append(names[net])
+        attributes = symbol["attributes"]
+        name = attributes.get("InstName", "")
+        circuit.add(name, nodes[0], nodes[1], _component_value(name, attributes))
+
+    frequency = None
+    for directive in directives:
+        tokens = directive.split()
+        if not tokens:
+            continue
+        if tokens[0].upper().startswith("K") and len(tokens) >= 4:
+            circuit.couple(tokens[0], tokens[1], tokens[2], coefficient=parse_spice_value(tokens[-1]))
+        elif tokens[0].lower() == ".ac":
+            frequency = ac_frequencies(tokens[1:])
+    return circuit, frequency
+
+
+def ac_frequencies(arguments: List[str]) -> np.ndarray:
+    """
+    Frequencies of an '.ac' directive ('list f1 f2 ...', 'lin n f1 f2', 'dec n f1 f2', 'oct n f1 f2').
+    """
+    sweep = arguments[0].lower()
+    values = [parse_spice_value(argument) for argument in arguments[1:]]
+    if sweep == "list":
+        return np.array(values)
+    points, start, stop = int(values[0]), values[1], values[2]
+    if sweep == "lin":
+        return np.linspace(start, stop, points)
+    if sweep in ("dec", "oct"):
+        base = 10.0 if sweep == "dec" else 2.0
+        count = int(np.floor(points * np.log(stop / start) / np.log(base) + 1e-9)) + 1
+        return start * base ** (np.arange(count) / points)
+    raise ValueError(f"Unknown .ac sweep '{arguments[0]}'")
+
+
+def _place_pin(pin, origin, orientation: str):
+    """Absolute position of a symbol pin for an orientation 'R0'...'R270', 'M0'...'M270'."""
+    x, y = pin
+    if orientation.startswith("M"):
+        x = -x
+    for _ in range(int(orientation[1:]) // 90):
+        x, y = -y, x
+    return origin[0] + x, origin[1] + y
+
+
+def _connect(wires, points) -> Dict[tuple, int]:
+    """Net id of every wire end and point; points on a wire (also mid-wire) join its net."""
+    parent = {}
+
+    def find(point):
+        parent.setdefault(point, point)
+        while parent[point] != point:
+            parent[point] = parent[parent[point]]
+            point = parent[point]
+        return point
+
+    ends = [end for wire in wires for end in wire]
+    for point in ends + list(points):
+        find(point)
+    for start, stop in wires:
+        parent[find(stop)] = find(start)
+        for point in list(parent):
+            if _on_segment(point, start, stop):
+                parent[find(point)] = find(start)
+    return {point: find(point) for point in parent}
+
+
+def _on_segment(point, start, stop) -> bool:
+    (x, y), (x1, y1), (x2, y2) = point, start, stop
+    return ((x - x1) * (y2 - y1) == (y - y1) * (x2 - x1)
+            and min(x1, x2) <= x <= max(x1, x2) and min(y1, y2) <= y <= max(y1, y2))
+
+
+def _component_value(name: str, attributes: Dict[str, str]) -> complex:
+    """Value of a component; for sources the AC amplitude (and phase in degrees)."""
+    if name[:1].upper() not in ("V", "I"):
+        return parse_spice_value(attributes.get("Value", ""))
+    for text in (attributes.get("Value2", ""), attributes.get("Value", "")):
+        tokens = text.split()
+        if "AC" in (token.upper() for token in tokens):
+            position = [token.upper() for token in tokens].index("AC")
+            amplitude = parse_spice_value(tokens[position + 1])
+            phase = parse_spice_value(tokens[position + 2]) if len(tokens) > position + 2 else 0.0
+            return amplitude * np.exp(1j * np.deg2rad(phase))
+    # Sources without AC specification do not drive the AC analysis
+    return 0.0
+
+
+def _read_header(path: Path):
+    """Parse the header; returns (fields, variables, kinds, data offset, binary, encoding)."""
+    with open(path, "rb") as f:
+        raw = f.read(_HEADER_CHUNK)
+        encoding = "utf-16-le" if len(raw) > 1 and raw[1] == 0 else "latin-1"
+        markers = {binary: marker.encode(encoding) for binary, marker in ((True, "Binary:\n"), (False, "Values:\n"))}
+        while True:
+            found = {binary: raw.find(marker) for binary, marker in markers.items() if raw.find(marker) >= 0}
+            if found:
+                binary = min(found, key=found.get)
+                start = found[binary]
+                break
+            more = f.read(_HEADER_CHUNK)
+            if not more:
+                raise ValueError(f"{path}: no 'Binary:' or 'Values:' section found")
+            raw += more
+
+    text = raw[:start].decode(encoding).replace("\r", "")
+    data_offset = start + len(markers[binary])
+    header, variables, kinds = {}, [], []
+    in_variables = False
+    for line in text.split("\n"):
+        if in_variables and line[:1] in ("\t", " ") and line.strip():
+            fields = line.split()
+            variables.append(fields[1])
+            kinds.append(fields[2] if len(fields) > 2 else "")
+            continue
+        key, _, value = line.partition(":")
+        in_variables = key == "Variables"
+        if key and not in_variables:
+            header[key.strip()] = value.strip()
+    for key in ("No. Points", "No. Variables"):
+        if key not in header:
+            raise ValueError(f"{path}: header field '{key}' missing")
+    return header, variables, kinds, data_offset, binary, encoding
+
+
+def _parse_ascii_values(path: Path, offset: int, encoding: str, n_points: int,
+                        n_variables: int, is_complex: bool) -> List[np.ndarray]:
+    """Parse the 'Values:' section of an ASCII .raw file (point index, then one value per variable)."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        tokens = f.read().decode(encoding).split()
+    tokens = np.array(tokens, dtype=object).reshape(n_points, n_variables + 1)[:, 1:]
+    if is_complex:
+        pairs = np.array([token.split(",") for token in tokens.ravel()], dtype=float)
+        values = (pairs[:, 0] + 1j * pairs[:, 1]).reshape(n_points, n_variables)
+    else:
+        values = tokens.astype(float)
+    values.flags.writeable = False
+    return [values[:, i] for i in range(n_variables)]
@@ -0,0 +1,166 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .curve_fitting import FitResult, fit_curves
+
+
+@dataclass
+class PolynomialFit:
+    """
+    Polynomial fits of several series over the same frequency grid.
+
+    The fit (see curve_fitting.fit_curves) is solved in the scaled frequency
+    t = (f - offset) / scale, which maps the band to [-1, 1]. Coefficients
+    for HFSS, which evaluates the expression in Hz, are derived from it
+    afterwards.
+
+    Attributes:
+        names: Name of each series (e.g. 'loop_m_e')
+        frequency: Frequencies in Hz the series were fitted on
+        fit: Polynomial fit of all series in the scaled frequency
+        max_rel_error: Largest residual relative to the largest value, per series
+        condition: Condition number of the scaled least-squares problem
+        unshifted_condition: Condition number the same fit has on f / max(f),
+            i.e. scaled to [0, 1] but not centred; the ratio to condition is
+            the gain of fitting in t
+    """
+    names: List[str]
+    frequency: np.ndarray
+    fit: FitResult
+    max_rel_error: np.ndarray
+    condition: float
+    unshifted_condition: float
+
+    @property
+    def order(self) -> int:
+        return self.fit.order[0]
+
+    @property
+    def rmse(self) -> np.ndarray:
+        """Root-mean-square residual per series."""
+        return self.fit.rmse
+
+    def evaluate(self, frequency) -> np.ndarray:
+        """Fitted values at frequency (Hz); shape (n_series, len(frequency))."""
+        return self.fit.evaluate(frequency)
+
+    def coefficients_hz(self) -> np.ndarray:
+        """Coefficients in Hz, shape (n_series, order + 1), highest power first."""
+        return self.fit.coefficients_in_x()[:, ::-1]
+
+    def expressions(self) -> Dict[str, str]:
+        """HFSS expression in Freq (Hz) per series."""
+        expressions = {}
+        for name, coefficients in zip(self.names, self.coefficients_hz()):
+            terms = []
+            for power, c in zip(range(self.order, -1, -1), coefficients):
+                terms.append(" * ".join([f"({float(c)!r})"] + ["Freq"] * power))
+            expressions[name] = " + ".join(terms)
+        return expressions
+
+
+def fit_polynomials(frequency: np.ndarray, series: Dict[str, np.ndarray],
+                    order: int = 3) -> PolynomialFit:
+    """
+    Fit polynomials to many series on one frequency grid in a single solve.
+
+    Args:
+        frequency: Frequencies in Hz
+        series: Values per series name, each of the same length as frequency
+        order: Polynomial order
+
+    Returns:
+        PolynomialFit of all series
+    """
+    frequency = np.asarray(frequency, dtype=float)
+    names = list(series)
+    values = np.vstack([np.asarray(series[name], dtype=float) for name in names])
+    if frequency.size <= order:
+        raise ValueError(f"{frequency.size} frequency points are too few for order {order}")
+
+    fit = fit_curves(frequency, values, 'poly', order)
+    peak = np.max(np.abs(values), axis=1)
+    peak[peak == 0] = 1.0
+    design = np.polynomial.polynomial.polyvander((frequency - fit.offset) / fit.scale, order)
+
+    return PolynomialFit(
+        names=names,
+        frequency=frequency,
+        fit=fit,
+        max_rel_error=np.max(np.abs(fit.evaluate(frequency) - values), axis=1) / peak,
+        condition=np.linalg.cond(design),
+        unshifted_condition=np.linalg.cond(
+            np.polynomial.polynomial.polyvander(frequency / np.max(np.abs(frequency)), order)),
+    )
+
+
+def fit_moment_sets(moment_sets: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]],
+                    order: int = 3) -> List[PolynomialFit]:
+    """
+    Fit m_e and m_m of many antennas, batching antennas with the same grid.
+
+    Args:
+        moment_sets: (frequencies in Hz, m_e, m_m) per antenna name
+        order: Polynomial order
+
+    Returns:
+        One PolynomialFit per distinct frequency grid, with series named
+        '<antenna>_m_e' and '<antenna>_m_m' ('-' replaced by '_', as HFSS
+        variable names do not allow it)
+    """
+    groups = {}
+    for antenna, (frequency, m_e, m_m) in moment_sets.items():
+        frequency = np.asarray(frequency, dtype=float)
+        group = groups.setdefault(frequency.tobytes(), (frequency, {}))
+        name = antenna.replace("-", "_")
+        group[1][f"{name}_m_e"] = np.abs(m_e)
+        group[1][f"{name}_m_m"] = np.abs(m_m)
+    return [fit_polynomials(frequency, series, order) for frequency, series in groups.values()]
+
+
+def format_fit_report(fits: List[PolynomialFit]) -> str:
+    """Table of residual and condition metrics of all fitted series."""
+    lines = [f"{'Series':32} {'RMSE':>12} {'max rel. err':>12} {'cond':>10} {'cond f/fmax':>12}"]
+    for fit in fits:
+        for name, rmse, rel in zip(fit.names, fit.rmse, fit.max_rel_error):
+            lines.append(f"{name:32} {rmse:12.4e} {rel:12.4e} {fit.condition:10.3g} {fit.unshifted_condition:12.3g}")
+    return "\n".join(lines)
+
+
+def write_hfss_files(output_dir: Path, fits: List[PolynomialFit]) -> List[Path]:
+    """
+    Write fitted moments in formats HFSS can import.
+
+    'expressions.txt' holds one 'name = expression' line per series, in Freq
+    (Hz), to be pasted as or imported into design variables. For every series
+    a '<name>.tab' dataset with frequency (Hz) and fitted value is written,
+    which can be imported as dataset and used via pwl($<name>, Freq).
+
+    Args:
+        output_dir: Folder to write to (created if missing)
+        fits: Fits as returned by fit_polynomials or fit_moment_sets
+
+    Returns:
+        Paths of all written files
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+
+    expression_file = output_dir / "expressions.txt"
+    with open(expression_file, "w", encoding="utf-8") as f:
+        for fit in fits:
+            for name, expression in fit.expressions().items():
+                f.write(f"{name} = {expression}\n")
+    written.append(expression_file)
+
+    for fit in fits:
+        for name, values in zip(fit.names, fit.evaluate(fit.frequency)):
+            dataset_file = output_dir / f"{name}.tab"
+            np.savetxt(dataset_file, np.column_stack((fit.frequency, values)),
+                       delimiter="\t", header="Freq\tvalue", comments="")
+            written.append(dataset_file)
+    return written
@@ -0,0 +1,237 @@
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .csv_cache import write_atomic
+
+
+# Header of the dipole moment CSV files
+CSV_HEADER = 'Frequency (GHz),Electric Dipole Moment * 377 (Vm),Magnetic Dipole Moment (Vm)'
+
+
+@dataclass
+class MomentRecord:
+    """
+    Moments of one antenna or parameter variant.
+
+    Attributes:
+        name: Identifier of the record (antenna type, variant label, ...)
+        frequency: Frequencies in Hz
+        m_electric: Absolute electric moment
+        m_magnetic: Absolute magnetic moment
+    """
+    name: str
+    frequency: np.ndarray
+    m_electric: np.ndarray
+    m_magnetic: np.ndarray
+
+    def table(self) -> np.ndarray:
+        """Columns as written to CSV: frequency in GHz, m_e * 377, m_m."""
+        return np.column_stack((self.frequency / 1e9, self.m_electric * 377, self.m_magnetic))
+
+
+class MomentSink(ABC):
+    """
+    Destination for calculated moments.
+
+    write() collects records and hands them to store() in batches of
+    batch_size; close() (or leaving a with-block) stores the remainder.
+    Subclasses implement store().
+    """
+
+    def __init__(self, batch_size: int = 1):
+        self.batch_size = batch_size
+        self._pending: List[MomentRecord] = []
+
+    def write(self, frequency: np.ndarray, m_electric: np.ndarray,
+              m_magnetic: np.ndarray, name: str = 'dipole-moments') -> None:
+        """
+        Add the moments of one antenna or variant.
+
+        Args:
+            frequency: Frequencies in Hz
+            m_electric: Electric moment as returned by calculate_moments
+            m_magnetic: Magnetic moment as returned by calculate_moments
+            name: Identifier of the record, used in file names
+        """
+        self._pending.append(MomentRecord(name, np.asarray(frequency),
+                                          np.asarray(m_electric), np.asarray(m_magnetic)))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Store all pending records."""
+        records, self._pending = self._pending, []
+        if records:
+            self.store(records)
+
+    @abstractmethod
+    def store(self, records: List[MomentRecord]) -> None:
+        """Write a batch of records to the destination."""
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CsvSink(MomentSink):
+    """
+    Writes each record to a CSV file in the layout of dipole-moments.csv.
+
+    The path may contain '{name}', which is replaced by the record name.
+    Files are written via a temporary file and renamed, so concurrent runs
+    never leave a partially written file behind.
+    """
+
+    def __init__(self, path: str = 'output/csv/dipole-moments.csv', batch_size: int = 1):
+        super().__init__(batch_size)
+        self.path = path
+
+    def store(self, records: List[MomentRecord]) -> None:
+        for record in records:
+            path = Path(self.path.format(name=record.name))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(path, lambda f: np.savetxt(f, record.table(), delimiter=',',
+                                                     header=CSV_HEADER))
+
+
+class NpzSink(MomentSink):
+    """
+    Writes each record to a binary .npz file.
+
+    The archive holds the arrays 'frequency', 'm_electric' and 'm_magnetic'
+    at full precision. The path may contain '{name}'.
+    """
+
+    def __init__(self, path: str = 'output/npz/{name}.npz', batch_size: int = 1):
+        super().__init__(batch_size)
+        self.path = path
+
+    def store(self, records: List[MomentRecord]) -> None:
+        for record in records:
+            path = Path(self.path.format(name=record.name))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(path, lambda f: np.savez(f, frequency=record.frequency,
+                                                   m_electric=record.m_electric,
+                                                   m_magnetic=record.m_magnetic))
+
+
+class MemorySink(MomentSink):
+    """Keeps all records in memory, keyed by name (a later record replaces an earlier one)."""
+
+    def __init__(self):
+        super().__init__(batch_size=1)
+        self.records: Dict[str, MomentRecord] = {}
+
+    def store(self, records: List[MomentRecord]) -> None:
+        for record in records:
+            self.records[record.name] = record
+
+
+class AsyncSink(MomentSink):
+    """
+    Runs another sink in a background thread.
+
+    write() only queues the record, so computation continues while earlier
+    results are written. Errors of the wrapped sink are raised again by
+    flush() or close().
+    """
+
+    def __init__(self, sink: MomentSink, max_pending: int = 64):
+        super().__init__(batch_size=1)
+        self.sink = sink
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, frequency: np.ndarray, m_electric: np.ndarray,
+              m_magnetic: np.ndarray, name: str = 'dipole-moments') -> None:
+        self._raise_error()
+        self._queue.put((self.sink.write, (frequency, m_electric, m_magnetic, name)))
+
+    def store(self, records: List[MomentRecord]) -> None:
+        self._raise_error()
+        self._queue.put((self.sink.store, (records,)))
+
+    def flush(self) -> None:
+        """Wait until all queued records have been stored by the wrapped sink."""
+        self._queue.put((self.sink.flush, ()))
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put((self.sink.close, ()))
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def _run(self) -> None:
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                if self._error is None:
+                    function, args = task
+                    function(*args)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+
+def open_sink(path: Optional[str], batch_size: int = 1) -> MomentSink:
+    """
+    Create a sink matching the file extension of path.
+
+    Args:
+        path: '.csv' or '.npz' file (may contain '{name}'), or None for memory
+        batch_size: Number of records collected before they are written
+
+    Returns:
+        CsvSink, NpzSink or MemorySink
+    """
+    if path is None:
+        return MemorySink()
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return CsvSink(path, batch_size)
+    if extension == '.npz':
+        return NpzSink(path, batch_size)
+    raise ValueError(f"No moment sink for '{extension}' files: {path}")
+
+
+def read_moment_csv(path: str, name: Optional[str] = None) -> MomentRecord:
+    """
+    Read moments written by CsvSink (the layout of dipole-moments.csv).
+
+    Args:
+        path: CSV file
+        name: Record name, by default the name of the folder holding the
+            file (e.g. 'cfm' for simulations/results/cfm/dipole-moments.csv)
+
+    Returns:
+        MomentRecord with frequencies in Hz and the absolute moments
+    """
+    table = np.loadtxt(path, delimiter=',', ndmin=2)
+    if name is None:
+        name = Path(path).resolve().parent.name
+    return MomentRecord(name, table[:, 0] * 1e9, table[:, 1] / 377, table[:, 2])
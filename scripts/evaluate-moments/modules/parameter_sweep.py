@@ -0,0 +1,204 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .csv_cache import write_atomic
+
+
+# Grid points evaluated per chunk by default; the model's intermediate
+# arrays (about 30 complex quantities for calc()) stay around 100 MB
+DEFAULT_CHUNK_SIZE = 1 << 18
+
+# Manifest of a sweep store and the file holding its axis values
+MANIFEST_NAME = "sweep.json"
+AXES_NAME = "axes.npz"
+
+# Model, inputs and store of the running sweep in a worker process
+_worker_state: dict = {}
+
+
+class SweepStore:
+    """
+    Results of a parameter sweep on disk.
+
+    The store is a folder with one .npy file per output quantity of the
+    grid's full shape (memory-mapped, so any slice is read without loading
+    the rest), the axis values in axes.npz and a sweep.json manifest.
+
+    Attributes:
+        path: Folder of the store
+        axes: Axis name -> 1-D values, in grid order
+        outputs: Names of the stored quantities
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        manifest = json.loads((self.path / MANIFEST_NAME).read_text())
+        with np.load(self.path / AXES_NAME) as axes:
+            self.axes = {name: axes[name] for name in manifest["axes"]}
+        self.outputs: List[str] = manifest["outputs"]
+        self.complete: bool = manifest["complete"]
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(values.size for values in self.axes.values())
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Read-only memory map of one output over the whole grid."""
+        if name not in self.outputs:
+            raise KeyError(f"No output '{name}' in {self.path}: {self.outputs}")
+        return np.load(self.path / f"{name}.npy", mmap_mode="r")
+
+
+def run_sweep(model: Callable[..., Dict[str, np.ndarray]],
+              axes: Dict[str, Sequence[float]],
+              outputs: Sequence[str],
+              store: Path,
+              fixed: Optional[Dict[str, object]] = None,
+              chunk_size: int = DEFAULT_CHUNK_SIZE,
+              workers: Optional[int] = 1) -> SweepStore:
+    """
+    Evaluate a broadcasting model over an N-dimensional parameter grid.
+
+    The grid is the outer product of the axes. It is evaluated in chunks
+    of chunk_size consecutive grid points (C order): every chunk calls the
+    model once with 1-D arrays and writes its outputs straight into
+    memory-mapped .npy files, so neither inputs nor results of the whole
+    grid are held in memory. With several workers, chunks are distributed
+    over a process pool; each process writes its own disjoint slices.
+
+    Args:
+        model: Function taking the axis and fixed values as keyword
+            arguments (arrays of equal shape) and returning a dict that
+            contains outputs, e.g. calc() of the equivalent circuits. Must
+            be importable by the worker processes if workers != 1.
+        axes: Parameter name -> values, in grid order; put 'frequency'
+            last so that per-frequency fixed inputs broadcast against it
+        outputs: Result keys of the model to store
+        store: Folder of the store (created; existing outputs are overwritten)
+        fixed: Further model arguments, scalars or arrays broadcastable to
+            the grid shape (e.g. measured output power of shape (F,))
+        chunk_size: Grid points per model call
+        workers: Number of processes; 1 evaluates in this process, None
+            uses one per CPU
+
+    Returns:
+        SweepStore of the results
+    """
+    axes = {name: np.asarray(values, dtype=float).reshape(-1) for name, values in axes.items()}
+    fixed = {name: np.asarray(value) for name, value in (fixed or {}).items()}
+    shape = tuple(values.size for values in axes.values())
+    for name, value in fixed.items():
+        try:
+            np.broadcast_shapes(value.shape, shape)
+        except ValueError:
+            raise ValueError(f"Fixed input '{name}' of shape {value.shape} does not "
+                             f"broadcast to the grid {shape}") from None
+
+    store = Path(store)
+    total = int(np.prod(shape))
+    # One grid point tells the output types
+    probe = _evaluate(model, axes, fixed, shape, outputs, 0, 1)
+    create_store(store, axes, {name: probe[name].dtype for name in outputs}, chunk_size)
+
+    chunks = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+    state = (model, axes, fixed, shape, list(outputs), store)
+    if workers == 1 or len(chunks) == 1:
+        _init_sweep_worker(*state)
+        try:
+            for chunk in chunks:
+                _run_chunk(chunk)
+        finally:
+            _worker_state.clear()
+    else:
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                                 initargs=state) as pool:
+            for _ in pool.map(_run_chunk, chunks):
+                pass
+
+    write_manifest(store, axes, outputs, chunk_size, complete=True)
+    return SweepStore(store)
+
+
+def create_store(store: Path, axes: Dict[str, np.ndarray], outputs: Dict[str, np.dtype],
+                 chunk_size: int) -> Dict[str, np.memmap]:
+    """
+    Lay out an empty, incomplete store to be filled by the caller.
+
+    Writes the axes and a manifest with complete = False and creates one
+    .npy file of the grid shape per output. Once all values are written,
+    write_manifest(..., complete=True) marks the store complete.
+
+    Args:
+        store: Folder of the store (created; existing outputs are overwritten)
+        axes: Axis name -> 1-D values, in grid order
+        outputs: Output name -> storage type
+        chunk_size: Grid points per block, recorded in the manifest
+
+    Returns:
+        Output name -> writable memory map of the grid shape
+    """
+    store = Path(store)
+    store.mkdir(parents=True, exist_ok=True)
+    shape = tuple(values.size for values in axes.values())
+    files = {}
+    for name, dtype in outputs.items():
+        files[name] = np.lib.format.open_memmap(store / f"{name}.npy", mode="w+", dtype=dtype, shape=shape)
+        files[name].flush()
+    write_atomic(store / AXES_NAME, lambda f: np.savez(f, **axes))
+    write_manifest(store, axes, list(outputs), chunk_size, complete=False)
+    return files
+
+
+def write_manifest(store: Path, axes: Dict[str, np.ndarray], outputs: Sequence[str],
+                   chunk_size: int, complete: bool) -> None:
+    """Write the sweep.json manifest of a store."""
+    manifest = {"axes": list(axes), "shape": [values.size for values in axes.values()],
+                "outputs": list(outputs), "chunk_size": chunk_size, "complete": complete}
+    write_atomic(store / MANIFEST_NAME, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+
+
+def _init_sweep_worker(model, axes, fixed, shape, outputs, store):
+    _worker_state.update(model=model, axes=axes, fixed=fixed, shape=shape, outputs=outputs,
+                         files={name: np.load(store / f"{name}.npy", mmap_mode="r+") for name in outputs})
+
+
+def _run_chunk(chunk: Tuple[int, int]) -> int:
+    """Evaluate grid points [start, stop) and write them into the store."""
+    start, stop = chunk
+    state = _worker_state
+    results = _evaluate(state["model"], state["axes"], state["fixed"], state["shape"],
+                        state["outputs"], start, stop)
+    for name, values in results.items():
+        target = state["files"][name]
+        target.reshape(-1)[start:stop] = values
+        target.flush()
+    return stop - start
+
+
+def _evaluate(model, axes, fixed, shape, outputs, start, stop) -> Dict[str, np.ndarray]:
+    """Model outputs for the grid points [start, stop), as 1-D arrays."""
+    indices = np.unravel_index(np.arange(start, stop), shape)
+    arguments = {name: values[index] for (name, values), index in zip(axes.items(), indices)}
+    for name, value in fixed.items():
+        arguments[name] = _take(value, indices, shape)
+    results = model(**arguments)
+    missing = [name for name in outputs if name not in results]
+    if missing:
+        raise KeyError(f"Model returned no {missing}")
+    return {name: np.broadcast_to(results[name], (stop - start,)) for name in outputs}
+
+
+def _take(value: np.ndarray, indices: Tuple[np.ndarray, ...], shape: Tuple[int, ...]) -> np.ndarray:
+    """Entries of value (broadcast to shape) at the given grid indices, without broadcasting it."""
+    if value.ndim == 0:
+        return value
+    # Broadcasting aligns trailing dimensions; size-1 dimensions repeat
+    trailing = indices[len(shape) - value.ndim:]
+    return value[tuple(index if size > 1 else 0 for index, size in zip(trailing, value.shape))]
+
@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+
+# Default size of a phase step (beyond the linear trend) that is flagged, in rad
+JUMP_THRESHOLD = np.pi / 2
+
+
+@dataclass
+class PhaseCorrection:
+    """
+    Phases after unwrapping and reference-plane correction.
+
+    Attributes:
+        phases: Corrected phases in rad, shape (n_columns, n_frequencies)
+        delays: Reference-plane delay removed per column in s
+        offsets: Constant phase removed per column in rad
+        discontinuities: True where the step from a sample to the next one
+            deviates from the column's linear trend by more than the
+            threshold, shape (n_columns, n_frequencies - 1)
+    """
+    phases: np.ndarray
+    delays: np.ndarray
+    offsets: np.ndarray
+    discontinuities: np.ndarray
+
+    @property
+    def n_discontinuities(self) -> int:
+        """Number of flagged steps over all columns."""
+        return int(np.count_nonzero(self.discontinuities))
+
+    def discontinuity_frequencies(self, frequency: np.ndarray) -> list:
+        """Per column, the frequencies at which a flagged step starts."""
+        frequency = np.asarray(frequency, dtype=float)
+        return [frequency[:-1][row] for row in self.discontinuities]
+
+
+def unwrap_phases(phases: np.ndarray, degrees: bool = False) -> np.ndarray:
+    """
+    Unwrap phase columns over frequency in one vectorized pass.
+
+    Args:
+        phases: Phases along the last axis, e.g. shape (n_columns, n_frequencies)
+        degrees: Input is in degrees; the result is always in rad
+
+    Returns:
+        Unwrapped phases in rad
+    """
+    phases = np.asarray(phases, dtype=float)
+    if degrees:
+        phases = np.deg2rad(phases)
+    return np.unwrap(phases, axis=-1)
+
+
+def fit_reference_delays(frequency: np.ndarray, phases: np.ndarray):
+    """
+    Fit phase = offset - 2 pi f delay to every (unwrapped) column at once.
+
+    Returns:
+        Tuple of (delays in s, offsets in rad), one per column
+    """
+    omega = 2 * np.pi * np.asarray(frequency, dtype=float)
+    # Scaled to keep the least-squares problem well conditioned
+    scale = np.max(np.abs(omega)) or 1.0
+    design = np.column_stack((np.ones_like(omega), omega / scale))
+    coefficients = np.linalg.lstsq(design, np.atleast_2d(phases).T, rcond=None)[0]
+    return -coefficients[1] / scale, coefficients[0]
+
+
+def find_discontinuities(frequency: np.ndarray, phases: np.ndarray,
+                         threshold: float = JUMP_THRESHOLD) -> np.ndarray:
+    """
+    Flag phase steps that do not follow the linear trend of their column.
+
+    The expected step between two samples is the median phase slope of the
+    column times the frequency spacing; steps deviating from it by more than
+    threshold (e.g. sign flips of pi or ambiguous unwrapping) are flagged.
+
+    Returns:
+        Boolean array of shape (n_columns, n_frequencies - 1)
+    """
+    frequency = np.asarray(frequency, dtype=float)
+    phases = np.atleast_2d(phases)
+    spacing = np.diff(frequency)
+    steps = np.diff(phases, axis=-1)
+    slope = np.median(steps / spacing, axis=-1, keepdims=True)
+    return np.abs(steps - slope * spacing) > threshold
+
+
+def process_phases(frequency: np.ndarray, phases: np.ndarray, degrees: bool = False,
+                   delays: Optional[Union[float, Sequence[float]]] = None,
+                   offsets: Optional[Union[float, Sequence[float]]] = None,
+                   fit_delays: bool = False,
+                   threshold: float = JUMP_THRESHOLD) -> PhaseCorrection:
+    """
+    Unwrap phase columns, de-embed reference planes and flag discontinuities.
+
+    A port reference plane shifted by a line of delay tau adds the linear
+    phase -2 pi f tau. It is removed by adding 2 pi f tau (and subtracting a
+    constant offset, e.g. pi for a reversed port orientation).
+
+    Args:
+        frequency: Frequencies in Hz
+        phases: Phases, shape (n_columns, n_frequencies) or (n_frequencies,)
+        degrees: Input is in degrees
+        delays: Known delay per column (or one for all) in s
+        offsets: Known constant phase per column (or one for all) in rad
+        fit_delays: Fit delay and offset of every column instead; overrides
+            delays and offsets
+        threshold: Flag steps deviating from the linear trend by more than this (rad)
+
+    Returns:
+        PhaseCorrection with phases of shape (n_columns, n_frequencies)
+    """
+    frequency = np.asarray(frequency, dtype=float)
+    unwrapped = np.atleast_2d(unwrap_phases(phases, degrees))
+    n_columns = unwrapped.shape[0]
+
+    if fit_delays:
+        delays, offsets = fit_reference_delays(frequency, unwrapped)
+    delays = np.broadcast_to(np.asarray(0.0 if delays is None else delays, dtype=float), (n_columns,))
+    offsets = np.broadcast_to(np.asarray(0.0 if offsets is None else offsets, dtype=float), (n_columns,))
+
+    corrected = unwrapped + 2 * np.pi * frequency * delays[:, None] - offsets[:, None]
+    discontinuities = find_discontinuities(frequency, corrected, threshold)
+    return PhaseCorrection(corrected, np.array(delays), np.array(offsets), discontinuities)
@@ -0,0 +1,159 @@
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from .s_parameters import read_antenna_s_parameters
+from .calculate_moments import calculate_moments
+from .frequency_grid import align_quantities
+from .moment_sinks import MomentSink
+from .phase_processing import process_phases
+from .tem_cell import TEM_CELLS, TemCell, chamber_centre
+from .uncertainty import Perturbation, moment_uncertainty
+from .vector_moments import extract_moment_vectors, waves_from_s_parameters
+
+
+def evaluate_antenna(antenna_type: str, data_dir: Path = Path("data"),
+                     antenna_power: float = 1.0,
+                     sink: Optional[MomentSink] = None,
+                     reference_delays: Optional[Sequence[float]] = None,
+                     reference_offsets: Optional[Sequence[float]] = None,
+                     uncertainty: Optional[Dict[str, Perturbation]] = None,
+                     n_samples: int = 10000,
+                     tem_cell: Union[str, TemCell] = 'empty_tem_cell',
+                     antenna_position: Optional[Tuple[float, float]] = None) -> Dict[str, np.ndarray]:
+    """
+    Run the dipole moment extraction for one antenna dataset.
+
+    Reads the waveport phases and magnitude of '<data_dir>/<antenna_type>',
+    derives output power and TEM-mode E-field and calculates the moments.
+    The waveport phases are unwrapped over frequency and their reference
+    planes de-embedded (see phase_processing) before the phase shift is
+    formed. Nothing is written to disk unless a sink is given.
+
+    Args:
+        antenna_type: Name of the data folder (e.g., 'loop', 'monopole')
+        data_dir: Folder holding one sub-folder per antenna
+        antenna_power: Antenna input power in Watts
+        sink: Receives the moments under the name antenna_type
+        reference_delays: Reference-plane delay of waveport 1 and 2 in s
+        reference_offsets: Constant phase of waveport 1 and 2 in rad (e.g. pi
+            for a reversed port)
+        uncertainty: Perturbations of 'e_field', 'phase_shift' and
+            'output_power'; if given, confidence bands of the moments are
+            estimated from n_samples Monte Carlo samples per frequency
+        n_samples: Ensemble size of the uncertainty estimate
+        tem_cell: Cell geometry, a name of TEM_CELLS or a TemCell; the TEM-mode
+            field at the antenna is taken from its analytical field
+        antenna_position: Antenna position (x, y) in m from the septum
+            centre, by default midway between septum and bottom wall
+
+    Returns:
+        Dictionary with 'frequencies' (Hz), 'columns_phase_shift' (with
+        the corrected phases), 'phase_shift', 'phase_discontinuities' (flagged
+        steps per waveport, see PhaseCorrection), 'output_power', 'efield',
+        'm_e', 'm_m' and 'm_e_band', 'm_m_band' (ConfidenceBand, None
+        without uncertainty)
+    """
+    s_parameters = read_antenna_s_parameters(antenna_type, data_dir)
+    frequencies = s_parameters.frequency
+
+    # === Phase, Magnitude, and E-Field Processing ===
+    # Unwrap both waveport phases and remove reference-plane delays
+    antenna = s_parameters.port_index('antenna')
+    waveports = [s_parameters.port_index('waveport1'), s_parameters.port_index('waveport2')]
+    correction = process_phases(frequencies, s_parameters.phase[:, waveports, antenna].T,
+                                delays=reference_delays, offsets=reference_offsets)
+    columns_phase_shift = [frequencies / 1e9, *correction.phases]
+
+    phase_shift = columns_phase_shift[1] - columns_phase_shift[2]
+
+    output_power = s_parameters.power('waveport1', 'antenna', antenna_power)
+    if isinstance(tem_cell, str):
+        tem_cell = TEM_CELLS[tem_cell]
+    if antenna_position is None:
+        antenna_position = chamber_centre(tem_cell)
+    # Twice the wave amplitude sqrt(P) times the effective normalized field
+    normalized_field = abs(tem_cell.normalized_field(*antenna_position)[1])
+    efield = 2 * np.sqrt(output_power) * normalized_field
+
+    m_e, m_m = calculate_moments(efield, phase_shift, output_power, frequencies)
+    if sink is not None:
+        sink.write(frequencies, m_e, m_m, name=antenna_type)
+    m_e_band = m_m_band = None
+    if uncertainty:
+        m_e_band, m_m_band = moment_uncertainty(efield, phase_shift, output_power, frequencies,
+                                                uncertainty, n_samples=n_samples)
+
+    return {
+        'frequencies': frequencies,
+        'columns_phase_shift': columns_phase_shift,
+        'phase_shift': phase_shift,
+        'phase_discontinuities': correction.discontinuities,
+        'output_power': output_power,
+        'efield': efield,
+        'm_e': m_e,
+        'm_m': m_m,
+        'm_e_band': m_e_band,
+        'm_m_band': m_m_band,
+    }
+
+
+def evaluate_orientations(antenna_types: Sequence[str], rotations: np.ndarray,
+                          data_dir: Path = Path("data"),
+                          antenna_power: float = 1.0,
+                          reference_delays: Optional[Sequence[float]] = None,
+                          reference_offsets: Optional[Sequence[float]] = None,
+                          tem_cell: Union[str, TemCell] = 'empty_tem_cell',
+                          antenna_position: Optional[Tuple[float, float]] = None) -> Dict[str, np.ndarray]:
+    """
+    Extract the full electric and magnetic moment vectors from several orientations.
+
+    Every dataset holds the simulation of the same antenna in another
+    orientation. The waveport waves of all datasets are brought onto one
+    frequency grid and the six complex moment components are fitted to
+    them by least squares (see vector_moments.extract_moment_vectors).
+
+    Args:
+        antenna_types: Data folder per orientation, at least three
+        rotations: Orientation of the antenna per dataset, shape (N, 3, 3)
+            (see forward_model.rotation_matrices)
+        data_dir, antenna_power, reference_delays, reference_offsets,
+        tem_cell, antenna_position: As for evaluate_antenna, shared by all
+            datasets
+
+    Returns:
+        Dictionary with 'frequencies' (Hz), 'm_e' and 'm_m' (complex
+        vectors in the antenna frame, shape (n_frequencies, 3)), 'residual'
+        (relative misfit per frequency), 'condition_number' and
+        'radiated_power' (W)
+    """
+    if isinstance(tem_cell, str):
+        tem_cell = TEM_CELLS[tem_cell]
+    if antenna_position is None:
+        antenna_position = chamber_centre(tem_cell)
+
+    waves = {}
+    for index, antenna_type in enumerate(antenna_types):
+        s_parameters = read_antenna_s_parameters(antenna_type, data_dir)
+        antenna = s_parameters.port_index('antenna')
+        waveports = [s_parameters.port_index('waveport1'), s_parameters.port_index('waveport2')]
+        correction = process_phases(s_parameters.frequency, s_parameters.phase[:, waveports, antenna].T,
+                                    delays=reference_delays, offsets=reference_offsets)
+        a, b = waves_from_s_parameters(s_parameters, antenna_power, correction.phases)
+        waves[f'a{index}'] = (s_parameters.frequency, a)
+        waves[f'b{index}'] = (s_parameters.frequency, b)
+    frequencies, waves = align_quantities(waves)
+
+    field = np.stack(tem_cell.normalized_field(*antenna_position) + (0.0,))
+    n_orientations = len(antenna_types)
+    moments = extract_moment_vectors([waves[f'a{index}'] for index in range(n_orientations)],
+                                     [waves[f'b{index}'] for index in range(n_orientations)],
+                                     field, rotations)
+    return {
+        'frequencies': frequencies,
+        'm_e': moments.m_e,
+        'm_m': moments.m_m,
+        'residual': moments.residual,
+        'condition_number': moments.condition_number,
+        'radiated_power': moments.radiated_power(frequencies),
+    }
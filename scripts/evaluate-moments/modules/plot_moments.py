@@ -1,3 +1,8 @@
+import io
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Union
+
 from matplotlib import pyplot as plt
 import numpy as np
 import scienceplots  # You need to install this package first via: pip install SciencePlots
@@ -9,17 +14,18 @@ def setup_plot_style():
     plt.rcParams.update({'figure.dpi': '100'})
 
 
-def plot_phase_shift(columns_phase_shift, frequencies, antenna_type):
+def draw_phase_shift(columns_phase_shift, frequencies, antenna_type):
     """
-    Plot phase shift comparison between two waveports over frequency.
+    Draw phase shift comparison between two waveports over frequency.
     
     Args:
         columns_phase_shift: Array containing frequency and phase data for both waveports
         frequencies: Frequency array
         antenna_type: String identifier for antenna type
+
+    Returns:
+        The figure (not saved or shown)
     """
-    setup_plot_style()
-    
     antenna_name = antenna_type.replace('-', ' ')
     fig, ax = plt.subplots(figsize=(4, 3))
     #fig, ax = plt.subplots(figsize=(7, 3.5))     # 2:1 aspect ratio (wide)
@@ -91,22 +97,24 @@ def plot_phase_shift(columns_phase_shift, frequencies, antenna_type):
 
     # Finalize plot
     fig.tight_layout()
-    fig.savefig(f"output/plots/phase.png", dpi=600)
-    plt.show()
+    return fig
 
 
-def plot_moments(m_e, m_m, frequencies, antenna_type):
+def draw_moments(m_e, m_m, frequencies, antenna_type, m_e_band=None, m_m_band=None):
     """
-    Plot electric and magnetic dipole moments over frequency.
+    Draw electric and magnetic dipole moments over frequency.
     
     Args:
         m_e: Electric dipole moment array
         m_m: Magnetic dipole moment array
         frequencies: Frequency array
         antenna_type: String identifier for antenna type
+        m_e_band: Optional ConfidenceBand of |m_e|, drawn as shaded area
+        m_m_band: Optional ConfidenceBand of |m_m|, drawn as shaded area
+
+    Returns:
+        The figure (not saved or shown)
     """
-    setup_plot_style()
-    
     antenna_name = antenna_type.replace('-', ' ')
     normalized_m_e = np.abs(m_e) * 377
     
@@ -118,6 +126,9 @@ def plot_moments(m_e, m_m, frequencies, antenna_type):
     ax1.set_ylabel(r'Electric Dipole Moment $\left|m_e\right|\cdot 377 \Omega$ (Vm)')
     ax1.plot(frequencies / 1e9, normalized_m_e, 
              label=r'$\left|m_e\right| \cdot 377 \Omega$')
+    if m_e_band is not None:
+        ax1.fill_between(frequencies / 1e9, m_e_band.lower * 377, m_e_band.upper * 377, alpha=0.25,
+                         label=f'{m_e_band.confidence:.0%} confidence')
     ax1.set_xlim(np.min(frequencies / 1e9), np.max(frequencies / 1e9))
     ax1.ticklabel_format(axis='y', style='scientific', scilimits=(0, 0))
     
@@ -132,12 +143,18 @@ def plot_moments(m_e, m_m, frequencies, antenna_type):
     ax2.plot(frequencies / 1e9, np.abs(m_m), 
              label=r'$\left|m_m\right|$', 
              linestyle='--', color="red")
+    if m_m_band is not None:
+        ax2.fill_between(frequencies / 1e9, m_m_band.lower, m_m_band.upper, alpha=0.25,
+                         color="red", label=f'{m_m_band.confidence:.0%} confidence')
     ax2.tick_params(axis='y', labelcolor="red")
     ax2.ticklabel_format(axis='y', style='scientific', scilimits=(0, 0))
     
-    # Set matching y-axis limits
-    max_value = max(np.max(normalized_m_e), np.max(np.abs(m_m)))
-    min_value = min(np.min(normalized_m_e), np.min(np.abs(m_m)))
+    # Set matching y-axis limits (including the bands)
+    curves = [normalized_m_e, np.abs(m_m)]
+    curves += [m_e_band.lower * 377, m_e_band.upper * 377] if m_e_band is not None else []
+    curves += [m_m_band.lower, m_m_band.upper] if m_m_band is not None else []
+    max_value = max(np.max(curve) for curve in curves)
+    min_value = min(np.min(curve) for curve in curves)
     ax1.set_ylim(min_value-2e-4, max_value)
     ax2.set_ylim(min_value-2e-4, max_value)
     ax2.set_xlim(np.min(frequencies / 1e9), np.max(frequencies / 1e9))
@@ -151,21 +168,22 @@ def plot_moments(m_e, m_m, frequencies, antenna_type):
     
     # Finalize plot
     fig.tight_layout()
-    fig.savefig(f"output/plots/dipole-moments.png", dpi=600)
-    plt.show()
+    return fig
+
 
-def plot_output_power_e_field(frequencies, output_power, e_field, antenna_type):
+def draw_output_power_e_field(frequencies, output_power, e_field, antenna_type):
     """
-    Plot electric field and output power over frequency.
+    Draw electric field and output power over frequency.
     
     Args:
         frequencies: Frequency array
         output_power: Output power array
         e_field: Electric field array
         antenna_type: String identifier for antenna type
+
+    Returns:
+        The figure (not saved or shown)
     """
-    setup_plot_style()
-    
     fig, ax1 = plt.subplots(figsize=(4, 3))
     #fig, ax1 = plt.subplots(figsize=(7, 3.5))     # 2:1 aspect ratio (wide)
     
@@ -198,5 +216,101 @@ def plot_output_power_e_field(frequencies, output_power, e_field, antenna_type):
     
     # Finalize plot
     fig.tight_layout()
-    fig.savefig(f"output/plots/output-power.png", dpi=600)
-    plt.show()
+    return fig
+
+
+def plot_phase_shift(columns_phase_shift, frequencies, antenna_type, show=True):
+    """Draw the phase shift, save it to output/plots/phase.png and show it."""
+    setup_plot_style()
+    fig = draw_phase_shift(columns_phase_shift, frequencies, antenna_type)
+    _finish(fig, "output/plots/phase.png", show)
+
+
+def plot_moments(m_e, m_m, frequencies, antenna_type, show=True, m_e_band=None, m_m_band=None):
+    """Draw the dipole moments (with optional confidence bands), save them to output/plots/dipole-moments.png and show them."""
+    setup_plot_style()
+    fig = draw_moments(m_e, m_m, frequencies, antenna_type, m_e_band, m_m_band)
+    _finish(fig, "output/plots/dipole-moments.png", show)
+
+
+def plot_output_power_e_field(frequencies, output_power, e_field, antenna_type, show=True):
+    """Draw E-field and output power, save them to output/plots/output-power.png and show them."""
+    setup_plot_style()
+    fig = draw_output_power_e_field(frequencies, output_power, e_field, antenna_type)
+    _finish(fig, "output/plots/output-power.png", show)
+
+
+def _finish(fig, output_file, show):
+    fig.savefig(output_file, dpi=600)
+    if show:
+        plt.show()
+    else:
+        plt.close(fig)
+
+
+# Figures that can be rendered as jobs, by name
+FIGURES: Dict[str, Callable] = {
+    'phase_shift': draw_phase_shift,
+    'moments': draw_moments,
+    'output_power_e_field': draw_output_power_e_field,
+}
+
+
+@dataclass
+class FigureJob:
+    """
+    One figure to render headlessly.
+
+    Attributes:
+        figure: Name of the figure in FIGURES
+        args: Positional arguments of the draw function
+        output_file: Image file to write; None returns the image as bytes
+        format: Image format of the in-memory buffer
+        dpi: Resolution of the image
+        kwargs: Keyword arguments of the draw function
+    """
+    figure: str
+    args: tuple
+    output_file: Optional[str] = None
+    format: str = 'png'
+    dpi: int = 600
+    kwargs: dict = field(default_factory=dict)
+
+
+def render_figures(jobs: List[FigureJob], workers: Optional[int] = None) -> List[Union[str, bytes]]:
+    """
+    Render figure jobs in a pool of worker processes on the Agg backend.
+
+    Each worker applies the plot style once when it starts. Nothing is
+    shown, so this works without a display.
+
+    Args:
+        jobs: Figures to render
+        workers: Number of worker processes (default: number of CPUs)
+
+    Returns:
+        Per job, the output file name or the encoded image bytes
+    """
+    if not jobs:
+        return []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker) as pool:
+        return list(pool.map(render_figure, jobs))
+
+
+def render_figure(job: FigureJob) -> Union[str, bytes]:
+    """Render a single figure job in the current process (style must be set up)."""
+    fig = FIGURES[job.figure](*job.args, **job.kwargs)
+    try:
+        if job.output_file is not None:
+            fig.savefig(job.output_file, dpi=job.dpi)
+            return job.output_file
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=job.format, dpi=job.dpi)
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def _init_render_worker():
+    plt.switch_backend('Agg')
+    setup_plot_style()
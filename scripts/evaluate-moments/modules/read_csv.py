@@ -1,27 +1,42 @@
 import pandas as pd
 import numpy as np
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple, Union
 from pathlib import Path
 
+from .csv_cache import read_cached_table
+from .hfss_headers import read_schema
 
-def read_antenna_data(antenna_type: str) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+
+# Parsed CSV tables of the current run, keyed by (resolved path, skiprows)
+_parsed_tables = {}
+
+
+def read_antenna_data(antenna_type: str,
+                      data_dir: Path = Path("data")) -> Tuple[List[np.ndarray], List[np.ndarray]]:
     """
-    Read phase shift, magnitude, and E-field data from CSV files for antenna analysis.
+    Read phase shift and magnitude data from CSV files for antenna analysis.
+
+    Columns are selected by their HFSS header, so the order of the exported
+    columns and additional sweep variables do not matter.
     
     Args:
         antenna_type: Identifier for antenna (e.g., 'loop', 'dipole')
+        data_dir: Folder holding one sub-folder per antenna
         
     Returns:
-        Tuple of (phase_data, magnitude_data, efield_data) where each is a list of numpy arrays
-        representing different columns from the CSV files.
+        Tuple of (phase_data, magnitude_data) where phase_data is
+        [frequency, waveport 1 phase, waveport 2 phase] and magnitude_data is
+        [frequency, waveport 1 magnitude in dB].
     """
-    data_dir = Path("data") / antenna_type
+    data_dir = Path(data_dir) / antenna_type
     
     # Read phase shift data
-    phase_data = _read_csv_columns(data_dir / "phase.csv")
+    phase_data = load_csv_named(data_dir / "phase.csv",
+                                ["frequency", "waveport1_phase", "waveport2_phase"])
     
     # Read magnitude data  
-    magnitude_data = _read_csv_columns(data_dir / "magnitude.csv")
+    magnitude_data = load_csv_named(data_dir / "magnitude.csv",
+                                    ["frequency", ("waveport1_db", "tem_mode_db")])
     
     return phase_data, magnitude_data
 
@@ -36,6 +51,80 @@ def _read_csv_columns(csv_path: Path) -> List[np.ndarray]:
     Returns:
         List of numpy arrays, one per column (excluding first row)
     """
-    df = pd.read_csv(csv_path, header=None, dtype=float, skiprows=1)
-    return [df[col].to_numpy() for col in df.columns]
+    return load_csv_columns(csv_path)
+
+
+def load_csv_columns(csv_path: Path, columns: Optional[Sequence[int]] = None,
+                     skiprows: int = 1) -> List[np.ndarray]:
+    """
+    Read several columns of a CSV export while parsing the file only once.
+
+    The parsed table is kept for the rest of the run and shared between all
+    callers, so asking for further columns of the same file later on does not
+    re-read it. The returned columns are read-only views into that table.
+
+    Args:
+        csv_path: Path to CSV file
+        columns: Column indices to return; all columns if None
+        skiprows: Number of rows to skip at the beginning (header row)
+
+    Returns:
+        List of numpy arrays, one per requested column
+    """
+    table = _parse_csv(csv_path, skiprows)
+    if columns is None:
+        columns = range(table.shape[0])
+    return [table[index] for index in columns]
+
+
+def load_csv_named(csv_path: Path, names: Sequence[Union[str, Tuple[str, ...]]],
+                   skiprows: int = 1) -> List[np.ndarray]:
+    """
+    Read columns of an HFSS CSV export by canonical name.
+
+    Names are resolved against the parsed header (see hfss_headers), e.g.
+    'frequency', 'waveport1_phase', 'impedance_magnitude' or 'capacitance'.
+    A tuple lists alternative names of which the first present one is used.
+
+    Args:
+        csv_path: Path to CSV file
+        names: Canonical column names (or tuples of alternatives)
+        skiprows: Number of rows to skip at the beginning (header row)
+
+    Returns:
+        List of numpy arrays, one per requested name
+    """
+    schema = read_schema(csv_path)
+    indices = [schema.index(*name) if isinstance(name, tuple) else schema.index(name)
+               for name in names]
+    return load_csv_columns(csv_path, indices, skiprows)
+
+
+def clear_csv_tables() -> None:
+    """Forget all tables parsed so far, e.g. after re-exporting from HFSS."""
+    _parsed_tables.clear()
+
+
+def _parse_csv(csv_path: Path, skiprows: int) -> np.ndarray:
+    """
+    Parse a CSV file into a read-only (n_columns, n_rows) float array.
+
+    The table is stored column by column so that every column is a
+    contiguous view. Across runs it is served from the binary cache next to
+    the CSV (see csv_cache.read_cached_table).
+    """
+    key = (Path(csv_path).resolve(), skiprows)
+    table = _parsed_tables.get(key)
+    if table is None:
+        table = read_cached_table(key[0], skiprows, _parse_csv_text)
+        _parsed_tables[key] = table
+    return table
+
+
+def _parse_csv_text(csv_path: Path, skiprows: int) -> np.ndarray:
+    """Parse the text of a CSV export (cache miss path of _parse_csv)."""
+    df = pd.read_csv(csv_path, header=None, dtype=float, skiprows=skiprows)
+    table = np.ascontiguousarray(df.to_numpy().T)
+    table.flags.writeable = False
+    return table
 
@@ -0,0 +1,240 @@
+import re
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .frequency_grid import common_grid, resample
+from .hfss_headers import S_PARAMETER_KINDS, ColumnSpec, read_schema, unit_scale
+from .read_csv import load_csv_columns
+
+
+# Reports that hold an S-parameter without an S(...) expression in the
+# header: canonical name pattern -> (port, source port, kind)
+LEGACY_COLUMNS: List[Tuple[re.Pattern, Tuple[str, str, str]]] = [
+    (re.compile(r"^tem_mode_db$"), ("waveport1", "antenna", "db")),
+    (re.compile(r"^(waveport\d+)_phase$"), (r"\1", "antenna", "phase")),
+]
+
+
+class SParameters:
+    """
+    Complex S-parameters of one simulation over frequency.
+
+    data[k, i, j] is S(ports[i], ports[j]) at frequency[k], i.e. the wave
+    leaving port i for a unit wave entering port j, stored as one
+    contiguous complex128 array of shape (n_frequencies, n_ports, n_ports).
+
+    Entries that were not exported are marked in has_magnitude and
+    has_phase. An entry with a phase but no magnitude is stored with unit
+    magnitude; the magnitude, power and voltage projections are NaN there
+    (and the phase projection where no phase was exported).
+
+    Attributes:
+        frequency: Frequencies in Hz
+        ports: Port names (e.g. 'antenna', 'waveport1')
+        data: Complex S-parameters, shape (n_frequencies, n_ports, n_ports)
+        has_magnitude: Entries with exported magnitude, shape (n_ports, n_ports)
+        has_phase: Entries with exported phase, shape (n_ports, n_ports)
+        reference_impedance: Port reference impedance in Ohm
+    """
+
+    def __init__(self, frequency: np.ndarray, ports: List[str], data: np.ndarray,
+                 has_magnitude: Optional[np.ndarray] = None,
+                 has_phase: Optional[np.ndarray] = None,
+                 reference_impedance: float = 50.0):
+        self.frequency = np.asarray(frequency, dtype=float)
+        self.ports = list(ports)
+        self.data = np.ascontiguousarray(data, dtype=np.complex128)
+        n_ports = len(self.ports)
+        if self.data.shape != (self.frequency.size, n_ports, n_ports):
+            raise ValueError(f"S-parameter data of shape {self.data.shape} does not match "
+                             f"{self.frequency.size} frequencies and {n_ports} ports")
+        full = np.ones((n_ports, n_ports), dtype=bool)
+        self.has_magnitude = full if has_magnitude is None else np.asarray(has_magnitude, dtype=bool)
+        self.has_phase = full if has_phase is None else np.asarray(has_phase, dtype=bool)
+        self.reference_impedance = reference_impedance
+
+    def port_index(self, port: str) -> int:
+        """Position of a port in ports (and along the port axes of data)."""
+        try:
+            return self.ports.index(port)
+        except ValueError:
+            raise KeyError(f"No port '{port}' in {self.ports}") from None
+
+    def entry(self, to_port: str, from_port: str) -> np.ndarray:
+        """S(to_port, from_port) over frequency, as a view into data."""
+        return self.data[:, self.port_index(to_port), self.port_index(from_port)]
+
+    @property
+    def real(self) -> np.ndarray:
+        """Real part of data (view)."""
+        return self.data.real
+
+    @property
+    def imag(self) -> np.ndarray:
+        """Imaginary part of data (view)."""
+        return self.data.imag
+
+    @cached_property
+    def magnitude(self) -> np.ndarray:
+        """|S|, computed once and read-only."""
+        return _read_only(np.where(self.has_magnitude, np.abs(self.data), np.nan))
+
+    @cached_property
+    def magnitude_db(self) -> np.ndarray:
+        """20 log10 |S|, computed once and read-only."""
+        with np.errstate(divide='ignore'):
+            return _read_only(20 * np.log10(self.magnitude))
+
+    @cached_property
+    def phase(self) -> np.ndarray:
+        """Phase of S in rad (wrapped to (-pi, pi]), computed once and read-only."""
+        return _read_only(np.where(self.has_phase, np.angle(self.data), np.nan))
+
+    @cached_property
+    def power_ratio(self) -> np.ndarray:
+        """|S|^2, the power delivered per incident power, computed once and read-only."""
+        return _read_only(self.magnitude ** 2)
+
+    def power(self, to_port: str, from_port: str, incident_power: float = 1.0) -> np.ndarray:
+        """Power in W leaving to_port when incident_power (W) enters from_port."""
+        return incident_power * self.power_ratio[:, self.port_index(to_port), self.port_index(from_port)]
+
+    def voltage(self, to_port: str, from_port: str, incident_power: float = 1.0) -> np.ndarray:
+        """
+        Complex voltage wave at to_port, sqrt(P * Z0) * S, for incident_power (W) at from_port.
+
+        This is the quantity the moment calculations build from output power
+        and phase as sqrt(P_out * 50) * exp(j phase).
+        """
+        i, j = self.port_index(to_port), self.port_index(from_port)
+        if not self.has_magnitude[i, j]:
+            return np.full(self.frequency.size, np.nan + 0j)
+        return np.sqrt(incident_power * self.reference_impedance) * self.data[:, i, j]
+
+
+def read_s_parameters(*csv_paths: Path, reference_impedance: float = 50.0) -> SParameters:
+    """
+    Build complex S-parameters from HFSS magnitude and phase exports.
+
+    All S-parameter columns of the given files are collected, e.g.
+    'dB(S(waveport1:1,antenna))' from magnitude.csv and
+    'ang_rad(S(waveport1:1,antenna))' from phase.csv, or both from one file.
+    Units are detected from the headers: magnitudes in dB or linear, phases
+    in rad or deg (by the range of the values if the header has no unit),
+    frequencies in any prefixed Hz unit. Files with different frequency
+    grids are resampled onto their common samples.
+
+    Args:
+        csv_paths: CSV exports to combine (e.g. magnitude.csv, phase.csv)
+        reference_impedance: Port reference impedance in Ohm
+
+    Returns:
+        SParameters of all ports found
+
+    Raises:
+        KeyError: If a file has no frequency column
+        ValueError: If a file holds several values of another sweep variable
+    """
+    # (to, from) -> {'db' | 'mag' | 'phase': (frequency, values)}
+    entries: Dict[Tuple[str, str], Dict[str, Tuple[np.ndarray, np.ndarray]]] = {}
+    for csv_path in csv_paths:
+        schema = read_schema(csv_path)
+        table = load_csv_columns(csv_path)
+        frequency_column = schema.column("frequency")
+        frequency = table[frequency_column.index] * unit_scale(frequency_column.unit)
+        for column in schema.columns:
+            if column.is_sweep and column is not frequency_column and np.unique(table[column.index]).size > 1:
+                raise ValueError(f"{csv_path} holds several values of the sweep "
+                                 f"'{column.expression}'; export a single one")
+        for name, column in zip(schema.names, schema.columns):
+            entry = _s_parameter_entry(name, column)
+            if entry is None:
+                continue
+            to_port, from_port, kind = entry
+            values = _to_standard_unit(kind, column, table[column.index])
+            kind = 'mag' if kind == 'db' else kind
+            # Repeated columns of the same entry: the first one is used
+            entries.setdefault((to_port, from_port), {}).setdefault(kind, (frequency, values))
+
+    if not entries:
+        raise KeyError(f"No S-parameter columns in {[str(path) for path in csv_paths]}")
+    frequency = common_grid([f for parts in entries.values() for f, _ in parts.values()])
+    ports = sorted({port for pair in entries for port in pair})
+    n_ports = len(ports)
+    data = np.zeros((frequency.size, n_ports, n_ports), dtype=np.complex128)
+    has_magnitude = np.zeros((n_ports, n_ports), dtype=bool)
+    has_phase = np.zeros((n_ports, n_ports), dtype=bool)
+
+    for (to_port, from_port), parts in entries.items():
+        i, j = ports.index(to_port), ports.index(from_port)
+        magnitude = np.ones(frequency.size)
+        phase = np.zeros(frequency.size)
+        if 'mag' in parts:
+            magnitude = resample(*parts['mag'], frequency)
+            has_magnitude[i, j] = True
+        if 'phase' in parts:
+            phase = resample(*parts['phase'], frequency, phase=True)
+            has_phase[i, j] = True
+        data[:, i, j] = magnitude * np.exp(1j * phase)
+
+    return SParameters(frequency, ports, data, has_magnitude, has_phase, reference_impedance)
+
+
+def read_antenna_s_parameters(antenna_type: str, data_dir: Path = Path("data"),
+                              reference_impedance: float = 50.0) -> SParameters:
+    """
+    S-parameters of one antenna dataset.
+
+    A Touchstone file in '<data_dir>/<antenna_type>' (e.g. exported by HFSS
+    with its port names, or measured) takes precedence over the
+    'magnitude.csv' and 'phase.csv' reports.
+    """
+    # Imported here: touchstone builds on this module
+    from .touchstone import find_touchstone, read_touchstone
+
+    folder = Path(data_dir) / antenna_type
+    touchstone_file = find_touchstone(folder)
+    if touchstone_file is not None:
+        return read_touchstone(touchstone_file)
+    return read_s_parameters(folder / "magnitude.csv", folder / "phase.csv",
+                             reference_impedance=reference_impedance)
+
+
+def _s_parameter_entry(name: str, column: ColumnSpec) -> Optional[Tuple[str, str, str]]:
+    """(to port, from port, kind) of an S-parameter column, None for other columns."""
+    if column.ports is not None:
+        kind = S_PARAMETER_KINDS.get(column.function)
+        return (*column.ports, kind) if kind in ('db', 'mag', 'phase') else None
+    for pattern, (to_port, from_port, kind) in LEGACY_COLUMNS:
+        match = pattern.match(name)
+        if match:
+            return match.expand(to_port), from_port, kind
+    return None
+
+
+def _to_standard_unit(kind: str, column: ColumnSpec, values: np.ndarray) -> np.ndarray:
+    """Magnitude of a 'db' or 'mag' column as linear ratio, phase in rad."""
+    if column.negated:
+        values = -values
+    if kind == 'db':
+        return 10 ** (values / 20)
+    if kind == 'phase' and _is_degrees(column, values):
+        return np.deg2rad(values)
+    return np.asarray(values, dtype=float)
+
+
+def _is_degrees(column: ColumnSpec, values: np.ndarray) -> bool:
+    """Phase unit from the report function or header unit, else from the value range."""
+    if column.function == 'ang_deg' or column.unit == 'deg':
+        return True
+    if column.function == 'ang_rad' or column.unit == 'rad':
+        return False
+    return bool(np.nanmax(np.abs(values)) > 2 * np.pi + 1e-6)
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+# Wave impedance of free space in Ohm
+VACUUM_IMPEDANCE = 376.730313668
+
+# Upper bound of (points x series terms) evaluated at once
+_CHUNK_ENTRIES = 1 << 22
+
+# Terms with k y beyond this are below double precision (exp(-40) ~ 4e-18)
+_DECAY_LIMIT = 40.0
+
+# Series coefficients per geometry, see _series_coefficients
+_coefficients: Dict[Tuple[float, float, float, int], Tuple[np.ndarray, np.ndarray]] = {}
+
+
+@dataclass(frozen=True)
+class TemCell:
+    """
+    Cross-section of a TEM cell with a thin, centred septum.
+
+    Coordinates: x across the cell from its centre (|x| <= width / 2), y
+    from the septum plane (0 < y <= height / 2 in the upper chamber,
+    negative in the lower one).
+
+    The potential of the TEM mode is the Fourier series of Tippet and
+    Chang: the septum is held at 1 V, the walls at 0 V and the potential
+    across the gaps between septum and side walls is taken as linear. The
+    characteristic impedance uses the conformal-mapping result for a thin
+    septum, which includes the charge at the septum edges.
+
+    Attributes:
+        width: Inner width a in m
+        height: Inner height b (wall to wall) in m
+        septum_width: Width w of the septum in m
+        n_terms: Number of (odd) series terms
+    """
+    width: float
+    height: float
+    septum_width: float
+    n_terms: int = 1000
+
+    def __post_init__(self):
+        if not 0 < self.septum_width < self.width or self.height <= 0:
+            raise ValueError(f"Invalid TEM cell geometry: {self}")
+
+    @property
+    def gap(self) -> float:
+        """Gap g between septum edge and side wall in m."""
+        return (self.width - self.septum_width) / 2
+
+    @property
+    def characteristic_impedance(self) -> float:
+        """Characteristic impedance of the TEM mode in Ohm."""
+        fringe = 2 / np.pi * np.log(1 + 1 / np.tanh(np.pi * self.gap / self.height))
+        return VACUUM_IMPEDANCE / (4 * (self.septum_width / self.height + fringe))
+
+    def field_per_volt(self, x, y) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Transverse electric field of the TEM mode for 1 V on the septum.
+
+        Args:
+            x, y: Evaluation points in m (broadcast against each other)
+
+        Returns:
+            Tuple of E_x and E_y in V/m per V, of the broadcast shape of x and y
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        half_width, half_height = self.width / 2, self.height / 2
+        if np.any(np.abs(x) > half_width * (1 + 1e-12)) or np.any(np.abs(y) > half_height * (1 + 1e-12)):
+            raise ValueError(f"Points outside the cross-section |x| <= {half_width}, |y| <= {half_height}")
+
+        amplitudes, wave_numbers = _series_coefficients(self)
+        normalization = 1 - np.exp(-2 * wave_numbers * half_height)
+        # Points far from the septum need few terms: sort by distance and
+        # drop, per chunk, the terms that decayed below double precision
+        order = np.argsort(-np.abs(y).reshape(-1), kind='stable')
+        flat_x, flat_y = x.reshape(-1)[order], np.abs(y).reshape(-1)[order]
+        e_x = np.empty(flat_x.size)
+        e_y = np.empty(flat_x.size)
+        chunk = max(1, _CHUNK_ENTRIES // wave_numbers.size)
+        for start in range(0, flat_x.size, chunk):
+            part = slice(start, start + chunk)
+            distance = flat_y[part, None]
+            n = max(1, np.searchsorted(wave_numbers * distance.min(), _DECAY_LIMIT))
+            k = wave_numbers[:n]
+            # sinh(k (h - y)) / sinh(k h) and cosh(k (h - y)) / sinh(k h) without overflow
+            decay = np.exp(-k * distance) / normalization[:n]
+            reflected = np.exp(-2 * k * (half_height - distance))
+            kx = flat_x[part, None] * k
+            e_x[part] = np.sum(amplitudes[:n] * np.sin(kx) * decay * (1 - reflected), axis=-1)
+            e_y[part] = np.sum(amplitudes[:n] * np.cos(kx) * decay * (1 + reflected), axis=-1)
+        e_x[order], e_y[order] = e_x.copy(), e_y.copy()
+        # The field points away from the septum in both chambers
+        return e_x.reshape(x.shape), (np.sign(y) + (y == 0)) * e_y.reshape(x.shape)
+
+    def normalized_field(self, x, y, effective: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Normalized TEM-mode field e0 (unit mode power, integral of e0 x h0 over the cross-section is 1).
+
+        With effective=True the effective (RMS) value e0 / sqrt(2) is
+        returned, the convention of the moment formulas in calc(): for a
+        uniform field of a 50 Ohm cell of height 24 mm this is
+        sqrt(25) / 12 mm = 416.67 V/m.
+
+        Returns:
+            Tuple of the x and y components in V/m (per sqrt(W))
+        """
+        scale = np.sqrt(self.characteristic_impedance / (2 if effective else 1))
+        e_x, e_y = self.field_per_volt(x, y)
+        return scale * e_x, scale * e_y
+
+
+# TEM cells of the HFSS projects in simulations/hfss-projects (their
+# variables a, b and w are half of the width, height and septum width)
+TEM_CELLS: Dict[str, TemCell] = {
+    'empty_tem_cell': TemCell(40e-3, 24e-3, 30e-3),
+    'small_tem_cell': TemCell(10e-3, 6e-3, 7.5e-3),
+    # Two stacked cells, each with this cross-section
+    'dual_tem_cell': TemCell(40e-3, 24e-3, 30e-3),
+}
+
+
+def chamber_centre(cell: TemCell) -> Tuple[float, float]:
+    """Point midway between septum and bottom wall, below the septum centre."""
+    return 0.0, -cell.height / 4
+
+
+def clear_field_cache() -> None:
+    """Forget the series coefficients of all geometries."""
+    _coefficients.clear()
+
+
+def _series_coefficients(cell: TemCell) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Field amplitudes A_n k_n and wave numbers k_n = n pi / a (n odd) of a geometry.
+
+    With the linear gap potential, the septum-plane potential has the
+    cosine coefficients A_n = 4 cos(k_n w / 2) / (a g k_n^2).
+    """
+    key = (cell.width, cell.height, cell.septum_width, cell.n_terms)
+    if key not in _coefficients:
+        wave_numbers = np.arange(1, 2 * cell.n_terms, 2) * np.pi / cell.width
+        potential = 4 * np.cos(wave_numbers * cell.septum_width / 2) / (cell.width * cell.gap * wave_numbers ** 2)
+        _coefficients[key] = (potential * wave_numbers, wave_numbers)
+    return _coefficients[key]
@@ -0,0 +1,295 @@
+import re
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .csv_cache import read_cached_table
+from .s_parameters import SParameters
+
+
+# File name pattern of Touchstone files (.s1p, .s2p, ..., .s12p)
+TOUCHSTONE_SUFFIX = re.compile(r"^\.s(\d+)p$", re.IGNORECASE)
+
+# Frequency units of the option line
+FREQUENCY_UNITS = {"HZ": 1.0, "KHZ": 1e3, "MHZ": 1e6, "GHZ": 1e9}
+
+# Port names as written by HFSS into the comments, e.g. '! Port[1] = waveport1:1'
+_PORT_COMMENT = re.compile(r"^!\s*Port\[(\d+)\]\s*=\s*([^\s:]+)", re.IGNORECASE)
+
+
+def read_touchstone(path: Path, ports: Optional[Sequence[str]] = None) -> SParameters:
+    """
+    Read a Touchstone 1.x or 2.0 file into SParameters.
+
+    S, Y and Z data in RI, MA or DB format are supported; Y and Z are
+    converted to S. The numeric data is parsed in one vectorized pass and,
+    across runs, served from a binary cache next to the file (see
+    csv_cache.read_cached_table).
+
+    Args:
+        path: Touchstone file (.sNp)
+        ports: Port names; by default taken from HFSS '! Port[n] = name'
+            comments, else 'port1', 'port2', ...
+
+    Returns:
+        SParameters with all entries present
+
+    Raises:
+        ValueError: For malformed files or unsupported options
+    """
+    path = Path(path)
+    table = read_cached_table(path, 0, _parse_touchstone)
+    n_ports = int(round(np.sqrt((table.shape[0] - 2) / 2)))
+    frequency = table[0]
+    values = table[1:-1:2] + 1j * table[2:-1:2]
+    data = values.T.reshape(frequency.size, n_ports, n_ports)
+
+    if ports is None:
+        ports = _port_names(path, n_ports)
+    elif len(ports) != n_ports:
+        raise ValueError(f"{len(ports)} port names given for the {n_ports}-port file {path}")
+    return SParameters(frequency, list(ports), data, reference_impedance=float(table[-1][0]))
+
+
+def write_touchstone(path: Path, s_parameters: SParameters, data_format: str = "RI",
+                     frequency_unit: str = "GHz", version: int = 1,
+                     comments: Sequence[str] = ()) -> Path:
+    """
+    Write SParameters as Touchstone file.
+
+    Port names are written as HFSS-style '! Port[n] = name' comments, so
+    read_touchstone restores them. Entries that were not exported (see
+    SParameters.has_magnitude) are written as 0.
+
+    Args:
+        path: Output file; '.sNp' is appended if the suffix does not match
+        s_parameters: Data to write
+        data_format: 'RI', 'MA' or 'DB'
+        frequency_unit: 'Hz', 'kHz', 'MHz' or 'GHz'
+        version: 1 or 2 (Touchstone 2.0 keywords)
+        comments: Lines written as comments below the port names
+
+    Returns:
+        Path of the written file
+    """
+    data_format = data_format.upper()
+    if data_format not in ("RI", "MA", "DB"):
+        raise ValueError(f"Unknown Touchstone data format '{data_format}'")
+    if frequency_unit.upper() not in FREQUENCY_UNITS or version not in (1, 2):
+        raise ValueError(f"Unsupported frequency unit '{frequency_unit}' or version {version}")
+
+    n_ports = len(s_parameters.ports)
+    path = Path(path)
+    if path.suffix.lower() != f".s{n_ports}p":
+        path = path.with_name(f"{path.name}.s{n_ports}p")
+
+    present = s_parameters.has_magnitude & s_parameters.has_phase
+    data = np.where(present, s_parameters.data, 0)
+    if n_ports == 2:
+        # Two-port data is written column-major (11 21 12 22)
+        data = np.swapaxes(data, 1, 2)
+    data = data.reshape(data.shape[0], n_ports * n_ports)
+    if data_format == "RI":
+        first, second = data.real, data.imag
+    else:
+        magnitude = np.abs(data)
+        if data_format == "DB":
+            with np.errstate(divide="ignore"):
+                magnitude = 20 * np.log10(magnitude)
+        first, second = magnitude, np.angle(data, deg=True)
+    pairs = np.stack((first, second), axis=-1)
+
+    lines = [f"! Port[{i + 1}] = {port}" for i, port in enumerate(s_parameters.ports)]
+    lines += [f"! {comment}" for comment in comments]
+    if version == 2:
+        lines.append("[Version] 2.0")
+    lines.append(f"# {frequency_unit} S {data_format} R {s_parameters.reference_impedance:g}")
+    if version == 2:
+        lines.append(f"[Number of Ports] {n_ports}")
+        if n_ports == 2:
+            lines.append("[Two-Port Data Order] 21_12")
+        lines.append(f"[Number of Frequencies] {s_parameters.frequency.size}")
+        lines.append("[Network Data]")
+
+    scale = FREQUENCY_UNITS[frequency_unit.upper()]
+    for frequency, row in zip(s_parameters.frequency / scale, pairs):
+        numbers = [" ".join(f"{value:.12g}" for value in pair) for pair in row]
+        if n_ports <= 2:
+            chunks = [numbers]
+        else:
+            # Every matrix row starts a new line, with at most 4 pairs per line
+            chunks = [numbers[start + i:start + min(i + 4, n_ports)]
+                      for start in range(0, len(numbers), n_ports) for i in range(0, n_ports, 4)]
+        lines.append(f"{frequency:.12g} " + "  ".join(chunks[0]))
+        lines.extend("  " + "  ".join(chunk) for chunk in chunks[1:])
+    if version == 2:
+        lines.append("[End]")
+
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def find_touchstone(folder: Path) -> Optional[Path]:
+    """The single Touchstone file in folder, None if there is none."""
+    candidates = sorted(path for path in Path(folder).glob("*")
+                        if TOUCHSTONE_SUFFIX.match(path.suffix))
+    if len(candidates) > 1:
+        raise ValueError(f"Several Touchstone files in {folder}: {[path.name for path in candidates]}")
+    return candidates[0] if candidates else None
+
+
+def _parse_touchstone(path: Path, skiprows: int = 0) -> np.ndarray:
+    """
+    Parse a Touchstone file (cache miss path of read_touchstone).
+
+    Returns:
+        Read-only array of shape (2 + 2 n_ports^2, n_frequencies): frequency
+        in Hz, real and imaginary part of every S entry (row-major) and the
+        reference impedance
+    """
+    options = {"unit": "GHZ", "parameter": "S", "format": "MA", "reference": 50.0}
+    keywords = {}
+    option_seen = False
+    data_lines: List[str] = []
+    in_noise = False
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.split("!", 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith("#"):
+                if not option_seen:
+                    _parse_option_line(line, options)
+                    option_seen = True
+                continue
+            if line.startswith("["):
+                keyword, _, value = line[1:].partition("]")
+                keyword = keyword.strip().lower()
+                keywords[keyword] = value.strip()
+                if keyword == "noise data":
+                    in_noise = True
+                elif keyword == "end":
+                    break
+                elif keyword == "reference" and value.strip():
+                    options["reference"] = _single_reference(value)
+                continue
+            if not in_noise:
+                data_lines.append(line)
+
+    n_ports = _port_count(path, keywords)
+    if "reference" in keywords and not keywords["reference"]:
+        raise ValueError(f"{path}: [Reference] on separate lines is not supported")
+    if keywords.get("matrix format", "full").lower() != "full":
+        raise ValueError(f"{path}: only [Matrix Format] Full is supported")
+
+    numbers = np.fromstring(" ".join(data_lines), sep=" ")
+    row_length = 1 + 2 * n_ports * n_ports
+    rows = numbers[:numbers.size // row_length * row_length].reshape(-1, row_length)
+    # Touchstone 1.x two-port noise data follows without keyword, starting
+    # again at a lower frequency
+    restart = np.flatnonzero(np.diff(rows[:, 0]) <= 0)
+    if restart.size:
+        rows = rows[:restart[0] + 1]
+    elif numbers.size % row_length:
+        raise ValueError(f"{path}: {numbers.size} values do not form rows of {row_length}")
+
+    frequency = rows[:, 0] * FREQUENCY_UNITS[options["unit"]]
+    pairs = rows[:, 1:].reshape(rows.shape[0], n_ports * n_ports, 2)
+    if options["format"] == "RI":
+        values = pairs[..., 0] + 1j * pairs[..., 1]
+    else:
+        magnitude = pairs[..., 0] if options["format"] == "MA" else 10 ** (pairs[..., 0] / 20)
+        values = magnitude * np.exp(1j * np.deg2rad(pairs[..., 1]))
+    values = values.reshape(-1, n_ports, n_ports)
+    if n_ports == 2 and keywords.get("two-port data order", "21_12") == "21_12":
+        values = np.swapaxes(values, 1, 2)
+    # Touchstone 1.x Y/Z data is normalized to the reference impedance, 2.0
+    # data is in Ohm/Siemens
+    version = float(keywords.get("version", "1.0").split()[0])
+    values = _to_s(values, options["parameter"], options["reference"], normalized=version < 2)
+
+    flat = values.reshape(values.shape[0], -1)
+    table = np.empty((2 + 2 * flat.shape[1], frequency.size))
+    table[0] = frequency
+    table[1:-1:2] = flat.real.T
+    table[2:-1:2] = flat.imag.T
+    table[-1] = options["reference"]
+    table.flags.writeable = False
+    return table
+
+
+def _parse_option_line(line: str, options: dict) -> None:
+    """Read '# <unit> <parameter> <format> R <reference>' into options."""
+    tokens = line[1:].upper().split()
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in FREQUENCY_UNITS:
+            options["unit"] = token
+        elif token in ("S", "Y", "Z"):
+            options["parameter"] = token
+        elif token in ("G", "H"):
+            raise ValueError(f"Touchstone {token}-parameters are not supported")
+        elif token in ("RI", "MA", "DB"):
+            options["format"] = token
+        elif token == "R" and i + 1 < len(tokens):
+            options["reference"] = float(tokens[i + 1])
+            i += 1
+        i += 1
+
+
+def _single_reference(value: str) -> float:
+    """Reference impedance of a [Reference] line; all ports must share it."""
+    references = np.array(value.split(), dtype=float)
+    if np.any(references != references[0]):
+        raise ValueError(f"Different reference impedances per port are not supported: {value}")
+    return float(references[0])
+
+
+def _port_count(path: Path, keywords: dict) -> int:
+    """Number of ports from [Number of Ports] or the file suffix."""
+    if "number of ports" in keywords:
+        return int(keywords["number of ports"])
+    match = TOUCHSTONE_SUFFIX.match(Path(path).suffix)
+    if match is None:
+        raise ValueError(f"{path}: number of ports unknown (no [Number of Ports], no .sNp suffix)")
+    return int(match.group(1))
+
+
+def _to_s(values: np.ndarray, parameter: str, reference: float,
+          normalized: bool = False) -> np.ndarray:
+    """
+    Convert Y or Z matrices (n, ports, ports) to S for a common reference impedance.
+
+    Args:
+        values: Y (S) or Z (Ohm) matrices, or normalized ones if normalized is set
+        parameter: 'S', 'Y' or 'Z'
+        reference: Reference impedance in Ohm
+        normalized: Values are already normalized to the reference (Touchstone 1.x)
+    """
+    if parameter == "S":
+        return values
+    # S = (z - I)(z + I)^-1 for z = Z / R and (I - y)(I + y)^-1 for y = Y R;
+    # both factors commute, so one batched solve gives S
+    identity = np.eye(values.shape[1])
+    if parameter == "Z":
+        z = values if normalized else values / reference
+        return np.linalg.solve(z + identity, z - identity)
+    y = values if normalized else values * reference
+    return np.linalg.solve(identity + y, identity - y)
+
+
+def _port_names(path: Path, n_ports: int) -> List[str]:
+    """Port names from HFSS comments of the file, 'port<n>' where missing."""
+    names = [f"port{i + 1}" for i in range(n_ports)]
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("!"):
+                break
+            match = _PORT_COMMENT.match(line)
+            if match and 1 <= int(match.group(1)) <= n_ports:
+                names[int(match.group(1)) - 1] = match.group(2)
+    return names
@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .calculate_moments import calculate_complex_moments
+
+
+# Samples x frequencies evaluated at once; bounds the memory of the
+# ensemble and of the model's intermediate arrays
+DEFAULT_CHUNK_SIZE = 1 << 21
+
+PERTURBATION_KINDS = ('relative', 'absolute', 'delay')
+
+
+@dataclass(frozen=True)
+class Perturbation:
+    """
+    Normally distributed deviation of one model input.
+
+    Attributes:
+        sigma: Standard deviation; relative (0.05 = 5 %), absolute in the
+            unit of the input (e.g. rad for phases) or in s for 'delay'
+        kind: 'relative' multiplies the input by (1 + sigma N), 'absolute'
+            adds sigma N, 'delay' adds the phase error 2 pi f tau of a
+            reference-plane delay tau ~ sigma N (port de-embedding)
+        correlated: Draw one deviation per sample for all frequencies
+            instead of one per sample and frequency (always true for 'delay')
+    """
+    sigma: float
+    kind: str = 'relative'
+    correlated: bool = False
+
+    def __post_init__(self):
+        if self.kind not in PERTURBATION_KINDS:
+            raise ValueError(f"Unknown perturbation kind '{self.kind}', expected one of {PERTURBATION_KINDS}")
+
+
+@dataclass
+class ConfidenceBand:
+    """
+    Quantiles of a quantity over a Monte Carlo ensemble, per frequency.
+
+    Attributes:
+        lower: Lower bound, the (1 - confidence) / 2 quantile
+        median: Median of the ensemble
+        upper: Upper bound, the (1 + confidence) / 2 quantile
+        confidence: Probability covered between lower and upper
+    """
+    lower: np.ndarray
+    median: np.ndarray
+    upper: np.ndarray
+    confidence: float
+
+    def scaled(self, factor: float) -> 'ConfidenceBand':
+        """Band of the quantity multiplied by a positive factor (e.g. m_e * 377)."""
+        return ConfidenceBand(self.lower * factor, self.median * factor, self.upper * factor,
+                              self.confidence)
+
+
+def monte_carlo(model: Callable[..., Dict[str, np.ndarray]],
+                inputs: Dict[str, object],
+                perturbations: Dict[str, Perturbation],
+                outputs: Sequence[str],
+                frequency_key: str = 'frequency',
+                n_samples: int = 10000,
+                confidence: float = 0.95,
+                seed: Optional[int] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, ConfidenceBand]:
+    """
+    Propagate input uncertainties through a broadcasting model.
+
+    For every frequency, n_samples perturbed input sets are drawn and the
+    model is called once per block of frequencies with arrays of shape
+    (n_samples, n_block); the quantiles of the absolute outputs are taken
+    over the samples. Memory stays bounded by chunk_size elements per
+    ensemble array whatever the number of frequencies.
+
+    Args:
+        model: Function of the inputs returning a dict of outputs, e.g.
+            calc() of the equivalent circuits
+        inputs: Keyword arguments of the model, scalars or arrays with one
+            entry per frequency
+        perturbations: Input name -> Perturbation; inputs without one are
+            taken as exact
+        outputs: Model results to evaluate
+        frequency_key: Input holding the frequencies in Hz
+        n_samples: Ensemble size per frequency
+        confidence: Probability covered by the bands
+        seed: Seed of the random generator for reproducible bands
+        chunk_size: Ensemble elements (samples x frequencies) per model call
+
+    Returns:
+        Output name -> ConfidenceBand of its absolute value
+    """
+    missing = [name for name in perturbations if name not in inputs]
+    if missing:
+        raise KeyError(f"Perturbed inputs {missing} are no model inputs")
+    frequency = np.atleast_1d(np.asarray(inputs[frequency_key], dtype=float))
+    n_frequencies = frequency.size
+    rng = np.random.default_rng(seed)
+
+    # Deviations shared by all frequencies of a sample
+    shared = {name: rng.standard_normal((n_samples, 1)) for name, perturbation in perturbations.items()
+              if perturbation.correlated or perturbation.kind == 'delay'}
+    probabilities = [(1 - confidence) / 2, 0.5, (1 + confidence) / 2]
+    quantiles = {name: np.empty((3, n_frequencies)) for name in outputs}
+
+    block = max(1, chunk_size // n_samples)
+    for start in range(0, n_frequencies, block):
+        part = slice(start, min(start + block, n_frequencies))
+        arguments = {name: _frequency_slice(value, part, n_frequencies) for name, value in inputs.items()}
+        width = part.stop - part.start
+        for name, perturbation in perturbations.items():
+            deviation = shared[name] if name in shared else rng.standard_normal((n_samples, width))
+            arguments[name] = _perturb(arguments[name], perturbation, deviation, frequency[part])
+        arguments[frequency_key] = frequency[part]
+        results = model(**arguments)
+        for name in outputs:
+            values = np.broadcast_to(np.abs(results[name]), (n_samples, width))
+            quantiles[name][:, part] = np.quantile(values, probabilities, axis=0)
+
+    return {name: ConfidenceBand(*values, confidence) for name, values in quantiles.items()}
+
+
+def moment_uncertainty(e_field, phase_shift, output_power, frequency,
+                       perturbations: Dict[str, Perturbation],
+                       n_samples: int = 10000, confidence: float = 0.95,
+                       seed: Optional[int] = None) -> Tuple[ConfidenceBand, ConfidenceBand]:
+    """
+    Confidence bands of |m_e| and |m_m| from calculate_moments.
+
+    Args:
+        e_field, phase_shift, output_power, frequency: As for calculate_moments
+        perturbations: Uncertainty of 'e_field' (e.g. mesh convergence),
+            'phase_shift' (phase noise, de-embedding) and 'output_power'
+        n_samples: Ensemble size per frequency
+        confidence: Probability covered by the bands
+        seed: Seed of the random generator
+
+    Returns:
+        Tuple of the bands of the absolute electric and magnetic moment
+    """
+    bands = monte_carlo(_moment_model,
+                        {'e_field': e_field, 'phase_shift': phase_shift,
+                         'output_power': output_power, 'frequency': frequency},
+                        perturbations, ('m_e', 'm_m'), n_samples=n_samples,
+                        confidence=confidence, seed=seed)
+    return bands['m_e'], bands['m_m']
+
+
+def _moment_model(e_field, phase_shift, output_power, frequency) -> Dict[str, np.ndarray]:
+    m_e, m_m = calculate_complex_moments(e_field, phase_shift, output_power, frequency)
+    return {'m_e': m_e, 'm_m': m_m}
+
+
+def _frequency_slice(value, part: slice, n_frequencies: int):
+    """The entries of a per-frequency input for a block of frequencies; scalars as they are."""
+    value = np.asarray(value)
+    if value.ndim and value.shape[-1] == n_frequencies:
+        return value[..., part]
+    return value
+
+
+def _perturb(value, perturbation: Perturbation, deviation: np.ndarray, frequency: np.ndarray):
+    """Ensemble of an input, shape (n_samples, n_block)."""
+    if perturbation.kind == 'relative':
+        return value * (1 + perturbation.sigma * deviation)
+    if perturbation.kind == 'absolute':
+        return value + perturbation.sigma * deviation
+    return value + 2 * np.pi * frequency * perturbation.sigma * deviation
@@ -0,0 +1,340 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from .read_csv import load_csv_named
+from .s_parameters import read_antenna_s_parameters
+from .pipeline import evaluate_antenna
+from .calculate_moments import calculate_complex_moments
+
+
+# vector_fit options per response group of load_responses; the moments are
+# referred to the waveport phase, are not conjugate symmetric and vanish
+# towards DC, so they are fitted unconstrained with absolute weighting
+GROUP_OPTIONS = {
+    'moments': {'conjugate': False, 'relative': False, 'proportional': True},
+}
+
+@dataclass
+class PoleResidueModel:
+    """
+    Rational model H(s) = sum_k r_k / (s - p_k) + d + s e of several responses.
+
+    All responses share the same poles. For a conjugate fit, complex poles
+    come in conjugate pairs with conjugate residues, so the model is real in
+    the time domain; otherwise poles and residues are unconstrained.
+
+    Attributes:
+        names: Name of each response
+        poles: Poles in rad/s, shape (n_poles,)
+        residues: Residues, shape (n_responses, n_poles)
+        d: Constant term per response
+        e: Proportional term per response (zero unless fitted)
+        rms_error: Relative RMS deviation from the fitted samples per response
+    """
+    names: List[str]
+    poles: np.ndarray
+    residues: np.ndarray
+    d: np.ndarray
+    e: np.ndarray
+    rms_error: np.ndarray
+
+    def __call__(self, frequency) -> np.ndarray:
+        """
+        Evaluate all responses at arbitrary frequencies.
+
+        Args:
+            frequency: Frequency or frequencies in Hz
+
+        Returns:
+            Complex array of shape (n_responses,) + np.shape(frequency)
+        """
+        s = 2j * np.pi * np.asarray(frequency, dtype=float)
+        partial = 1.0 / (s[..., None] - self.poles)
+        h = partial @ self.residues.T + self.d + s[..., None] * self.e
+        return np.moveaxis(h, -1, 0)
+
+    def response(self, name: str, frequency) -> np.ndarray:
+        """Evaluate a single response by name."""
+        index = self.names.index(name)
+        s = 2j * np.pi * np.asarray(frequency, dtype=float)
+        partial = 1.0 / (s[..., None] - self.poles)
+        return partial @ self.residues[index] + self.d[index] + s * self.e[index]
+
+    def save(self, path: Path) -> None:
+        """Store the model in a .npz file."""
+        np.savez(path, names=np.array(self.names), poles=self.poles, residues=self.residues,
+                 d=self.d, e=self.e, rms_error=self.rms_error)
+
+
+def load_model(path: Path) -> PoleResidueModel:
+    """Load a model stored with PoleResidueModel.save()."""
+    with np.load(path) as data:
+        return PoleResidueModel(list(data['names']), data['poles'], data['residues'],
+                                data['d'], data['e'], data['rms_error'])
+
+
+def vector_fit(frequency: np.ndarray, responses: Dict[str, np.ndarray], n_poles: int = 8,
+               n_iterations: int = 20, proportional: bool = False,
+               relative: bool = True, conjugate: bool = True,
+               tolerance: float = 1e-10) -> PoleResidueModel:
+    """
+    Fit a common pole-residue model to several frequency responses.
+
+    Implements vector fitting (Gustavsen and Semlyen): starting from
+    weakly damped poles spread over the band, the poles are relocated to
+    the zeros of a fitted scaling function until they settle, then the
+    residues of all responses are solved with the final poles. Unstable
+    poles are mirrored into the left half plane. Frequencies are normalized
+    to the highest sample internally.
+
+    Responses of a physical (real, causal) system satisfy H(-jw) = H(jw)*
+    and are fitted with conjugate pole pairs. Quantities that do not, such
+    as the moments whose phase is referred to the waveports, are fitted with
+    conjugate=False: the model is then a plain rational interpolant.
+
+    Args:
+        frequency: Sample frequencies in Hz
+        responses: Complex (or real) samples per response name
+        n_poles: Number of poles (complex pairs count as two)
+        n_iterations: Maximum number of pole relocations
+        proportional: Also fit the term s * e
+        relative: Weight every sample by 1/|H| (relative instead of absolute error)
+        conjugate: Constrain poles and residues to conjugate pairs
+        tolerance: Stop once the relative change of the poles is below this
+
+    Returns:
+        PoleResidueModel of all responses
+    """
+    frequency = np.asarray(frequency, dtype=float)
+    names = list(responses)
+    h = np.vstack([np.asarray(responses[name], dtype=complex) for name in names])
+    # Complex samples give two real equations per sample for real unknowns
+    if frequency.size * (2 if conjugate else 1) <= n_poles + 2:
+        raise ValueError(f"{frequency.size} samples are too few for {n_poles} poles")
+
+    omega_0 = 2 * np.pi * np.max(frequency)
+    s = 2j * np.pi * frequency / omega_0
+    weight = 1.0 / np.maximum(np.abs(h), 1e-300) if relative else np.ones(h.shape)
+    weight = weight / np.max(weight, axis=1, keepdims=True)
+
+    poles = _initial_poles(frequency / np.max(frequency), n_poles, conjugate)
+    for _ in range(n_iterations):
+        new_poles = _relocate_poles(s, h, weight, poles, proportional, conjugate)
+        change = np.max(np.abs(_all_poles(new_poles, conjugate) - _all_poles(poles, conjugate)))
+        poles = new_poles
+        if change < tolerance * np.max(np.abs(poles)):
+            break
+
+    residues, d, e = _fit_residues(s, h, weight, poles, proportional, conjugate)
+    if conjugate:
+        full_poles, full_residues = _expand_conjugates(poles, residues)
+    else:
+        full_poles, full_residues = poles, residues
+
+    model = PoleResidueModel(names, full_poles * omega_0, full_residues * omega_0,
+                             d, e / omega_0, np.zeros(len(names)))
+    model.rms_error = (np.sqrt(np.mean(np.abs(model(frequency) - h) ** 2, axis=1))
+                       / np.maximum(np.sqrt(np.mean(np.abs(h) ** 2, axis=1)), 1e-300))
+    return model
+
+
+def load_responses(antenna_type: str, data_dir: Path = Path("data"),
+                   antenna_power: float = 1.0) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Collect the responses of one antenna dataset for vector fitting.
+
+    Args:
+        antenna_type: Name of the data folder (e.g., 'loop-tem-cell')
+        data_dir: Folder holding one sub-folder per antenna
+        antenna_power: Antenna input power in Watts
+
+    Returns:
+        Dictionary of response groups, each with 'frequency' (Hz) and the
+        complex responses sampled on it: 'moments' (complex m_e, m_m; the
+        magnitude of the model gives the usual moments), 'waveports'
+        (S of the antenna to each waveport with exported magnitude and phase) and,
+        if impedance.csv exists, 'impedance' (z_antenna)
+    """
+    folder = Path(data_dir) / antenna_type
+    result = evaluate_antenna(antenna_type, data_dir=data_dir, antenna_power=antenna_power)
+    # Complex moments: magnitudes alone are not representable by a stable model
+    m_e, m_m = calculate_complex_moments(result['efield'], result['phase_shift'],
+                                         result['output_power'], result['frequencies'])
+    groups = {'moments': {'frequency': result['frequencies'], 'm_e': m_e, 'm_m': m_m}}
+
+    s_parameters = read_antenna_s_parameters(antenna_type, data_dir)
+    antenna = s_parameters.port_index('antenna')
+    waveports = {'frequency': s_parameters.frequency}
+    for i, port in enumerate(s_parameters.ports):
+        if s_parameters.has_magnitude[i, antenna] and s_parameters.has_phase[i, antenna]:
+            waveports[f's_{port}'] = s_parameters.entry(port, 'antenna')
+    groups['waveports'] = waveports
+
+    impedance_csv = folder / "impedance.csv"
+    if impedance_csv.exists():
+        frequency, magnitude, phase = load_csv_named(
+            impedance_csv, ["frequency", "impedance_magnitude", "impedance_phase"])
+        groups['impedance'] = {'frequency': frequency * 1e9,
+                               'z_antenna': magnitude * np.exp(1j * np.deg2rad(phase))}
+    return groups
+
+
+def fit_antenna(antenna_type: str, data_dir: Path = Path("data"), n_poles: int = 8,
+                **options) -> Dict[str, PoleResidueModel]:
+    """
+    Vector-fit all response groups of one antenna dataset.
+
+    Args:
+        antenna_type: Name of the data folder
+        data_dir: Folder holding one sub-folder per antenna
+        n_poles: Number of poles per model
+        **options: Further arguments of vector_fit, overriding GROUP_OPTIONS
+
+    Returns:
+        One PoleResidueModel per response group (see load_responses)
+    """
+    models = {}
+    for group, data in load_responses(antenna_type, data_dir).items():
+        data = dict(data)
+        frequency = data.pop('frequency')
+        group_options = {**GROUP_OPTIONS.get(group, {}), **options}
+        models[group] = vector_fit(frequency, data, n_poles=n_poles, **group_options)
+    return models
+
+
+def _initial_poles(frequency: np.ndarray, n_poles: int, conjugate: bool = True) -> np.ndarray:
+    """
+    Weakly damped starting poles over the band.
+
+    With conjugate=True only the upper pole of each pair is returned (plus a
+    real pole if n_poles is odd), otherwise n_poles independent complex poles.
+    """
+    if not conjugate:
+        beta = np.linspace(max(np.min(frequency), 1e-2), 1.0, n_poles)
+        return -beta / 100 + 1j * beta
+    beta = np.linspace(max(np.min(frequency), 1e-2), 1.0, n_poles // 2)
+    poles = -beta / 100 + 1j * beta
+    if n_poles % 2:
+        poles = np.concatenate(([-1.0 + 0j], poles))
+    return poles
+
+
+def _all_poles(poles: np.ndarray, conjugate: bool = True) -> np.ndarray:
+    """Sorted poles including the conjugates of the complex ones."""
+    if not conjugate:
+        return np.sort_complex(poles)
+    return np.sort_complex(np.concatenate((poles, np.conj(poles[poles.imag != 0]))))
+
+
+def _basis(s: np.ndarray, poles: np.ndarray, conjugate: bool = True) -> np.ndarray:
+    """
+    Partial fraction basis, shape (len(s), n_poles).
+
+    With conjugate=True the basis has real coefficients: a real pole p gives
+    1/(s-p); a complex pole p (standing for the pair p, p*) gives
+    1/(s-p) + 1/(s-p*) and j/(s-p) - j/(s-p*). Otherwise every pole gives 1/(s-p).
+    """
+    if not conjugate:
+        return 1 / (s[:, None] - poles)
+    columns = []
+    for p in poles:
+        if p.imag == 0:
+            columns.append(1 / (s - p))
+        else:
+            columns.append(1 / (s - p) + 1 / (s - np.conj(p)))
+            columns.append(1j / (s - p) - 1j / (s - np.conj(p)))
+    return np.column_stack(columns)
+
+
+def _design(s: np.ndarray, phi: np.ndarray, proportional: bool) -> np.ndarray:
+    """Basis extended by the constant (and proportional) term."""
+    extra = [np.ones_like(s)] + ([s] if proportional else [])
+    return np.column_stack([phi] + extra)
+
+
+def _real_stack(a: np.ndarray) -> np.ndarray:
+    """Stack real and imaginary parts of complex equations along the row axis."""
+    return np.concatenate((a.real, a.imag), axis=-2)
+
+
+def _relocate_poles(s, h, weight, poles, proportional, conjugate=True) -> np.ndarray:
+    """One pole relocation step for all responses (fast VF with one stacked QR)."""
+    phi = _basis(s, poles, conjugate)
+    design = _design(s, phi, proportional)
+    n_direct, n_sigma = design.shape[1], phi.shape[1]
+
+    # Per response: [A, -H*phi] [c; c_sigma] = H, weighted
+    w = weight[:, :, None]
+    system = np.concatenate((w * design, -w * h[:, :, None] * phi, w * h[:, :, None]), axis=2)
+    r = np.linalg.qr(_real_stack(system) if conjugate else system, mode='r')
+
+    # Rows of R that involve only the scaling function unknowns
+    reduced = r[:, n_direct:n_direct + n_sigma, :]
+    lhs = reduced[:, :, n_direct:n_direct + n_sigma].reshape(-1, n_sigma)
+    rhs = reduced[:, :, -1].reshape(-1)
+    c_sigma = np.linalg.lstsq(lhs, rhs, rcond=None)[0]
+
+    # Zeros of sigma(s) = 1 + sum c_sigma * phi are the new poles
+    a_matrix, b_vector = _state_space(poles, conjugate)
+    zeros = np.linalg.eigvals(a_matrix - np.outer(b_vector, c_sigma))
+    zeros = np.where(zeros.real > 0, -np.conj(zeros), zeros)
+    if not conjugate:
+        return np.sort_complex(zeros)
+    zeros = np.where(np.abs(zeros.imag) < 1e-12 * np.abs(zeros), zeros.real + 0j, zeros)
+    return np.sort_complex(zeros[zeros.imag >= 0])
+
+
+def _state_space(poles: np.ndarray, conjugate: bool = True):
+    """State-space matrices (A, b) of the partial fraction basis (real if conjugate)."""
+    if not conjugate:
+        return np.diag(poles), np.ones(len(poles))
+    n = sum(1 if p.imag == 0 else 2 for p in poles)
+    a_matrix = np.zeros((n, n))
+    b_vector = np.zeros(n)
+    i = 0
+    for p in poles:
+        if p.imag == 0:
+            a_matrix[i, i] = p.real
+            b_vector[i] = 1
+            i += 1
+        else:
+            a_matrix[i:i + 2, i:i + 2] = [[p.real, p.imag], [-p.imag, p.real]]
+            b_vector[i] = 2
+            i += 2
+    return a_matrix, b_vector
+
+
+def _fit_residues(s, h, weight, poles, proportional, conjugate=True):
+    """Solve the residues of all responses for fixed poles in one batched solve."""
+    phi = _basis(s, poles, conjugate)
+    design = _design(s, phi, proportional)
+    w = weight[:, :, None]
+    lhs, rhs = w * design, (weight * h)[:, :, None]
+    if conjugate:
+        lhs, rhs = _real_stack(lhs), _real_stack(rhs)
+    coefficients = (np.linalg.pinv(lhs) @ rhs)[:, :, 0]
+
+    n_sigma = phi.shape[1]
+    d = coefficients[:, n_sigma]
+    e = coefficients[:, n_sigma + 1] if proportional else np.zeros(len(h))
+    return coefficients[:, :n_sigma], d, e
+
+
+def _expand_conjugates(poles: np.ndarray, real_residues: np.ndarray):
+    """Turn the real basis coefficients into complex residues of all poles."""
+    full_poles, columns = [], []
+    i = 0
+    for p in poles:
+        if p.imag == 0:
+            full_poles.append(p)
+            columns.append(real_residues[:, i] + 0j)
+            i += 1
+        else:
+            residue = real_residues[:, i] + 1j * real_residues[:, i + 1]
+            full_poles.extend([p, np.conj(p)])
+            columns.extend([residue, np.conj(residue)])
+            i += 2
+    return np.array(full_poles), np.column_stack(columns)
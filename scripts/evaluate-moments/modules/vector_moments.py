@@ -0,0 +1,141 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from .forward_model import coupling_vectors
+from .tem_cell import VACUUM_IMPEDANCE
+
+
+SPEED_OF_LIGHT = 299792458.0  # m/s
+
+
+@dataclass
+class MomentVectors:
+    """
+    Electric and magnetic moment vectors fitted to several antenna orientations.
+
+    Attributes:
+        m_e: Electric moment in A m (effective value), shape (n_frequencies, 3)
+        m_m: Magnetic moment in V m, shape (n_frequencies, 3)
+        residual: Norm of the misfit of the waves over the orientations,
+            relative to the norm of the waves, per frequency
+        singular_values: Singular values of the coupling matrix (for m_e
+            and m_m / Z0); their spread measures how well the orientations
+            separate the components
+    """
+    m_e: np.ndarray
+    m_m: np.ndarray
+    residual: np.ndarray
+    singular_values: np.ndarray
+
+    @property
+    def condition_number(self) -> float:
+        """Ratio of largest to smallest singular value of the coupling matrix."""
+        return float(self.singular_values[0] / self.singular_values[-1])
+
+    def radiated_power(self, frequency) -> np.ndarray:
+        """Total power radiated in free space in W, see radiated_power()."""
+        return radiated_power(self.m_e, self.m_m, frequency)
+
+
+def extract_moment_vectors(a, b, field, rotations: Optional[np.ndarray] = None) -> MomentVectors:
+    """
+    Fit all six complex moment components to the waves of N >= 3 orientations.
+
+    Each orientation k gives two equations per frequency (see
+    forward_model.waveport_waves):
+
+        a_k = (u_k . m_e + v_k . m_m) / 2,  b_k = (u_k . m_e - v_k . m_m) / 2
+
+    The coupling matrix does not depend on frequency, so the 2 N x 6
+    system is solved for all frequencies at once by one real least-squares
+    call with the real and imaginary parts of every frequency as right-hand
+    sides. More than three orientations give the least-squares fit.
+
+    Args:
+        a, b: Waves at waveport 1 and 2 in sqrt(W), shape (N, n_frequencies)
+            (see waves_from_s_parameters)
+        field: Normalized TEM-mode field at the antenna per orientation,
+            shape (N, 3) or (3,)
+        rotations: Antenna orientation per dataset, shape (N, 3, 3)
+
+    Returns:
+        MomentVectors in the antenna frame
+
+    Raises:
+        ValueError: If the orientations do not determine all six components
+    """
+    a, b = np.atleast_2d(a), np.atleast_2d(b)
+    n_orientations = a.shape[0]
+    electric, magnetic = coupling_vectors(field, rotations)
+    electric = np.broadcast_to(electric, (n_orientations, 3))
+    magnetic = np.broadcast_to(magnetic, (n_orientations, 3))
+
+    # Unknowns m_e and m_m / Z0, both in A m, keep the matrix well scaled
+    magnetic = magnetic * VACUUM_IMPEDANCE
+    coupling = np.block([[electric, magnetic], [electric, -magnetic]]) / 2
+    waves = np.concatenate([a, b])
+    n_frequencies = waves.shape[1]
+    solution, _, rank, singular_values = np.linalg.lstsq(
+        coupling, np.hstack([waves.real, waves.imag]), rcond=None)
+    if rank < 6:
+        raise ValueError(f"{n_orientations} orientations determine only {rank} of the six "
+                         f"moment components; add orientations that rotate the field")
+    moments = solution[:, :n_frequencies] + 1j * solution[:, n_frequencies:]
+
+    misfit = np.linalg.norm(coupling @ moments - waves, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        residual = misfit / np.linalg.norm(waves, axis=0)
+    return MomentVectors(moments[:3].T, moments[3:].T * VACUUM_IMPEDANCE, residual, singular_values)
+
+
+def waves_from_s_parameters(s_parameters, antenna_power: float = 1.0,
+                            phases: Optional[np.ndarray] = None):
+    """
+    Waveport waves of one orientation from the antenna S-parameters.
+
+    The phases enter with the sign of the scalar extraction, whose
+    phase_shift is the phase of waveport 1 minus that of waveport 2.
+    Without a magnitude export of waveport 2 both waves get the power of
+    waveport 1, as in calculate_moments.
+
+    Args:
+        s_parameters: SParameters with ports 'antenna', 'waveport1' and 'waveport2'
+        antenna_power: Antenna input power in Watts
+        phases: Corrected phases of waveport 1 and 2 in rad, shape
+            (2, n_frequencies) (see phase_processing); the raw phases if None
+
+    Returns:
+        Tuple of the waves a and b in sqrt(W)
+    """
+    antenna = s_parameters.port_index('antenna')
+    waveports = [s_parameters.port_index('waveport1'), s_parameters.port_index('waveport2')]
+    if phases is None:
+        phases = s_parameters.phase[:, waveports, antenna].T
+    power_1 = s_parameters.power('waveport1', 'antenna', antenna_power)
+    power_2 = power_1
+    if s_parameters.has_magnitude[waveports[1], antenna]:
+        power_2 = s_parameters.power('waveport2', 'antenna', antenna_power)
+    return np.sqrt(power_1) * np.exp(-1j * phases[0]), np.sqrt(power_2) * np.exp(-1j * phases[1])
+
+
+def radiated_power(m_e, m_m, frequency) -> np.ndarray:
+    """
+    Power radiated in free space by co-located electric and magnetic dipoles.
+
+    P = k^2 / (6 pi) (Z0 |m_e|^2 + |m_m|^2 / Z0) for effective moment
+    values; the interference term of the two dipoles integrates to zero.
+
+    Args:
+        m_e: Electric moment vectors in A m, shape (..., 3)
+        m_m: Magnetic moment vectors in V m, shape (..., 3)
+        frequency: Frequency in Hz, broadcast against the leading axes
+
+    Returns:
+        Radiated power in W
+    """
+    wave_number = 2 * np.pi * np.asarray(frequency) / SPEED_OF_LIGHT
+    electric = np.sum(np.abs(m_e) ** 2, axis=-1)
+    magnetic = np.sum(np.abs(m_m) ** 2, axis=-1)
+    return wave_number ** 2 / (6 * np.pi) * (VACUUM_IMPEDANCE * electric + magnetic / VACUUM_IMPEDANCE)
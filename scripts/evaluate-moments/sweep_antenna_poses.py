@@ -0,0 +1,51 @@
+from modules.calculate_moments import calculate_complex_moments
+from modules.pipeline import evaluate_antenna
+from modules.tem_cell import TEM_CELLS, chamber_centre
+from modules.forward_model import FieldMap, moment_vectors, rotation_matrices, waveport_waves
+
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+# === Configuration ===
+antenna_type = "monopole"  # same name as data folder to be read
+tem_cell = TEM_CELLS['empty_tem_cell']
+positions_x = np.linspace(-15e-3, 15e-3, 61)  # across the cell, in m
+positions_y = np.linspace(-11e-3, -1e-3, 41)  # below the septum, in m
+rotations_x = np.deg2rad(np.arange(0, 360, 15))
+rotations_z = np.deg2rad(np.arange(0, 360, 15))
+output_file = Path(f'output/{antenna_type}-pose-power.npy')
+
+# === Moments of the antenna at the chamber centre ===
+result = evaluate_antenna(antenna_type, tem_cell=tem_cell)
+frequencies = result['frequencies']
+m_e, m_m = calculate_complex_moments(result['efield'], result['phase_shift'],
+                                     result['output_power'], frequencies)
+m_e, m_m = moment_vectors(m_e, m_m)
+field_map = FieldMap.from_tem_cell(tem_cell)
+
+# The extraction pose gives back the simulated output power
+predicted = waveport_waves(m_e, m_m, field_map(*chamber_centre(tem_cell)))
+deviation = np.max(np.abs(predicted.output_power / result['output_power'] - 1))
+print(f"Extraction pose: largest relative deviation of the output power {deviation:.2e}")
+
+# === Predicted output power for all positions and orientations ===
+x, y, rx, rz = np.meshgrid(positions_x, positions_y, rotations_x, rotations_z, indexing='ij')
+start = time.perf_counter()
+waves = waveport_waves(m_e, m_m, field_map(x.ravel(), y.ravel()),
+                       rotation_matrices(rx=rx.ravel(), rz=rz.ravel()))
+elapsed = time.perf_counter() - start
+power = waves.output_power.reshape(x.shape + frequencies.shape)
+print(f"{x.size} poses x {frequencies.size} frequencies in {elapsed:.2f} s")
+
+strongest = np.unravel_index(np.argmax(power[..., -1]), x.shape)
+print(f"Strongest coupling at {frequencies[-1] / 1e9:g} GHz: {power[strongest][-1]:.3e} W at "
+      f"x = {x[strongest] * 1e3:.1f} mm, y = {y[strongest] * 1e3:.1f} mm, "
+      f"rotation x = {np.rad2deg(rx[strongest]):.0f} deg, z = {np.rad2deg(rz[strongest]):.0f} deg")
+
+# Axes: x position, y position, rotation about x, rotation about z, frequency
+output_file.parent.mkdir(parents=True, exist_ok=True)
+np.save(output_file, power)
+print(f"Output power cube saved to {output_file}")
@@ -1,15 +1,50 @@
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
 import numpy as np
-from scipy.optimize import curve_fit
 import matplotlib.pyplot as plt
 import pandas as pd
 import scienceplots
 
+from render_cache import cached_render
+
+# Curve fitting is shared with the moment export of evaluate-moments
+sys.path.append(str(Path(__file__).resolve().parents[1] / "evaluate-moments"))
+from modules.curve_fitting import fit_series, write_fit_coefficients
+
 
 def setup_plot_style():
     """Configure matplotlib with IEEE publication style."""
     plt.style.use(['science', 'ieee'])
     plt.rcParams.update({'figure.dpi': '100'})
 
+
+# CSV files read in this process, keyed by (absolute path, skiprows)
+_csv_tables = {}
+
+
+def read_csv_shared(file_path, skiprows=0):
+    """
+    Read a CSV file once per process and reuse the DataFrame afterwards.
+
+    The DataFrame is shared between all plots using the file and must not be
+    modified. A file changed on disk is read again.
+    """
+    key = (os.path.abspath(file_path), skiprows)
+    mtime = os.stat(file_path).st_mtime_ns
+    entry = _csv_tables.get(key)
+    if entry is None or entry[0] != mtime:
+        entry = _csv_tables[key] = (mtime, pd.read_csv(file_path, skiprows=skiprows))
+    return entry[1]
+
+
+@cached_render(sources=('data_source',), style=setup_plot_style, extra_outputs=('fit_output',))
 def create_ieee_plot(
     data_source,
     x_column,
@@ -23,7 +58,11 @@ def create_ieee_plot(
     x_limits=None,
     y_limits=None,
     show_grid=True,
-    skiprows=0
+    skiprows=0,
+    fit=None,
+    fit_order=2,
+    fit_overlay=True,
+    fit_output=None
 ):
     """
     Create an IEEE-style publication-quality plot from CSV data.
@@ -56,6 +95,15 @@ def create_ieee_plot(
         Whether to show grid lines
     skiprows : int, optional
         Number of rows to skip at the beginning (e.g., 1 for header row)
+    fit : str, optional
+        Curve fit of all plotted series: 'poly', 'rational' or 'exp'.
+        No fit is done if None
+    fit_order : int or tuple, optional
+        Polynomial order, or (numerator, denominator) order for 'rational'
+    fit_overlay : bool, optional
+        Whether to draw the fitted curves (dotted, in the series color)
+    fit_output : str, optional
+        CSV file receiving the fitted coefficients of every series
 
     Returns
     -------
@@ -67,7 +115,7 @@ def create_ieee_plot(
     if isinstance(data_source, str):
         # Try to read CSV with header first
         try:
-            df = pd.read_csv(data_source, skiprows=skiprows)
+            df = read_csv_shared(data_source, skiprows)
 
             # Convert to numeric, coercing errors
             if isinstance(x_column, str):
@@ -110,25 +158,18 @@ def create_ieee_plot(
     x_data = x_data[valid_mask]
     y_data_list = [y[valid_mask] for y in y_data_list]
 
-    def model_func(x, a, b, c):
-        return a * x**2 + b * x**1 + c
-
-    # Fit curve
-    popt, pcov = curve_fit(model_func, x_data, y_data_list[0])
-
-    # Parameters fitted
-    a_e, b_e, c_e = popt
-
-    #x_data = np.linspace(x_data.min(), x_data.max(), 100)
-    # Generate corresponding y data using fitted coefficients
-    #y_data_list[0] = model_func(x_data, a_e, b_e, c_e)
-
     # Create figure and axis
     fig, ax = plt.subplots(figsize=figsize)
 
     # Plot each y column
+    lines = []
     for y_data, label in zip(y_data_list, legend_labels):
-        ax.plot(x_data, y_data, label=label)
+        lines.extend(ax.plot(x_data, y_data, label=label))
+
+    # Optional curve fit of all series in one batch
+    if fit is not None:
+        _fit_and_overlay(ax, lines, [x_data] * len(lines), y_data_list,
+                         fit, fit_order, fit_overlay, fit_output, legend_labels)
 
     if legend_labels and any(label.strip() for label in legend_labels):
         legend = ax.legend(frameon=True)
@@ -166,6 +207,7 @@ def create_ieee_plot(
     return fig, ax
 
 
+@cached_render(sources=('data_sources',), style=setup_plot_style, extra_outputs=('fit_output',))
 def create_ieee_plot_multifile(
     data_sources,
     x_columns,
@@ -179,7 +221,11 @@ def create_ieee_plot_multifile(
     x_limits=None,
     y_limits=None,
     show_grid=True,
-    skiprows=None
+    skiprows=None,
+    fit=None,
+    fit_order=2,
+    fit_overlay=True,
+    fit_output=None
 ):
     """
     Create an IEEE-style plot from multiple CSV files.
@@ -216,6 +262,15 @@ def create_ieee_plot_multifile(
         Whether to show grid lines
     skiprows : int or list of int, optional
         Number of rows to skip. Can be single value or list (one per file)
+    fit : str, optional
+        Curve fit of all plotted series: 'poly', 'rational' or 'exp'.
+        No fit is done if None
+    fit_order : int or tuple, optional
+        Polynomial order, or (numerator, denominator) order for 'rational'
+    fit_overlay : bool, optional
+        Whether to draw the fitted curves (dotted, in the series color)
+    fit_output : str, optional
+        CSV file receiving the fitted coefficients of every series
 
     Returns
     -------
@@ -269,7 +324,7 @@ def create_ieee_plot_multifile(
         zip(data_sources, x_columns, y_columns, skiprows)
     ):
         try:
-            df = pd.read_csv(file_path, skiprows=skip)
+            df = read_csv_shared(file_path, skip)
 
             # Get x data
             if isinstance(x_col, str):
@@ -309,8 +364,14 @@ def create_ieee_plot_multifile(
     fig, ax = plt.subplots(figsize=figsize)
 
     # Plot all series
+    lines = []
     for x_data, y_data, label in zip(all_x_data, all_y_data, all_labels):
-        ax.plot(x_data, y_data, label=label)
+        lines.extend(ax.plot(x_data, y_data, label=label))
+
+    # Optional curve fit; series sharing their x values are fitted together
+    if fit is not None:
+        _fit_and_overlay(ax, lines, all_x_data, all_y_data,
+                         fit, fit_order, fit_overlay, fit_output, all_labels)
 
     # Set labels and title
     ax.set_xlabel(x_label)
@@ -348,6 +409,21 @@ def create_ieee_plot_multifile(
 
 
 
+def _fit_and_overlay(ax, lines, x_list, y_list, fit, fit_order, overlay, output_path, labels):
+    """Fit all plotted series, draw the fits and write their coefficients."""
+    fits = fit_series(x_list, y_list, model=fit, order=fit_order)
+
+    if overlay:
+        for line, x_data, (result, row) in zip(lines, x_list, fits):
+            x_fit = np.linspace(np.min(x_data), np.max(x_data), 200)
+            ax.plot(x_fit, result.evaluate(x_fit)[row], linestyle=':',
+                    color=line.get_color(), label='_nolegend_')
+
+    if output_path is not None:
+        write_fit_coefficients(output_path, [str(label) for label in labels], fits)
+
+
+@cached_render(sources=('data_source',), n_axes=2, style=setup_plot_style)
 def create_ieee_plot_dual_yaxis(
     data_source,
     x_column,
@@ -436,7 +512,7 @@ def create_ieee_plot_dual_yaxis(
     # Load data from CSV or dictionary
     if isinstance(data_source, str):
         try:
-            df = pd.read_csv(data_source, skiprows=skiprows)
+            df = read_csv_shared(data_source, skiprows)
 
             # Get x data
             if isinstance(x_column, str):
@@ -565,6 +641,7 @@ def create_ieee_plot_dual_yaxis(
     return fig, ax1, ax2
 
 
+@cached_render(sources=('data_sources',), n_axes=2, style=setup_plot_style)
 def create_ieee_plot_dual_yaxis_multifile(
     data_sources,
     x_columns,
@@ -650,7 +727,7 @@ def create_ieee_plot_dual_yaxis_multifile(
     dfs = []
     for file_path, skip in zip(data_sources, skiprows):
         try:
-            df = pd.read_csv(file_path, skiprows=skip)
+            df = read_csv_shared(file_path, skip)
             dfs.append(df)
         except Exception as e:
             raise ValueError(f"Error reading file {file_path}: {e}")
@@ -664,10 +741,11 @@ def create_ieee_plot_dual_yaxis_multifile(
             return pd.to_numeric(df.iloc[:, col], errors='coerce').values
 
     # Process columns format
-    # If simple list, assume single file (file_idx=0)
-    if y1_columns and not isinstance(y1_columns[0], tuple):
+    # If simple list, assume single file (file_idx=0); pairs may also be
+    # lists, as read from a JSON manifest
+    if y1_columns and not isinstance(y1_columns[0], (tuple, list)):
         y1_columns = [(0, col) for col in y1_columns]
-    if y2_columns and not isinstance(y2_columns[0], tuple):
+    if y2_columns and not isinstance(y2_columns[0], (tuple, list)):
         y2_columns = [(0, col) for col in y2_columns]
 
     # Get x data (assuming same x for all - use first file's x column)
@@ -753,172 +831,159 @@ def create_ieee_plot_dual_yaxis_multifile(
     return fig, ax1, ax2
 
 
-# Example usage
-if __name__ == '__main__':
+# Plot functions that manifest entries can refer to
+PLOT_FUNCTIONS = {
+    'create_ieee_plot': create_ieee_plot,
+    'create_ieee_plot_multifile': create_ieee_plot_multifile,
+    'create_ieee_plot_dual_yaxis': create_ieee_plot_dual_yaxis,
+    'create_ieee_plot_dual_yaxis_multifile': create_ieee_plot_dual_yaxis_multifile,
+}
+
+
+def load_manifest(manifest_path, only=None):
+    """
+    Load plot jobs from a JSON manifest.
+
+    The manifest is a list of entries of the form
+    {"name": ..., "function": "create_ieee_plot", "args": {...}}, where args
+    are the keyword arguments of the plot function. Relative paths are
+    resolved against the folder of the manifest.
+
+    Parameters
+    ----------
+    manifest_path : str
+        Path to the manifest file
+    only : list of str, optional
+        Name patterns (fnmatch, e.g. 'gap-*') of the jobs to keep
+
+    Returns
+    -------
+    list of dict
+        Manifest entries, in file order
+    """
+    with open(manifest_path, encoding='utf-8') as f:
+        jobs = json.load(f)
+
+    for job in jobs:
+        if job.get('function') not in PLOT_FUNCTIONS:
+            raise ValueError(f"Unknown plot function in job {job.get('name')}: {job.get('function')}")
+        job.setdefault('name', os.path.splitext(os.path.basename(job['args']['output_path']))[0])
+
+    if only:
+        jobs = [job for job in jobs
+                if any(fnmatch.fnmatch(job['name'], pattern) for pattern in only)]
+    return jobs
+
+
+def run_manifest(manifest_path='figures.json', only=None, workers=None, force=False):
+    """
+    Render the jobs of a manifest in parallel worker processes.
+
+    Every CSV file is read once up front and handed to the workers, so files
+    used by several figures are not parsed again. Figures whose inputs did
+    not change are skipped by the render cache unless force is set.
+
+    Parameters
+    ----------
+    manifest_path : str, optional
+        Path to the manifest file
+    only : list of str, optional
+        Name patterns of the jobs to run
+    workers : int, optional
+        Number of worker processes (default: number of CPUs)
+    force : bool, optional
+        Render all selected jobs, ignoring the render cache
+
+    Returns
+    -------
+    dict
+        Status message per job name
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = load_manifest(manifest_path, only)
+    for job in jobs:
+        job['args'] = _resolve_paths(job['args'], base_dir)
+
+    for job in jobs:
+        for file_path, skip in _job_csv_files(job['args']):
+            if os.path.isfile(file_path):
+                read_csv_shared(file_path, skip)
+
+    status = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_plot_worker,
+                             initargs=(dict(_csv_tables),)) as pool:
+        futures = {pool.submit(_run_plot_job, job, force): job['name'] for job in jobs}
+        for future in as_completed(futures):
+            name, message, seconds = future.result()
+            print(f"{name:32} {seconds:6.2f} s  {message}")
+            status[name] = message
+    return status
+
+
+def _resolve_paths(args, base_dir):
+    """Make data and output paths of a job absolute, relative to the manifest."""
+    args = dict(args)
+    for key in ('data_source', 'data_sources', 'output_path'):
+        value = args.get(key)
+        if isinstance(value, str):
+            args[key] = os.path.join(base_dir, value)
+        elif isinstance(value, list):
+            args[key] = [os.path.join(base_dir, path) for path in value]
+    return args
+
+
+def _job_csv_files(args):
+    """(path, skiprows) pairs of the CSV files a job reads, as the plot functions read them."""
+    sources = args.get('data_source', args.get('data_sources'))
+    if isinstance(sources, dict):
+        return []
+    if not isinstance(sources, list):
+        sources = [sources]
+    skiprows = args.get('skiprows')
+    if skiprows is None:
+        skiprows = 0
+    if isinstance(skiprows, int):
+        skiprows = [skiprows] * len(sources)
+    return list(zip(sources, skiprows))
+
+
+def _init_plot_worker(tables):
+    plt.switch_backend('Agg')
     plt.rcParams['axes.formatter.useoffset'] = False
-    #create_ieee_plot(
-        #data_source="data/monopole/magnetic-energy.csv",
-        #x_column=1,
-        #y_columns=2,  
-        #x_label='Frequency (GHz)',
-        #y_label='Magnetic energy (J)',
-        #title=r'Magnetic energy in the TEM cell',
-        #legend_labels='magnetic energy',
-        #output_path='output/monopole_magnetic_energy.png',
-        #x_limits=(0, 3),
-        #y_limits=(0, 1.75e-6)
-    #)
-    #create_ieee_plot_dual_yaxis(
-    #    data_source='data/gap-loop/impedance.csv',
-    #    x_column=0,
-    #    y1_columns=2,  # Plot column 1
-    #    y2_columns=1,        # Plot column 3 on right axis
-    #    x_label='Frequency (GHz)',
-    #    y1_label=r'Magnitude ($\Omega$)',
-    #    y2_label='Phase (deg)',
-    #    title='Impedance of the loop antenna with gap',
-    #    y1_legend_labels=['Magnitude'],
-    #    y2_legend_labels=['Phase'],
-    #    output_path='output/gap_loop_impedance.png',
-    #    y1_limits=(0, 4.5e4),
-    #    y2_limits=(-90, -89.988)
-    #)
-
-    # Example 2: Multiple files with dual y-axis
-    # create_ieee_plot_dual_yaxis_multifile(
-    #     data_sources=['file1.csv', 'file2.csv'],
-    #     x_columns=0,
-    #     y1_columns=[(0, 1), (1, 1)],  # file1-col1, file2-col1 on left
-    #     y2_columns=[(0, 2)],           # file1-col2 on right
-    #     x_label='Time (s)',
-    #     y1_label='Voltage (V)',
-    #     y2_label='Current (A)',
-    #     title='Multi-file Dual Axis Plot',
-    #     y1_legend_labels=['V1', 'V2'],
-    #     y2_legend_labels=['Current'],
-    #     output_path='output/dual_axis_multifile.png'
-    # )
-
-    #create_ieee_plot(
-        #data_source="data/gap-loop/feed-current.csv",
-        #x_column=0,
-        #y_columns=1,  
-        #x_label='Frequency (GHz)',
-        #y_label='Current (A)',
-        #title=r'Current at the feedpoint of loop antenna with gap',
-        #legend_labels=[''],
-        #output_path='output/gap-loop-feed-return-current.png',
-        #x_limits=(0, 3),
-        #y_limits=(0, 0.04)
-    #)
-    #create_ieee_plot_multifile(
-    #    data_sources=['data/loop/equ-moment-power.csv', 'data/loop/magnitude.csv'],
-    #    x_columns=0,  # Use column 0 as x-axis for both files
-    #    y_columns=[1, 1],  # Plot column 1 from file1, column 1 from file2
-    #    x_label='Frequency (GHz)',
-    #    y_label='Power (W)',
-    #    title='Comparison $P_\mathrm{out}$ loop antenna and $\mathbf{m}_e$, $\mathbf{m}_m$',
-    #    legend_labels=['Equivalent dipole moments', 'Loop antenna'],
-    #    output_path='output/comparison-loop.png',
-    #    y_limits=(0, 1e-4),
-    #    x_limits=(0.001, 3)
-    #)
-    
-    # Example 2: Multiple files - simple case
-    # Plot column 1 from file1.csv and column 2 from file2.csv
-    #create_ieee_plot_multifile(
-    #    data_sources=['data/loop/equ-moment-power.csv', 'data/loop/magnitude.csv'],
-    #    x_columns=[1, 0],  # Use column 0 as x-axis for both files
-    #    y_columns=[1, 2],  # Plot column 1 from file1, column 2 from file2
-    #    x_label='Frequency (GHz)',
-    #    y_label='Power (W)',
-    #    title='Comparison $P_\mathrm{out}$ loop antenna and $\mathbf{m}_e$, $\mathbf{m}_m$',
-    #    legend_labels=['Equivalent dipole moments', 'Monopole antenna'],
-    #    output_path='output/comparison-loop.png'
-    #)
-    
-    # Example 3: Multiple files - complex case
-    # Plot multiple columns from each file
-    #create_ieee_plot_multifile(
-        #data_sources=['data/file1.csv', 'data/file2.csv'],
-        #x_columns=[0, 0],  # Column 0 for x in both files
-        #y_columns=[[1, 2], [1, 3]],  # Cols 1,2 from file1; cols 1,3 from file2
-        #x_label='Time (s)',
-        #y_label='Amplitude',
-        #title='Comprehensive comparison',
-        ##legend_labels=['F1-V1', 'F1-V2', 'F2-V1', 'F2-V3'],
-        #output_path='output/multifile_complex.png'
-    #)
-    #create_ieee_plot_multifile(
-    #    data_sources=['data/gap-loop/dipole-moments-15um.csv', 'data/gap-loop/dipole-moments-500um.csv'],
-    #    x_columns=0,  # Use column 0 as x-axis for both files
-    #    y_columns=[[1, 2], [1, 2]],  # Plot column 1 from file1, column 1 from file2
-    #    x_label='Frequency (GHz)',
-    #    y_label='Dipole moment magnitudes (Vm)',
-    #    title='Comparison of equivalent dipole moments at different gap heights',
-    #    legend_labels=[r'15 µm - $m_e$', r'15 µm - $m_m$',r'500 µm - $m_e$', r'500 µm - $m_m$'],
-    #    output_path='output/gap-sweep-moments.png',
-    #    y_limits=(0, 1.2e-2),
-    #    x_limits=(0.001, 3)
-    #)
-    #create_ieee_plot_multifile(
-    #    data_sources=['data/gap-loop/output-power-15um.csv', 'data/gap-loop/output-power-500um.csv'],
-    #    x_columns=0,  # Use column 0 as x-axis for both files
-    #    y_columns=[1, 1],  # Plot column 1 from file1, column 1 from file2
-    #    x_label='Frequency (GHz)',
-    #    y_label='Output power (W)',
-    #    title='Comparison of output power at different gap heights',
-    #    legend_labels=[r'15 µm', r'500 µm'],
-    #    output_path='output/gap-sweep-power.png',
-    #    y_limits=(0, 1.2e-2),
-    #    x_limits=(0.001, 3)
-    #)
-    #create_ieee_plot(
-    #    data_source="data/shielding/zinc.csv",
-    #    x_column=0,
-    #    y_columns=1,  
-    #    x_label='Material thickenss (µm)',
-    #    y_label='Shielding efficiency (dB)',
-    #    title=r'Shielding effectiveness of zinc',
-    #    legend_labels=[''],
-    #    output_path='output/zinc-shielding.png',
-    #    x_limits=(1, 40),
-    #    y_limits=(75, 100)
-    #)
-
-    #create_ieee_plot(
-    #    data_source="data/gap-loop/feed-voltage.csv",
-    #    x_column=0,
-    #    y_columns=1,
-    #    x_label='Frequency (GHz)',
-    #    y_label='Voltage (V)',
-    #    title=r'Feed voltage of loop antenna with gap',
-    #    legend_labels=[''],
-    #    output_path='output/gap-feed-voltage.png',
-    #    x_limits=(0.001, 3),
-    #    y_limits=(19.8, 20)
-    #)
-    #create_ieee_plot_multifile(
-    #    data_sources=['data/loop-geometry-comp/dipole-moments-high.csv', 'data/loop-geometry-comp/dipole-moments-wide.csv'],
-    #    x_columns=0,  # Use column 0 as x-axis for both files
-    #    y_columns=[[1, 2], [1, 2]],  # Plot column 1 from file1, column 1 from file2
-    #    x_label='Frequency (GHz)',
-    #    y_label='Dipole moment magnitudes (Vm)',
-    #    title='Comparison of equivalent dipole moments at different antenna geometries',
-    #    legend_labels=[r'h=2.16 mm, w=1.4 mm - $m_e$', r'h=2.16 mm, w=1.4 mm - $m_m$',r'h=1.2 mm, w=2.36 mm - $m_e$', r'h=1.2 mm, w=2.36 mm - $m_m$'],
-    #    output_path='output/loop-comp.png',
-    #    y_limits=(0, 1.7e-2),
-    #    x_limits=(0.001, 3)
-    #)
-    create_ieee_plot_multifile(
-        data_sources=['data/loop-geometry-comp/output-power-high.csv', 'data/loop-geometry-comp/output-power-wide.csv'],
-        x_columns=0,  # Use column 0 as x-axis for both files
-        y_columns=[1, 1],  # Plot column 1 from file1, column 1 from file2
-        x_label='Frequency (GHz)',
-        y_label='Output power (W)',
-        title='Comparison of output power at different antenna geometries',
-        legend_labels=[r'h=2.16 mm, w=1.4 mm', r'h=1.2 mm, w=2.36 mm'],
-        output_path='output/loop-comp-power.png',
-        y_limits=(0, 1e-4),
-        x_limits=(0.001, 3)
-    )
+    _csv_tables.update(tables)
+
+
+def _run_plot_job(job, force):
+    """Render one manifest job; returns (name, status message, seconds)."""
+    start = time.perf_counter()
+    try:
+        args = job['args']
+        os.makedirs(os.path.dirname(args['output_path']) or '.', exist_ok=True)
+        result = PLOT_FUNCTIONS[job['function']](**args, force=force)
+        message = 'up to date' if result[0] is None else f"saved {args['output_path']}"
+    except Exception as e:
+        message = f"failed: {e}"
+    finally:
+        plt.close('all')
+    return job['name'], message, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render the figures of a plot manifest.')
+    parser.add_argument('manifest', nargs='?', default='figures.json',
+                        help='JSON manifest with one entry per figure')
+    parser.add_argument('--only', nargs='+', metavar='PATTERN',
+                        help='render only jobs whose name matches one of the patterns')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes')
+    parser.add_argument('--force', action='store_true',
+                        help='render even if the figure is up to date')
+    parser.add_argument('--list', action='store_true',
+                        help='list the selected jobs without rendering')
+    args = parser.parse_args()
+
+    if args.list:
+        for job in load_manifest(args.manifest, args.only):
+            print(f"{job['name']:32} {job['function']}")
+    else:
+        run_manifest(args.manifest, args.only, args.workers, args.force)
@@ -0,0 +1,185 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+from pathlib import Path
+
+import matplotlib
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+# Set to False to always re-render
+CACHE_ENABLED = True
+
+# Bumped whenever the key layout changes
+_CACHE_VERSION = 1
+
+# rcParams that do not influence the saved image
+_IGNORED_RCPARAMS = {'backend', 'backend_fallback', 'interactive', 'figure.max_open_warning'}
+
+# File hashes of this run, keyed by (path, size, mtime_ns)
+_file_hashes = {}
+
+
+def cached_render(sources, n_axes=1, output='output_path', style=None, extra_outputs=()):
+    """
+    Skip re-rendering a plot whose inputs and specification did not change.
+
+    The cache key is a SHA-256 over the plot function's source code, all
+    arguments (defaults included), the content hashes of the data files,
+    the current rcParams and the matplotlib version. It is stored in
+    '.<image name>.render.json' next to the image. If the image exists and
+    the stored key matches, the function is not called.
+
+    Pass force=True to the decorated function to render regardless.
+
+    On a cache hit the decorated function returns (None,) * (n_axes + 1)
+    instead of the figure and its axes, as nothing was drawn. Callers that
+    use the returned objects must check for it, e.g.
+    ``fig, ax = create_ieee_plot(...); if fig is None: ...``, or pass
+    force=True.
+
+    Parameters
+    ----------
+    sources : tuple of str
+        Names of the arguments holding data: a CSV path, a list of CSV
+        paths or a dictionary of arrays
+    n_axes : int, optional
+        Number of axes objects returned next to the figure
+    output : str, optional
+        Name of the argument holding the image path
+    style : callable, optional
+        Style setup of the plot function, applied before the rcParams are
+        hashed so that the key does not depend on earlier plots
+    extra_outputs : tuple of str, optional
+        Names of arguments holding further output files (e.g. fitted
+        coefficients); a cached plot is only current if these exist
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        source_code = inspect.getsource(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, force=False, **kwargs):
+            if not CACHE_ENABLED:
+                return func(*args, **kwargs)
+
+            if style is not None:
+                style()
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            output_path = Path(bound.arguments[output])
+            key = render_key(source_code, bound.arguments, sources)
+            meta_path = output_path.with_name(f".{output_path.name}.render.json")
+
+            extra_files = [bound.arguments[name] for name in extra_outputs
+                           if bound.arguments.get(name) is not None]
+            if (not force and _is_current(output_path, meta_path, key)
+                    and all(os.path.exists(path) for path in extra_files)):
+                return (None,) * (n_axes + 1)
+
+            result = func(*args, **kwargs)
+            stat = output_path.stat()
+            meta = {'key': key, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            try:
+                meta_path.write_text(json.dumps(meta))
+            except OSError:
+                pass
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def render_key(source_code, arguments, sources):
+    """
+    Hash of everything that determines a rendered plot.
+
+    Parameters
+    ----------
+    source_code : str
+        Source of the plot function
+    arguments : dict
+        Bound arguments of the call
+    sources : tuple of str
+        Names of the arguments holding data
+
+    Returns
+    -------
+    str
+        SHA-256 hex digest
+    """
+    spec = {
+        'version': _CACHE_VERSION,
+        'matplotlib': matplotlib.__version__,
+        'code': source_code,
+        'arguments': {name: (_data_hash(value) if name in sources or isinstance(value, np.ndarray)
+                             else value)
+                      for name, value in arguments.items()},
+        'rcParams': {name: value for name, value in plt.rcParams.items()
+                     if name not in _IGNORED_RCPARAMS},
+    }
+    text = json.dumps(spec, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def clear_render_cache(output_path):
+    """Remove the cache entry of an image so that it is rendered again."""
+    output_path = Path(output_path)
+    meta_path = output_path.with_name(f".{output_path.name}.render.json")
+    if meta_path.exists():
+        meta_path.unlink()
+
+
+def _is_current(output_path, meta_path, key):
+    """True if the image exists, is unmodified and was rendered with this key."""
+    try:
+        meta = json.loads(meta_path.read_text())
+        stat = output_path.stat()
+    except (OSError, ValueError):
+        return False
+    return (meta.get('key') == key
+            and meta.get('size') == stat.st_size
+            and meta.get('mtime_ns') == stat.st_mtime_ns)
+
+
+def _data_hash(value):
+    """Content hash of a data argument (path, list of paths, array or dictionary of arrays)."""
+    if isinstance(value, (str, os.PathLike)):
+        # Missing files are left to the plot function to report
+        return _file_hash(value) if os.path.isfile(value) else str(value)
+    if isinstance(value, (list, tuple)):
+        return [_data_hash(item) for item in value]
+    digest = hashlib.sha256()
+    if isinstance(value, np.ndarray):
+        _update_array_hash(digest, None, value)
+        return digest.hexdigest()
+    if isinstance(value, dict):
+        for name in sorted(value, key=str):
+            _update_array_hash(digest, name, value[name])
+        return digest.hexdigest()
+    return value
+
+
+def _update_array_hash(digest, name, value):
+    """Feed the name, type, shape and bytes of an array into digest."""
+    array = np.ascontiguousarray(value)
+    digest.update(repr((name, array.dtype.str, array.shape)).encode())
+    digest.update(array.tobytes())
+
+
+def _file_hash(path):
+    """SHA-256 of a file, computed once per run unless the file changes."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    file_hash = _file_hashes.get(memo_key)
+    if file_hash is None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        file_hash = _file_hashes[memo_key] = digest.hexdigest()
+    return file_hash